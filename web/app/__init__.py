@@ -1,10 +1,13 @@
 from flask import Flask
 from .config import Config
 from .extensions import db, login_manager
+from .profiling import init_profiling
+from .routing import init_routing
 from .auth import auth_bp
 from .main import main_bp
 from .courses import courses_bp
 from .events import events_bp
+from .api import api_bp
 
 def create_app():
     app = Flask(__name__)
@@ -12,11 +15,14 @@ def create_app():
 
     db.init_app(app)
     login_manager.init_app(app)
+    init_profiling(app)
+    init_routing(app)
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(main_bp)
     app.register_blueprint(courses_bp, url_prefix="/courses")
     app.register_blueprint(events_bp, url_prefix="/events")
+    app.register_blueprint(api_bp, url_prefix="/api/v1")
 
     from .cli import register_cli
     register_cli(app)
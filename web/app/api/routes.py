@@ -0,0 +1,302 @@
+"""
+API JSON v1 (/api/v1): catalogue, détail d'un cours, planning et événements.
+
+Les listes ne chargent pas d'objets ORM: seules les colonnes des champs demandés
+(?fields=code,name,...) sont lues, et chaque ligne devient un dict sans passer
+par un modèle. orjson sérialise la réponse s'il est installé.
+"""
+import json
+from datetime import date
+
+from flask import Response, abort, request
+from flask_login import current_user, login_required
+from sqlalchemy import select
+from sqlalchemy.orm import Bundle, aliased
+from werkzeug.exceptions import HTTPException
+
+from . import api_bp
+from ..extensions import db, login_manager
+from ..models import Course, CourseStats, CourseStudyPlan, Event, Faculty, Professor, StudyPlan, User, difficulty_from_hours
+from ..courses.routes import catalog_query
+from ..events.routes import public_events_query
+from ..httpcache import COURSE_IMPORT, COURSES, conditional, course_version
+from ..pagination import keyset_paginate
+from ..planning import PLANNING, planning_for, planning_version
+from ..reference import REFERENCE
+from ..routing import read_only
+from ..schedule import DAYS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_LIMIT = 100
+
+# Sans session, l'API répond 401 au lieu de rediriger vers le formulaire de connexion
+login_manager.blueprint_login_views["api"] = None
+
+
+class Field:
+    """Champ d'une ressource: colonnes lues, calcul de la valeur, jointure nécessaire"""
+    __slots__ = ("columns", "compute", "join")
+
+    def __init__(self, *columns, compute=None, join=None):
+        self.columns = columns
+        self.compute = compute
+        self.join = join
+
+
+def _average(total, count):
+    return round(total / count, 1) if count else None
+
+
+def _difficulty(hours_sum, hours_count):
+    return difficulty_from_hours(_average(hours_sum, hours_count))
+
+
+def _count(value):
+    return value or 0
+
+
+def _full_name(first, last):
+    return f"{first} {last}" if first is not None else None
+
+
+# Alias: les filtres du catalogue peuvent déjà joindre Faculty
+_professor = aliased(Professor, name="api_professor")
+_faculty = aliased(Faculty, name="api_faculty")
+_creator = aliased(User, name="api_creator")
+
+COURSE_JOINS = {
+    "professor": (_professor, _professor.id == Course.professor_id),
+    "faculty": (_faculty, _faculty.id == Course.faculty_id),
+    "stats": (CourseStats, CourseStats.course_id == Course.id),
+}
+
+COURSE_FIELDS = {
+    "id": Field(Course.id),
+    "code": Field(Course.code),
+    "name": Field(Course.name),
+    "description": Field(Course.description),
+    "credits": Field(Course.credits),
+    "semester": Field(Course.semester),
+    "academical_year": Field(Course.academical_year),
+    "day_of_week": Field(Course.day_of_week),
+    "start_time": Field(Course.start_time),
+    "end_time": Field(Course.end_time),
+    "professor": Field(_professor.first_name, _professor.last_name, compute=_full_name, join="professor"),
+    "faculty": Field(_faculty.name, join="faculty"),
+    "enrolled_count": Field(CourseStats.enrolled_count, compute=_count, join="stats"),
+    "feedback_count": Field(CourseStats.feedback_count, compute=_count, join="stats"),
+    "average_hours": Field(CourseStats.hours_sum, CourseStats.hours_count, compute=_average, join="stats"),
+    "average_grade": Field(CourseStats.grade_sum, CourseStats.grade_count, compute=_average, join="stats"),
+    "difficulty_rating": Field(CourseStats.hours_sum, CourseStats.hours_count, compute=_difficulty, join="stats"),
+}
+COURSE_LIST_DEFAULT = ("id", "code", "name", "credits", "semester", "professor", "faculty", "enrolled_count")
+COURSE_DETAIL_DEFAULT = tuple(COURSE_FIELDS) + ("study_plans",)
+
+# Remplacé par l'expression du nombre de participants de public_events_query
+PARTICIPANTS = "participant_count"
+
+EVENT_JOINS = {
+    "creator": (_creator, _creator.id == Event.creator_id),
+}
+
+EVENT_FIELDS = {
+    "id": Field(Event.id),
+    "title": Field(Event.title),
+    "description": Field(Event.description),
+    "category": Field(Event.category),
+    "day_of_week": Field(Event.day_of_week),
+    "start_time": Field(Event.start_time),
+    "end_time": Field(Event.end_time),
+    "event_date": Field(Event.event_date),
+    "location": Field(Event.location),
+    "max_participants": Field(Event.max_participants),
+    "participant_count": Field(PARTICIPANTS),
+    "is_full": Field(PARTICIPANTS, Event.max_participants,
+                     compute=lambda count, limit: limit is not None and count >= limit),
+    "creator": Field(_creator.username, join="creator"),
+    "created_at": Field(Event.created_at),
+}
+EVENT_DEFAULT = ("id", "title", "category", "day_of_week", "start_time", "end_time",
+                 "location", "max_participants", "participant_count")
+
+PLANNING_FIELDS = ("kind", "id", "title", "day", "start", "end", "start_minute", "end_minute",
+                   "professor_full_name", "description", "location", "semester", "academical_year")
+PLANNING_DEFAULT = ("kind", "id", "title", "day", "start", "end", "professor_full_name", "location")
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return float(value)  # Decimal (plan_credits)
+
+
+def _json(data, status=200):
+    if orjson is not None:
+        body = orjson.dumps(data, default=_default)
+    else:
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default)
+    return Response(body, status=status, mimetype="application/json")
+
+
+@api_bp.errorhandler(HTTPException)
+def _error(e):
+    return _json({"error": e.description}, e.code)
+
+
+def _fields(allowed, default):
+    """Champs demandés par ?fields=a,b (ordre conservé), ou default"""
+    raw = request.args.get("fields")
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        abort(400, description=f"Champs inconnus: {', '.join(unknown)}; disponibles: {', '.join(allowed)}")
+    return fields
+
+
+def _projection(fields, spec):
+    """(colonnes à lire, jointures, fonction ligne -> dict) des champs demandés
+
+    Une colonne lue par plusieurs champs (ex. hours_sum) ne l'est qu'une fois.
+    """
+    columns, joins, plan = [], [], []
+    for name in fields:
+        field = spec[name]
+        positions = []
+        for column in field.columns:
+            for i, seen in enumerate(columns):
+                if seen is column:
+                    break
+            else:
+                i = len(columns)
+                columns.append(column)
+            positions.append(i)
+        if field.join and field.join not in joins:
+            joins.append(field.join)
+        plan.append((name, positions, field.compute))
+
+    if all(compute is None for _, _, compute in plan):
+        index = [(name, positions[0]) for name, positions, _ in plan]
+
+        def serialize(row):
+            return {name: row[i] for name, i in index}
+    else:
+        def serialize(row):
+            return {
+                name: row[positions[0]] if compute is None else compute(*[row[i] for i in positions])
+                for name, positions, compute in plan
+            }
+    return columns, joins, serialize
+
+
+def _outerjoin(query, joins, available):
+    for name in joins:
+        target, onclause = available[name]
+        query = query.outerjoin(target, onclause)
+    return query
+
+
+def _limit():
+    return max(1, min(request.args.get("limit", 25, type=int), MAX_LIMIT))
+
+
+@api_bp.route('/courses')
+@read_only
+@conditional(lambda: [COURSES, REFERENCE])
+def courses():
+    """Catalogue: mêmes filtres que courses.catalog, pagination par curseur (after/before)"""
+    q = (request.args.get("q") or "").strip()
+    faculty_ext = (request.args.get("faculty") or "").strip()
+    plan_ext = (request.args.get("plan") or "").strip()
+    plan_id = request.args.get("plan_id", type=int)
+    sort = (request.args.get("sort") or ("relevance" if q else "code")).strip()
+    fields = _fields(COURSE_FIELDS, COURSE_LIST_DEFAULT)
+
+    columns, joins, serialize = _projection(fields, COURSE_FIELDS)
+    query, sort, keys = catalog_query(q, faculty_ext, plan_ext, plan_id, sort, columns=Bundle("course", *columns))
+    query = _outerjoin(query, joins, COURSE_JOINS)
+    page = keyset_paginate(query, sort, keys, _limit(),
+                           after=request.args.get("after"), before=request.args.get("before"))
+    return _json({
+        "items": [serialize(row) for row in page.items],
+        "sort": sort,
+        "next": page.next_cursor,
+        "prev": page.prev_cursor,
+    })
+
+
+@api_bp.route('/courses/<int:course_id>')
+@read_only
+@conditional(lambda course_id: [course_version(course_id), COURSE_IMPORT])
+def course(course_id):
+    """Détail d'un cours et statistiques des retours (course_stats)"""
+    fields = _fields((*COURSE_FIELDS, "study_plans"), COURSE_DETAIL_DEFAULT)
+    columns, joins, serialize = _projection([f for f in fields if f != "study_plans"], COURSE_FIELDS)
+
+    item = {}
+    if columns:
+        query = _outerjoin(db.session.query(*columns).select_from(Course), joins, COURSE_JOINS)
+        row = query.filter(Course.id == course_id).first()
+        if row is None:
+            abort(404, description="Cours introuvable")
+        item = serialize(row)
+    elif db.session.get(Course, course_id) is None:
+        abort(404, description="Cours introuvable")
+
+    if "study_plans" in fields:
+        plans = db.session.execute(
+            select(StudyPlan.id, StudyPlan.external_id, StudyPlan.label, CourseStudyPlan.plan_credits)
+            .join(CourseStudyPlan, CourseStudyPlan.study_plan_id == StudyPlan.id)
+            .where(CourseStudyPlan.course_id == course_id)
+            .order_by(StudyPlan.label)
+        )
+        item["study_plans"] = [
+            {"id": pid, "external_id": ext, "label": label, "plan_credits": credits}
+            for pid, ext, label, credits in plans
+        ]
+    return _json(item)
+
+
+@api_bp.route('/planning')
+@login_required
+@read_only
+@conditional(lambda: [planning_version(current_user.id), PLANNING])
+def planning():
+    """Créneaux du planning de l'utilisateur connecté, par jour puis par heure"""
+    fields = _fields(PLANNING_FIELDS, PLANNING_DEFAULT)
+    schedule = planning_for(current_user.id)
+    items = [
+        {name: day if name == "day" else slot.get(name) for name in fields}
+        for day in DAYS
+        for slot in schedule[day]
+    ]
+    return _json({"items": items})
+
+
+@api_bp.route('/events')
+@read_only
+def events():
+    """Événements publics: mêmes filtres et tris que events.list_events"""
+    category = (request.args.get("category") or "").strip()
+    sort = (request.args.get("sort") or "date").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    limit = _limit()
+    fields = _fields(EVENT_FIELDS, EVENT_DEFAULT)
+
+    selected, joins, serialize = _projection(fields, EVENT_FIELDS)
+
+    def columns(participant_count):
+        return Bundle("event", *[participant_count if c is PARTICIPANTS else c for c in selected])
+
+    query = _outerjoin(public_events_query(category, sort, columns=columns), joins, EVENT_JOINS)
+    rows = query.offset((page - 1) * limit).limit(limit + 1).all()
+    return _json({
+        "items": [serialize(row[0]) for row in rows[:limit]],
+        "page": page,
+        "has_next": len(rows) > limit,
+    })
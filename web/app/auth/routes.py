@@ -1,14 +1,22 @@
+import math
+
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required
-from werkzeug.security import generate_password_hash, check_password_hash
 
 from . import auth_bp
 from ..extensions import db, login_manager
+from ..identity import load_identity
 from ..models import User, Student, Professor
+from ..passwords import VerificationBusy, hash_password, needs_rehash, rehash_password, verify_password
+from ..throttle import login_wait
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_identity(int(user_id))
+
+def _throttled(wait):
+    flash(f"Trop de tentatives de connexion, réessayez dans {math.ceil(wait)} s", "error")
+    return render_template("auth/login.html"), 429
 
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
@@ -16,11 +24,36 @@ def login():
         username_or_email = request.form.get("username")
         password = request.form.get("password")
 
+        # Avant tout calcul de hash: limite par adresse IP, puis par compte
+        wait = login_wait(ip=request.remote_addr)
+        if wait:
+            return _throttled(wait)
+
         user = User.query.filter(
             (User.username == username_or_email) | (User.email == username_or_email)
         ).first()
 
-        if user and check_password_hash(user.password_hash, password):
+        # Un seul seau par compte, qu'on tape son nom d'utilisateur ou son email;
+        # la saisie sert de clé pour un compte inconnu
+        account = f"user:{user.id}" if user else f"name:{(username_or_email or '').strip().lower()}"
+        wait = login_wait(account=account)
+        if wait:
+            return _throttled(wait)
+
+        try:
+            valid = user is not None and verify_password(user.password_hash, password or "")
+        except VerificationBusy:
+            flash("Serveur très sollicité, réessayez dans un instant", "error")
+            return render_template("auth/login.html"), 503
+
+        if valid:
+            # Coût du hash changé (PASSWORD_HASH_METHOD): on profite du mot de passe en clair
+            if needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = rehash_password(password)
+                    db.session.commit()
+                except VerificationBusy:
+                    pass  # ce sera pour la prochaine connexion
             login_user(user)
             flash(f"Bienvenue {user.username}!", "success")
             return redirect(url_for("main.menu"))
@@ -55,7 +88,7 @@ def register():
             user = User(
                 username=username,
                 email=email,
-                password_hash=generate_password_hash(password)
+                password_hash=hash_password(password)
             )
             db.session.add(user)
             db.session.flush()  # Get user.id without committing
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .extensions import db
+from .models import DataVersion
+
+
+def current_version(name):
+    """Version courante d'un ensemble de données (0 si jamais modifié)"""
+    return db.session.scalar(select(DataVersion.version).where(DataVersion.name == name)) or 0
+
+
+def version_stamps(names):
+    """{nom: (version, date de modification)} en une requête ((0, None) si jamais modifié)"""
+    rows = db.session.execute(
+        select(DataVersion.name, DataVersion.version, DataVersion.updated_at).where(DataVersion.name.in_(names))
+    )
+    stamps = dict.fromkeys(names, (0, None))
+    stamps.update((name, (version, updated_at)) for name, version, updated_at in rows)
+    return stamps
+
+
+def _upsert(dialect):
+    """INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE du dialecte, ou None"""
+    if dialect in ("mysql", "mariadb"):
+        return lambda values, changes: mysql_insert(DataVersion).values(values).on_duplicate_key_update(changes)
+    if dialect in ("sqlite", "postgresql"):
+        insert_ = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        return lambda values, changes: insert_(DataVersion).values(values).on_conflict_do_update(
+            index_elements=[DataVersion.name], set_=changes,
+        )
+    return None
+
+
+def bump_version(name):
+    """Invalide les caches de name pour tous les processus (sans commit)"""
+    now = datetime.utcnow()
+    changes = {"version": DataVersion.version + 1, "updated_at": now}
+    # Départ à l'horodatage en ms plutôt qu'à 1: après un reset-db, un
+    # processus qui a gardé un cache de l'ancienne base ne retombe pas
+    # sur la même version.
+    values = {"name": name, "version": int(time.time() * 1000), "updated_at": now}
+
+    # Une seule instruction: deux premiers bumps simultanés du même nom (ex. la
+    # première inscription à un cours) ne se heurtent pas à la clé primaire
+    upsert = _upsert(db.session.get_bind(mapper=DataVersion).dialect.name)
+    if upsert is not None:
+        db.session.execute(upsert(values, changes))
+        return
+
+    result = db.session.execute(
+        update(DataVersion).where(DataVersion.name == name).values(changes),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(DataVersion).values(values))
+
+
+class VersionedCache:
+    """Cache en mémoire du processus: une valeur par clé, valable pour une version.
+
+    La version est lue par l'appelant (current_version) ; une valeur construite
+    pour une autre version est reconstruite au prochain accès.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        hit = self._data.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        value = build()
+        with self._lock:
+            self._data[key] = (version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TTLCache:
+    """Cache LRU en mémoire du processus, borné en taille, avec expiration"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build, ttl=None):
+        """Valeur en cache de key, sinon build() ; ttl (secondes) remplace celui du cache"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] > now:
+                self._data.move_to_end(key)
+                return hit[1]
+        value = build()
+        if ttl > 0:
+            with self._lock:
+                self._data[key] = (now + ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -1,10 +1,29 @@
 import click
 import json
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
-from werkzeug.security import generate_password_hash
 from .extensions import db
-from .models import User, Professor, Course, Faculty, StudyPlan, CourseStudyPlan
+from .models import User, Professor, Course, Faculty, StudyPlan, CourseStudyPlan, CourseSearchTerm, CourseStats, CourseFingerprint
+from .explain import explain, route_queries
+from .httpcache import invalidate_courses
+from .importer import CourseImporter, FeedFormatError, batched, iter_json_courses
+from .migrations import MIGRATIONS, applied_versions, stamp, upgrade
+from .passwords import hash_password
+from .planning import invalidate_all_plannings
+from .reference import invalidate_reference
+from .schedule import backfill_schedule_columns
+from .search import index_courses, rebuild_index
+from .stats import rebuild_course_stats
+from .student_import import CsvFormatError, StudentImporter, iter_csv_rows
+
+
+def _peak_memory_mb():
+    """Pic de mémoire résidente du processus (None hors Unix)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss est en Ko sous Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
 
 
 def register_cli(app):
@@ -12,6 +31,8 @@ def register_cli(app):
     def init_db():
         """Create all database tables."""
         db.create_all()
+        # Une base existante peut avoir des tables d'avant les migrations: on les rejoue
+        upgrade(echo=print)
         print("✓ Tables created successfully")
     
     @app.cli.command("reset-db")
@@ -19,7 +40,58 @@ def register_cli(app):
         """Drop all tables and recreate them."""
         db.drop_all()
         db.create_all()
+        stamp()
         print("✓ Database reset successfully")
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Apply pending schema migrations (tables, columns, indexes)."""
+        done = upgrade(echo=print)
+        print(f"✓ Database up to date ({len(done)} migration(s) applied)")
+
+    @app.cli.command("db-status")
+    def db_status():
+        """List schema migrations and whether they are applied."""
+        applied = applied_versions()
+        for m in MIGRATIONS:
+            print(f"  [{'x' if m.version in applied else ' '}] {m.version:04d} {m.name}")
+
+    @app.cli.command("explain")
+    @click.argument("routes", nargs=-1)
+    def explain_cmd(routes):
+        """Print the query plan of each route's main query (optionally only ROUTES, by prefix)."""
+        scans = 0
+        for name, stmt in route_queries():
+            if routes and not any(name.startswith(r) for r in routes):
+                continue
+            print(f"\n{name}")
+            for line, full_scan in explain(stmt):
+                scans += full_scan
+                print(f"  {'!' if full_scan else ' '} {line}")
+        print(f"\n{scans} full table scan(s) (!)")
+
+    @app.cli.command("backfill-schedule")
+    def backfill_schedule():
+        """Recompute day_index/start_minute/end_minute from the text schedule columns."""
+        counts = backfill_schedule_columns()
+        invalidate_all_plannings()
+        db.session.commit()
+        print(f"✓ Schedule columns backfilled ({counts})")
+
+    @app.cli.command("reindex-search")
+    def reindex_search():
+        """Rebuild the course catalog search index."""
+        total = rebuild_index()
+        db.session.commit()
+        print(f"✓ Search index rebuilt ({total} terms)")
+
+    @app.cli.command("rebuild-stats")
+    def rebuild_stats():
+        """Recompute the per-course enrollment/feedback statistics."""
+        total = rebuild_course_stats()
+        invalidate_courses()
+        db.session.commit()
+        print(f"✓ Course statistics rebuilt ({total} courses)")
     
     @app.cli.command("seed-db")
     def seed_db():
@@ -29,6 +101,9 @@ def register_cli(app):
         # Clear existing data
         print("Clearing existing data...")
         Enrollment.query.delete()
+        CourseStats.query.delete()
+        CourseSearchTerm.query.delete()
+        CourseFingerprint.query.delete()
         Course.query.delete()
         Student.query.delete()
         Professor.query.delete()
@@ -41,24 +116,24 @@ def register_cli(app):
         student1_user = User(
             username='alice',
             email='alice@student.unige.ch',
-            password_hash=generate_password_hash('password123')
+            password_hash=hash_password('password123')
         )
         student2_user = User(
             username='bob',
             email='bob@student.unige.ch',
-            password_hash=generate_password_hash('password123')
+            password_hash=hash_password('password123')
         )
         
         # Professor users
         prof1_user = User(
             username='prof_smith',
             email='smith@unige.ch',
-            password_hash=generate_password_hash('password123')
+            password_hash=hash_password('password123')
         )
         prof2_user = User(
             username='prof_jones',
             email='jones@unige.ch',
-            password_hash=generate_password_hash('password123')
+            password_hash=hash_password('password123')
         )
         
         db.session.add_all([student1_user, student2_user, prof1_user, prof2_user])
@@ -148,6 +223,8 @@ def register_cli(app):
         )
         
         db.session.add_all([course1, course2, course3, course4])
+        db.session.flush()
+        index_courses([course1, course2, course3, course4])
         db.session.commit()
         
         # Create enrollments with some completed with feedback
@@ -185,6 +262,11 @@ def register_cli(app):
         )
         
         db.session.add_all([enrollment1, enrollment2, enrollment3, enrollment4])
+        db.session.flush()
+        rebuild_course_stats()
+        invalidate_reference()
+        invalidate_courses()
+        invalidate_all_plannings()
         db.session.commit()
         
         print("\n✓ Database seeded successfully!")
@@ -192,77 +274,56 @@ def register_cli(app):
         print("  Students: alice/bob (password: password123)")
         print("  Professors: prof_smith/prof_jones (password: password123)")
     
-    DAY_MAP = {
-        "Monday": "Lundi",
-        "Tuesday": "Mardi",
-        "Wednesday": "Mercredi",
-        "Thursday": "Jeudi",
-        "Friday": "Vendredi",
-        "Saturday": "Samedi",
-        "Sunday": "Dimanche",
-    }
-
-    SEMESTER_MAP = {
-        "Automne": "Fall",
-        "Printemps": "Spring",
-        "Annuel": "Annual",
-    }
-
-    def _hour_to_str(h):
-        if h is None:
-            return None
-        try:
-            return f"{int(h):02d}:00"
-        except (ValueError, TypeError):
-            return None
-
-    def _credits_to_int(c):
-        # Course.credits est int dans ta DB ; JSON est float.
-        if c is None:
-            return 0
-        try:
-            return int(round(float(c)))
-        except (ValueError, TypeError):
-            return 0
+    @app.cli.command("import-students")
+    @click.argument("csv_path")
+    @click.option("--password", "default_password", default="ChangeMe123!", show_default=True, help="Mot de passe des lignes sans colonne password.")
+    @click.option("--delimiter", default=",", show_default=True)
+    @click.option("--batch-size", default=1000, show_default=True, help="Lignes validées, hachées et commitées ensemble.")
+    @click.option("--hash-workers", default=None, type=int, help="Processus pour hacher les mots de passe (défaut: nombre de CPU).")
+    @click.option("--reuse-hash", is_flag=True, help="Hache le mot de passe par défaut une seule fois pour tous les comptes.")
+    @click.option("--errors", "errors_path", default=None, help="Fichier CSV des lignes refusées (défaut: <csv>.errors.csv).")
+    def import_students_cmd(csv_path, default_password, delimiter, batch_size, hash_workers, reuse_hash, errors_path):
+        """
+        Crée les comptes étudiants (User + Student) d'un CSV:
+        username, email, matricule, first_name, last_name[, password].
 
-    def _plan_credits_decimal(x):
-        # listStudyPlan[].planCredits est string/null dans ton JSON
-        if x is None:
-            return None
-        s = str(x).strip()
-        if not s:
-            return None
+        Les lignes invalides ou en doublon sont écrites dans le fichier
+        d'erreurs avec leur motif; les autres sont importées (un commit par lot).
+        """
+        importer = StudentImporter(
+            default_password,
+            chunk_size=batch_size,
+            hash_workers=hash_workers,
+            reuse_hash=reuse_hash,
+        )
         try:
-            return Decimal(s)
-        except (InvalidOperation, ValueError):
-            return None
-
-    def _build_description(obj: dict):
-        parts = []
-        if obj.get("objective"):
-            parts.append(str(obj["objective"]).strip())
-        if obj.get("description"):
-            parts.append(str(obj["description"]).strip())
-        txt = "\n\n".join([p for p in parts if p])
-        return txt or None
-
-    def _normalize_day(day):
-        if not day:
-            return None
-        day = str(day).strip()
-        return DAY_MAP.get(day, day)  
-
-    def _normalize_semester(periodicity):
-        if not periodicity:
-            return None
-        p = str(periodicity).strip()
-        return SEMESTER_MAP.get(p, p)
+            with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+                for i, batch in enumerate(batched(iter_csv_rows(f, delimiter), batch_size), start=1):
+                    importer.add_batch(batch)
+                    click.echo(f"  batch {i}: {importer.records} lignes, {importer.created} comptes créés, {len(importer.errors)} erreurs")
+        except CsvFormatError as e:
+            # Lots précédents déjà commités; seules les erreurs de format du fichier sont résumées
+            db.session.rollback()
+            raise click.ClickException(str(e))
+
+        report = importer.finish()
+        if importer.errors:
+            errors_path = errors_path or f"{csv_path}.errors.csv"
+            importer.write_errors(errors_path)
+            report["errors_file"] = errors_path
+        click.echo(report)
 
     @app.cli.command("seed-from-json")
     @click.argument("json_path")
     @click.option("--password", "default_password", default="ChangeMe123!", show_default=True)
     @click.option("--wipe", is_flag=True, help="Supprime courses + liens + study plans + faculties + profs seed (dangereux).")
-    def seed_from_json_cmd(json_path, default_password, wipe):
+    @click.option("--chunk-size", default=1000, show_default=True, help="Nombre de lignes par INSERT/UPDATE groupé.")
+    @click.option("--stream", is_flag=True, help="Lit courses[] au fil de l'eau (gros fichiers, plusieurs années concaténées).")
+    @click.option("--batch-size", default=1000, show_default=True, help="Nombre de cours traités par lot.")
+    @click.option("--hash-workers", default=None, type=int, help="Processus pour hacher les mots de passe (défaut: nombre de CPU).")
+    @click.option("--reuse-hash", is_flag=True, help="Hache le mot de passe par défaut une seule fois pour tous les profs créés.")
+    @click.option("--delta", is_flag=True, help="N'écrit que les cours et liens modifiés depuis le dernier import (empreintes).")
+    def seed_from_json_cmd(json_path, default_password, wipe, chunk_size, stream, batch_size, hash_workers, reuse_hash, delta):
         """
         Seed complet depuis courses.json:
         - Users+Professors (créés à partir de personId)
@@ -270,20 +331,27 @@ def register_cli(app):
         - StudyPlans (listStudyPlan)
         - Courses
         - CourseStudyPlan avec plan_credits
-        """
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        raw_courses = data.get("courses", [])
-        if not isinstance(raw_courses, list):
-            raise click.ClickException("JSON invalide: 'courses' doit être une liste.")
 
-        now = datetime.utcnow()
+        Avec --delta, les cours inchangés ne sont pas réécrits et les liens
+        disparus du flux sont supprimés.
+        """
+        if not stream:
+            with open(json_path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise click.ClickException(f"JSON invalide: {e}")
 
+            raw_courses = data.get("courses", [])
+            if not isinstance(raw_courses, list):
+                raise click.ClickException("JSON invalide: 'courses' doit être une liste.")
 
         if wipe:
-            click.echo("Wiping tables: course_study_plan, course, study_plan, faculty, professor, user(profs only)...")
+            click.echo("Wiping tables: course_study_plan, course_search_term, course_stats, course_fingerprint, course, study_plan, faculty, professor, user(profs only)...")
             CourseStudyPlan.query.delete()
+            CourseSearchTerm.query.delete()
+            CourseStats.query.delete()
+            CourseFingerprint.query.delete()
             Course.query.delete()
             StudyPlan.query.delete()
             Faculty.query.delete()
@@ -292,172 +360,47 @@ def register_cli(app):
             Professor.query.delete()
             if prof_user_ids:
                 User.query.filter(User.id.in_(prof_user_ids)).delete(synchronize_session=False)
+            invalidate_reference()
+            invalidate_courses()
+            invalidate_all_plannings()
             db.session.commit()
 
-
-        prof_payload = {}
-        for c in raw_courses:
-            pid = c.get("personId")
-            if pid and str(pid).isdigit():
-                pid = int(pid)
-                if pid not in prof_payload:
-                    prof_payload[pid] = {
-                        "first_name": (c.get("displayFirstName") or "Unknown").strip() or "Unknown",
-                        "last_name": (c.get("displayLastName") or "Unknown").strip() or "Unknown",
-                        "department": (c.get("facultyLabel") or "Unknown").strip() or "Unknown",
-                    }
-
-  
-        PLACEHOLDER_PID = 0
-        prof_payload.setdefault(PLACEHOLDER_PID, {"first_name": "TBD", "last_name": "TBD", "department": "Unknown"})
-
-        created_users = created_profs = 0
-        professor_by_pid = {}
-
-        for pid, p in prof_payload.items():
-            username = f"prof_{pid}"
-            email = f"{username}@unige.local"
-
-            user = User.query.filter((User.username == username) | (User.email == email)).first()
-            if user is None:
-                user = User(
-                    username=username,
-                    email=email,
-                    password_hash=generate_password_hash(default_password),
-                    created_at=now,
-                )
-                db.session.add(user)
-                db.session.flush()
-                created_users += 1
-
-            prof = Professor.query.filter_by(user_id=user.id).first()
-            if prof is None:
-                prof = Professor(
-                    user_id=user.id,
-                    first_name=p["first_name"],
-                    last_name=p["last_name"],
-                    department=p["department"],
-                )
-                db.session.add(prof)
-                created_profs += 1
-            else:
-                # update soft
-                prof.first_name = p["first_name"]
-                prof.last_name = p["last_name"]
-                prof.department = p["department"]
-
-            professor_by_pid[pid] = prof
-
-        db.session.commit()
-        placeholder_prof = professor_by_pid[PLACEHOLDER_PID]
-
-        faculty_by_external = {f.external_id: f for f in Faculty.query.all()}
-
-        studyplan_by_external = {sp.external_id: sp for sp in StudyPlan.query.filter(StudyPlan.external_id.isnot(None)).all()}
-        studyplan_by_label = {sp.label: sp for sp in StudyPlan.query.all()}
-
-        inserted_courses = updated_courses = 0
-        link_inserted = link_updated = 0
-
-        codes = [c.get("code") for c in raw_courses if c.get("code")]
-        existing_courses = Course.query.filter(Course.code.in_(codes)).all()
-        course_by_code = {cc.code: cc for cc in existing_courses}
-
-        for c in raw_courses:
-            code = c.get("code")
-            title = c.get("title")
-            if not code or not title:
-                continue
-
-            # Faculty
-            faculty_ext = str(c.get("facultyId") or "").strip()
-            faculty_label = (c.get("facultyLabel") or "").strip()
-            faculty_id = None
-            if faculty_ext and faculty_label:
-                fac = faculty_by_external.get(faculty_ext)
-                if fac is None:
-                    fac = Faculty(external_id=faculty_ext, name=faculty_label)
-                    db.session.add(fac)
-                    db.session.flush()
-                    faculty_by_external[faculty_ext] = fac
-                faculty_id = fac.id
-
-            # Professor
-            pid = c.get("personId")
-            if pid and str(pid).isdigit():
-                prof = professor_by_pid.get(int(pid), placeholder_prof)
+        importer = CourseImporter(
+            default_password,
+            chunk_size=chunk_size,
+            hash_workers=hash_workers,
+            reuse_hash=reuse_hash,
+            delta=delta,
+        )
+        try:
+            if stream:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    for i, batch in enumerate(batched(iter_json_courses(f), batch_size), start=1):
+                        importer.add_batch(batch)
+                        click.echo(f"  batch {i}: {importer.records} courses, {_peak_memory_mb()} MB peak")
             else:
-                prof = placeholder_prof
-
-            payload = dict(
-                code=str(code)[:20],
-                name=str(title)[:200],
-                description=_build_description(c),
-                credits=_credits_to_int(c.get("credits")),
-                professor_id=prof.id,
-                created_at=now,
-                day_of_week=_normalize_day(c.get("day")),
-                start_time=_hour_to_str(c.get("startHour")),
-                end_time=_hour_to_str(c.get("endHour")),
-                semester=_normalize_semester(c.get("periodicity")),
-                academical_year=str(c.get("academicalYear") or "").strip() or None,
-                faculty_id=faculty_id,
+                for batch in batched(raw_courses, batch_size):
+                    importer.add_batch(batch)
+            report = importer.finish()
+            db.session.commit()
+        except FeedFormatError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        except Exception:
+            db.session.rollback()
+            raise
+
+        report["records_per_sec"] = round(importer.records / report["seconds"]) if report["seconds"] else None
+        report["peak_memory_mb"] = _peak_memory_mb()
+        click.echo(report)
+
+        if delta:
+            changed = importer.changed_codes
+            written = report["courses_inserted"] + report["courses_updated"]
+            click.echo(
+                f"Delta: {report['courses_inserted']} cours ajoutés, {report['courses_updated']} modifiés, "
+                f"{report['courses_unchanged']} inchangés ; liens +{report['course_plan_links_inserted']} "
+                f"~{report['course_plan_links_updated']} -{report['course_plan_links_deleted']}"
             )
-
-            obj = course_by_code.get(payload["code"])
-            if obj is None:
-                obj = Course(**payload)
-                db.session.add(obj)
-                db.session.flush()  # obj.id pour liens
-                course_by_code[obj.code] = obj
-                inserted_courses += 1
-            else:
-                for k, v in payload.items():
-                    setattr(obj, k, v)
-                db.session.flush()
-                updated_courses += 1
-
-            # Associations StudyPlan (listStudyPlan)
-            list_plans = c.get("listStudyPlan") or []
-            for sp in list_plans:
-                ext = sp.get("studyPlanGroupId") or sp.get("studyPlanId")
-                ext = str(ext).strip() if ext is not None else None
-                label = (sp.get("studyPlanLabel") or "Unknown plan").strip()
-
-                study_plan = None
-                if ext:
-                    study_plan = studyplan_by_external.get(ext)
-                if study_plan is None:
-                    study_plan = studyplan_by_label.get(label)
-
-                if study_plan is None:
-                    study_plan = StudyPlan(external_id=ext, label=label)
-                    db.session.add(study_plan)
-                    db.session.flush()
-                    if ext:
-                        studyplan_by_external[ext] = study_plan
-                    studyplan_by_label[label] = study_plan
-
-                assoc = CourseStudyPlan.query.filter_by(course_id=obj.id, study_plan_id=study_plan.id).first()
-                if assoc is None:
-                    assoc = CourseStudyPlan(
-                        course_id=obj.id,
-                        study_plan_id=study_plan.id,
-                        plan_credits=_plan_credits_decimal(sp.get("planCredits")),
-                    )
-                    db.session.add(assoc)
-                    link_inserted += 1
-                else:
-                    assoc.plan_credits = _plan_credits_decimal(sp.get("planCredits"))
-                    link_updated += 1
-
-        db.session.commit()
-
-        click.echo({
-            "users_created": created_users,
-            "professors_created": created_profs,
-            "courses_inserted": inserted_courses,
-            "courses_updated": updated_courses,
-            "course_plan_links_inserted": link_inserted,
-            "course_plan_links_updated": link_updated,
-        })
+            if changed:
+                click.echo(f"  cours écrits: {', '.join(changed)}{' ...' if written > len(changed) else ''}")
@@ -1,5 +1,27 @@
 import os
 
+
+def _engine_options(uri):
+    """Options du moteur SQLAlchemy (pool de connexions), réglables par variables d'environnement"""
+    options = {
+        # Vérifie la connexion avant usage et la renouvelle avant que MariaDB ne la
+        # coupe (wait_timeout) : pas d'erreur "server has gone away" après une pause
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1",
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+    }
+    if not uri.startswith("sqlite"):
+        # Par processus: au plus DB_POOL_SIZE + DB_MAX_OVERFLOW connexions
+        options.update(
+            pool_size=int(os.environ.get("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "5")),
+            pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        )
+    return options
+
+
+_REPLICA_URIS = [u.strip() for u in os.environ.get("DATABASE_REPLICA_URIS", "").split(",") if u.strip()]
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret") #cookie key
     SQLALCHEMY_DATABASE_URI = os.environ.get( 
@@ -7,3 +29,57 @@ class Config:
         "mysql+pymysql://app_user:app_password@db:3306/app_db"
     ) #connection to db information
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Réplicas en lecture seule (routing.py), séparés par des virgules; les vues
+    # @read_only y lisent, sauf pendant REPLICA_STICKY_SECONDS après une écriture
+    DB_REPLICAS = [f"replica{i}" for i, _ in enumerate(_REPLICA_URIS)]
+    SQLALCHEMY_BINDS = dict(zip(DB_REPLICAS, _REPLICA_URIS))
+    REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+
+    # Coût du hachage des mots de passe, au format de méthode werkzeug:
+    # "scrypt" (= scrypt:32768:8:1), "scrypt:16384:8:1", "pbkdf2:sha256:600000", ...
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+
+    # Durée (s) pendant laquelle le nombre de résultats d'un filtre du catalogue
+    # est réutilisé entre les pages ; 0 = COUNT exact à chaque requête
+    CATALOG_COUNT_TTL = int(os.environ.get("CATALOG_COUNT_TTL", "60"))
+
+    # Catalogue et fiches de cours (httpcache.py): ETag/Last-Modified et 304 ;
+    # PAGE_CACHE_TTL > 0 garde aussi en mémoire le rendu des pages anonymes (s)
+    HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE_ENABLED", "1") == "1"
+    PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", "0"))
+
+    # Plannings calculés gardés par utilisateur (planning.py). Backend partagé
+    # optionnel: "module:fabrique" (get/delete/clear comme cache.TTLCache)
+    PLANNING_CACHE_BACKEND = os.environ.get("PLANNING_CACHE_BACKEND", "")
+    PLANNING_CACHE_SIZE = int(os.environ.get("PLANNING_CACHE_SIZE", "2000"))
+    PLANNING_CACHE_TTL = int(os.environ.get("PLANNING_CACHE_TTL", "300"))
+    PLANNING_CACHE_CHECK = int(os.environ.get("PLANNING_CACHE_CHECK", "5"))  # relecture de la version globale (s)
+
+    # Vérification des mots de passe à la connexion (passwords.py): au plus
+    # PASSWORD_VERIFY_WORKERS calculs en parallèle (0 = nombre de CPU) et
+    # PASSWORD_VERIFY_QUEUE en attente, au-delà la connexion répond 503
+    PASSWORD_VERIFY_WORKERS = int(os.environ.get("PASSWORD_VERIFY_WORKERS", "0"))
+    PASSWORD_VERIFY_QUEUE = int(os.environ.get("PASSWORD_VERIFY_QUEUE", "16"))
+    PASSWORD_VERIFY_TIMEOUT = float(os.environ.get("PASSWORD_VERIFY_TIMEOUT", "5"))  # attente max (s)
+
+    # Tentatives de connexion par seau à jetons (throttle.py): "rafale/période en s", "0" = pas de limite
+    LOGIN_THROTTLE_ACCOUNT = os.environ.get("LOGIN_THROTTLE_ACCOUNT", "10/300")
+    LOGIN_THROTTLE_IP = os.environ.get("LOGIN_THROTTLE_IP", "30/60")
+    LOGIN_THROTTLE_BACKEND = os.environ.get("LOGIN_THROTTLE_BACKEND", "")  # "module:fabrique" (take comme TokenBuckets)
+
+    # Identité de l'utilisateur connecté gardée par processus (identity.py), en secondes
+    IDENTITY_CACHE_TTL = int(os.environ.get("IDENTITY_CACHE_TTL", "30"))
+
+    # Liste des inscrits d'un cours (roster.py): étudiants par page, lignes lues par lot à l'export
+    ROSTER_PER_PAGE = int(os.environ.get("ROSTER_PER_PAGE", "50"))
+    ROSTER_EXPORT_CHUNK = int(os.environ.get("ROSTER_EXPORT_CHUNK", "500"))
+
+    # Profilage par requête (profiling.py): nombre de requêtes SQL, temps base et
+    # rendu par endpoint, exposés sur /metrics (format Prometheus)
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "1") == "1"
+    PROFILING_HEADER = os.environ.get("PROFILING_HEADER", "0") == "1"      # en-têtes Server-Timing / X-DB-Queries
+    PROFILING_N_PLUS_ONE = int(os.environ.get("PROFILING_N_PLUS_ONE", "10"))  # même requête répétée > N fois
+    PROFILING_SLOW_QUERY_MS = float(os.environ.get("PROFILING_SLOW_QUERY_MS", "200"))
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # Authorization: Bearer <token>; sans jeton, /metrics répond 403 (sauf en debug)
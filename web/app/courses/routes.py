@@ -1,24 +1,42 @@
-﻿from flask import render_template, redirect, url_for, flash, request
+﻿from flask import render_template, redirect, url_for, flash, request, jsonify, current_app, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
 
 from . import courses_bp
 from ..extensions import db
-from ..models import Course, Faculty, StudyPlan, CourseStudyPlan, Professor, Student, Enrollment, Activity
-
-
-@courses_bp.route('/')
-def catalog():
-    q = (request.args.get("q") or "").strip()
-    faculty_ext = (request.args.get("faculty") or "").strip()  # ex: "23"
-    plan_ext = (request.args.get("plan") or "").strip()        # ex: studyPlanGroupId
-    plan_id = request.args.get("plan_id", type=int)            # option alternative
-    sort = (request.args.get("sort") or "code").strip()
-    page = request.args.get("page", 1, type=int)
-    per_page = 25
-
-    query = Course.query
+from ..models import Course, Faculty, StudyPlan, CourseStudyPlan, Professor, Student, Enrollment, Activity, User
+from ..search import index_courses, index_ready, search_subquery
+from ..reference import REFERENCE, faculty_choices, find_study_plans, study_plan
+from ..cache import TTLCache
+from ..pagination import keyset_paginate
+from ..routing import read_only
+from ..httpcache import COURSE_IMPORT, COURSES, conditional, course_version, invalidate_courses, not_modified, set_validators, validators
+from ..stats import record_enrollment_change, snapshot
+from ..schedule import DAYS, check_schedule_conflicts, conflict_message
+from ..planning import GRID_END_HOUR, GRID_START_HOUR, PLANNING, PX_PER_HOUR, invalidate_planning, planning_for, planning_version
+from ..ical import generate_calendar, new_calendar_token
+from ..identity import invalidate_identity
+from ..grades import apply_grades, iter_grade_rows
+from ..roster import EXPORT_FORMATS, KEYS as ROSTER_KEYS, SORT as ROSTER_SORT, STATUSES, export_rows, roster_query, status_counts
+
+
+def catalog_query(q="", faculty_ext="", plan_ext="", plan_id=None, sort="code", columns=None):
+    """Requête du catalogue filtrée, et son tri [(clé, décroissant)] terminé par le code (unique).
+
+    columns: entité projetée (ex. un Bundle de colonnes de Course) à la place des cours.
+    Retourne (query, sort effectif, keys).
+    """
+    if columns is not None:
+        query = db.session.query(columns).select_from(Course)
+    else:
+        # Relations affichées sur chaque carte, chargées en lot (stats: jointure par défaut)
+        query = Course.query.options(
+            joinedload(Course.faculty),
+            joinedload(Course.professor),
+            selectinload(Course.study_plans).joinedload(CourseStudyPlan.study_plan),
+        )
 
     # Filtre faculté (par external_id)
     if faculty_ext:
@@ -30,31 +48,61 @@ def catalog():
     elif plan_ext:
         query = query.join(CourseStudyPlan).join(StudyPlan).filter(StudyPlan.external_id == plan_ext)
 
-    # Recherche code/nom
-    if q:
+    # Recherche code/nom/description via l'index inversé
+    search = search_subquery(q) if q and index_ready() else None
+    if search is not None:
+        query = query.join(search, search.c.course_id == Course.id)
+    elif q:
+        # que des mots vides ("de", "la"...), ou index pas encore construit
+        # (flask reindex-search): filtre LIKE sur le code et le nom
         like = f"%{q}%"
         query = query.filter(or_(Course.code.ilike(like), Course.name.ilike(like)))
 
-    # Tri
-    if sort == "name":
-        query = query.order_by(Course.name.asc())
+    # Tri: [(clé, décroissant)], terminé par le code (unique) pour la pagination par clé
+    if sort == "relevance" and search is not None:
+        keys = [(search.c.score, True), (Course.code, False)]
+    elif sort == "name":
+        keys = [(Course.name, False), (Course.code, False)]
     elif sort == "credits":
-        query = query.order_by(Course.credits.desc(), Course.code.asc())
+        keys = [(Course.credits, True), (Course.code, False)]
     else:
-        query = query.order_by(Course.code.asc())
+        sort = "code"
+        keys = [(Course.code, False)]
+
+    return query, sort, keys
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
-    # pour remplir les dropdowns
-    faculties = Faculty.query.order_by(Faculty.name.asc()).all()
-    plans = StudyPlan.query.order_by(StudyPlan.label.asc()).all()
+# Nombre de résultats par combinaison de filtres (approximatif pendant CATALOG_COUNT_TTL)
+_catalog_counts = TTLCache(maxsize=512)
 
+
+@courses_bp.route('/')
+@read_only
+@conditional(lambda: [COURSES, REFERENCE])
+def catalog():
+    q = (request.args.get("q") or "").strip()
+    faculty_ext = (request.args.get("faculty") or "").strip()  # ex: "23"
+    plan_ext = (request.args.get("plan") or "").strip()        # ex: studyPlanGroupId
+    plan_id = request.args.get("plan_id", type=int)            # option alternative
+    sort = (request.args.get("sort") or ("relevance" if q else "code")).strip()
+    page = request.args.get("page", 1, type=int)
+    after = request.args.get("after")    # curseurs opaques (pagination par clé)
+    before = request.args.get("before")
+    per_page = 25
+
+    query, sort, keys = catalog_query(q, faculty_ext, plan_ext, plan_id, sort)
+
+    count_key = (q, faculty_ext, plan_ext, plan_id)
+    total = _catalog_counts.get(count_key, query.order_by(None).count, ttl=current_app.config["CATALOG_COUNT_TTL"])
+    pagination = keyset_paginate(query, sort, keys, per_page, after=after, before=before, page=page, total=total)
+
+    # Dropdowns depuis le cache de référence ; les plans sont chargés à la demande (study_plans_json)
     return render_template(
         "courses/catalog.html",
         courses=pagination.items,
         pagination=pagination,
-        faculties=faculties,
-        plans=plans,
+        faculties=faculty_choices(),
+        selected_plan=study_plan(plan_id) if plan_id else None,
         filters={
             "q": q,
             "faculty": faculty_ext,
@@ -65,19 +113,136 @@ def catalog():
     )
 
 
+@courses_bp.route('/study-plans.json')
+@read_only
+def study_plans_json():
+    """Plans d'étude pour le filtre du catalogue (?faculty=<external_id>&q=<texte>)"""
+    faculty_ext = (request.args.get("faculty") or "").strip()
+    q = (request.args.get("q") or "").strip()
+    return jsonify(plans=find_study_plans(faculty_ext or None, q or None))
+
+
 @courses_bp.route('/<int:course_id>')
+@read_only
+@conditional(lambda course_id: [course_version(course_id), COURSE_IMPORT])
 def course_detail(course_id):
     course = Course.query.get_or_404(course_id)
     is_enrolled = False
-    if current_user.is_authenticated and current_user.student:
-        is_enrolled = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course_id).first() is not None
+    if current_user.is_authenticated and current_user.student_id:
+        is_enrolled = Enrollment.query.filter_by(student_id=current_user.student_id, course_id=course_id).first() is not None
     return render_template('courses/detail.html', course=course, is_enrolled=is_enrolled)
 
 
+def _own_course(course_id):
+    """Cours du professeur connecté (404 s'il n'existe pas), ou None s'il ne l'enseigne pas"""
+    course = Course.query.get_or_404(course_id)
+    if not current_user.professor_id or current_user.professor_id != course.professor_id:
+        flash('Seul le professeur du cours peut accéder à ses inscrits', 'error')
+        return None
+    return course
+
+
+@courses_bp.route('/<int:course_id>/roster')
+@read_only
+@login_required
+def roster(course_id):
+    """Inscrits du cours, par pages triées par nom, filtrables par statut"""
+    course = _own_course(course_id)
+    if course is None:
+        return redirect(url_for('courses.course_detail', course_id=course_id))
+    status = (request.args.get("status") or "").strip()
+    if status not in STATUSES:
+        status = ""
+
+    counts = status_counts(course_id)
+    total = counts.get(status, 0) if status else sum(counts.values())
+    pagination = keyset_paginate(
+        roster_query(course_id, status), ROSTER_SORT, ROSTER_KEYS, current_app.config["ROSTER_PER_PAGE"],
+        after=request.args.get("after"), before=request.args.get("before"),
+        page=request.args.get("page", 1, type=int), total=total,
+    )
+    return render_template(
+        'courses/roster.html',
+        course=course,
+        enrollments=pagination.items,
+        pagination=pagination,
+        counts=counts,
+        statuses=STATUSES,
+        status=status,
+    )
+
+
+@courses_bp.route('/<int:course_id>/roster.<fmt>')
+@read_only
+@login_required
+def roster_export(course_id, fmt):
+    """Export CSV ou TSV des inscrits (même filtre ?status= que la page), produit au fil de la lecture"""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    course = _own_course(course_id)
+    if course is None:
+        return redirect(url_for('courses.course_detail', course_id=course_id))
+    status = (request.args.get("status") or "").strip()
+    if status not in STATUSES:
+        status = ""
+
+    delimiter, mimetype = EXPORT_FORMATS[fmt]
+    filename = f"{course.code}-{status or 'inscrits'}.{fmt}"
+    rows = export_rows(course_id, status, delimiter, current_app.config["ROSTER_EXPORT_CHUNK"])
+    return Response(
+        stream_with_context(rows),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+@courses_bp.route('/<int:course_id>/grades', methods=['POST'])
+@login_required
+def submit_grades(course_id):
+    """Notes en masse: fichier CSV (matricule, grade) ou grille de la page des inscrits"""
+    course = _own_course(course_id)
+    if course is None:
+        return redirect(url_for('courses.course_detail', course_id=course_id))
+    back = redirect(url_for('courses.roster', course_id=course_id, status=request.form.get('status') or None))
+
+    upload = request.files.get('file')
+    from_file = bool(upload and upload.filename)
+    try:
+        if from_file:
+            rows = list(iter_grade_rows(upload.read().decode('utf-8-sig')))
+        else:
+            # Grille: un champ matricule et un champ grade par ligne affichée
+            rows = list(zip(range(1, len(request.form.getlist('matricule')) + 1),
+                            request.form.getlist('matricule'), request.form.getlist('grade')))
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f'Fichier refusé: {e}', 'error')
+        return back
+
+    try:
+        # Grille: un champ vidé efface la note; fichier: une cellule vide la laisse
+        summary = apply_grades(course_id, rows, clear_blank=not from_file)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erreur lors de l\'enregistrement des notes: {str(e)}', 'error')
+        return back
+
+    flash(f"{summary['applied']} note(s) enregistrée(s), {summary['unchanged']} inchangée(s)", 'success')
+    if summary['unknown']:
+        lines = ', '.join(f"ligne {line} ({matricule or 'vide'})" for line, matricule in summary['unknown'][:10])
+        more = '...' if len(summary['unknown']) > 10 else ''
+        flash(f"{len(summary['unknown'])} matricule(s) non inscrit(s) à ce cours: {lines}{more}", 'warning')
+    if summary['invalid']:
+        lines = ', '.join(f"ligne {line} ({matricule}: {reason})" for line, matricule, reason in summary['invalid'][:10])
+        more = '...' if len(summary['invalid']) > 10 else ''
+        flash(f"{len(summary['invalid'])} ligne(s) écartée(s): {lines}{more}", 'warning')
+    return back
+
+
 @courses_bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create_course():
-    if not current_user.professor:
+    if not current_user.professor_id:
         flash('Seuls les professeurs peuvent créer des cours', 'error')
         return redirect(url_for('courses.list_courses'))
     if request.method == 'POST':
@@ -92,8 +257,11 @@ def create_course():
             if Course.query.filter_by(code=code).first():
                 flash('Un cours avec ce code existe déjà', 'warning')
                 return redirect(url_for('courses.create_course'))
-            course = Course(code=code, name=name, description=description, credits=credits, professor_id=current_user.professor.id)
+            course = Course(code=code, name=name, description=description, credits=credits, professor_id=current_user.professor_id)
             db.session.add(course)
+            db.session.flush()
+            index_courses([course])
+            invalidate_courses(course.id)
             db.session.commit()
             flash(f'Cours {name} créé avec succès!', 'success')
             return redirect(url_for('courses.course_detail', course_id=course.id))
@@ -107,19 +275,26 @@ def create_course():
 @courses_bp.route('/<int:course_id>/enroll', methods=['POST'])
 @login_required
 def enroll(course_id):
-    if not current_user.student:
+    if not current_user.student_id:
         flash('Seuls les étudiants peuvent s inscrire aux cours', 'error')
         return redirect(url_for('courses.course_detail', course_id=course_id))
     course = Course.query.get_or_404(course_id)
-    existing = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course_id).first()
+    existing = Enrollment.query.filter_by(student_id=current_user.student_id, course_id=course_id).first()
     if existing:
         flash('Vous êtes déjà inscrit à ce cours', 'warning')
         return redirect(url_for('courses.course_detail', course_id=course_id))
+    conflicts = check_schedule_conflicts(current_user, course.day_of_week, course.start_time, course.end_time)
     try:
-        enrollment = Enrollment(student_id=current_user.student.id, course_id=course_id)
+        enrollment = Enrollment(student_id=current_user.student_id, course_id=course_id)
         db.session.add(enrollment)
+        db.session.flush()
+        record_enrollment_change(course_id, None, snapshot(enrollment))
+        invalidate_courses(course_id)
+        invalidate_planning(current_user.id)
         db.session.commit()
         flash(f'Inscription réussie au cours {course.name}!', 'success')
+        if conflicts:
+            flash(conflict_message(conflicts), 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'Erreur lors de l inscription: {str(e)}', 'error')
@@ -129,17 +304,22 @@ def enroll(course_id):
 @courses_bp.route('/<int:course_id>/unenroll', methods=['POST'])
 @login_required
 def unenroll(course_id):
-    if not current_user.student:
+    if not current_user.student_id:
         flash('Action non autorisée', 'error')
         return redirect(url_for('courses.course_detail', course_id=course_id))
-    enrollment = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course_id).first()
+    enrollment = Enrollment.query.filter_by(student_id=current_user.student_id, course_id=course_id).first()
     if not enrollment:
         flash('Vous n êtes pas inscrit à ce cours', 'warning')
         return redirect(url_for('courses.course_detail', course_id=course_id))
     try:
         # Save course name BEFORE deleting enrollment to avoid accessing deleted object
         course_name = enrollment.course.name
+        before = snapshot(enrollment)
         db.session.delete(enrollment)
+        db.session.flush()
+        record_enrollment_change(course_id, before, None)
+        invalidate_courses(course_id)
+        invalidate_planning(current_user.id)
         db.session.commit()
         flash(f'Désinscription du cours {course_name} réussie', 'success')
     except Exception as e:
@@ -149,129 +329,37 @@ def unenroll(course_id):
 
 
 @courses_bp.route('/my-courses')
+@read_only
 @login_required
 def my_courses():
-    if current_user.student:
-        enrollments = current_user.student.enrollments
+    if current_user.student_id:
+        enrollments = Enrollment.query.filter_by(student_id=current_user.student_id).all()
         return render_template('courses/my_enrollments.html', enrollments=enrollments)
-    elif current_user.professor:
-        courses = current_user.professor.courses
+    elif current_user.professor_id:
+        courses = Course.query.filter_by(professor_id=current_user.professor_id).all()
         return render_template('courses/my_courses.html', courses=courses)
     else:
         flash('Profil incomplet', 'warning')
         return redirect(url_for('main.menu'))
 
 
-def _time_to_minutes(t: str | None):
-    """Convertit l'heure (HH:MM) en minutes depuis 00:00"""
-    if not t:
-        return None
-    try:
-        hh, mm = t.strip().split(":")
-        return int(hh) * 60 + int(mm)
-    except Exception:
-        return None
-
 @courses_bp.route('/planning')
+@read_only
 @login_required
 def planning():
-    if not current_user.student:
+    if not current_user.student_id:
         flash('Cette page est réservée aux étudiants', 'error')
         return redirect(url_for('main.menu'))
 
-    days = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
-    schedule = {d: [] for d in days}
-
-    # Paramètres de la grille
-    GRID_START_HOUR = 6
-    GRID_END_HOUR = 23
-    PX_PER_HOUR = 64  # Hauteur d'une heure
+    schedule = planning_for(current_user.id)
     total_height = (GRID_END_HOUR - GRID_START_HOUR) * PX_PER_HOUR
-
-    # Récupérer les cours de l'étudiant
-    enrollments = Enrollment.query.filter_by(
-        student_id=current_user.student.id,
-        status='enrolled'
-    ).all()
-
-    for e in enrollments:
-        c = e.course
-        if not c.day_of_week:
-            continue
-        day = c.day_of_week.strip()
-
-        if day not in schedule:
-            continue
-
-        schedule[day].append({
-            "kind": "course",
-            "id": c.id,
-            "title": c.name,
-            "start": c.start_time,
-            "end": c.end_time,
-            "professor_full_name": f"{c.professor.first_name} {c.professor.last_name}",
-            "description": c.description,
-        })
-
-    # Récupérer les activités personnelles
-    activities = Activity.query.filter_by(user_id=current_user.id).all()
-    for a in activities:
-        day = a.day_of_week.strip()
-
-        if day not in schedule:
-            continue
-
-        schedule[day].append({
-            "kind": "activity",
-            "id": a.id,
-            "title": a.title,
-            "start": a.start_time,
-            "end": a.end_time,
-        })
-
-    # Calculer la position des événements sur la grille
-    min_start = GRID_START_HOUR * 60
-    max_end = GRID_END_HOUR * 60
-
-    for day in days:
-        positioned = []
-        for item in schedule[day]:
-            s = _time_to_minutes(item["start"])
-            e = _time_to_minutes(item["end"])
-            if s is None or e is None:
-                continue
-            if e <= s:
-                continue
-
-            # Clamp à 06:00-23:00
-            s_clamped = max(s, min_start)
-            e_clamped = min(e, max_end)
-            if e_clamped <= s_clamped:
-                continue
-
-            top = ((s_clamped - min_start) / 60) * PX_PER_HOUR
-            height = ((e_clamped - s_clamped) / 60) * PX_PER_HOUR
-
-            # Minimum visuel
-            if height < 18:
-                height = 18
-
-            item = dict(item)
-            item["top"] = round(top, 2)
-            item["height"] = round(height, 2)
-            positioned.append(item)
-
-        # Tri par heure
-        positioned.sort(key=lambda x: x["start"] or "99:99")
-        schedule[day] = positioned
-
     hours = list(range(GRID_START_HOUR, GRID_END_HOUR + 1))
 
     # Passer les données nécessaires à la page
     return render_template(
         'courses/planning.html',
         schedule=schedule,
-        days=days,
+        days=DAYS,
         hours=hours,
         grid={
             "start_hour": GRID_START_HOUR,
@@ -282,14 +370,50 @@ def planning():
     )
 
 
+@courses_bp.route('/planning/<token>.ics')
+@read_only
+def planning_ics(token):
+    """Flux iCalendar du planning, authentifié par le jeton secret de l'URL"""
+    user_id = db.session.query(User.id).filter_by(calendar_token=token).scalar()
+    if user_id is None:
+        abort(404)
+
+    # Les agendas interrogent le flux toutes les quelques minutes: 304 tant que le planning n'a pas changé
+    etag, last_modified = validators([planning_version(user_id), PLANNING], request.path)
+    if not_modified(etag, last_modified):
+        return set_validators(Response(status=304), etag, last_modified, private=True)
+
+    response = Response(
+        stream_with_context(generate_calendar(user_id, last_modified)),
+        mimetype='text/calendar',
+        headers={'Content-Disposition': 'inline; filename="unify.ics"'},
+    )
+    return set_validators(response, etag, last_modified, private=True)
+
+
+@courses_bp.route('/planning/calendar-token', methods=['POST'])
+@login_required
+def calendar_token():
+    """Crée (ou remplace) le lien secret du flux iCalendar"""
+    if not current_user.student_id:
+        flash('Cette page est réservée aux étudiants', 'error')
+        return redirect(url_for('main.menu'))
+
+    current_user.user.calendar_token = new_calendar_token()
+    invalidate_identity(current_user.id)
+    db.session.commit()
+    flash('Nouveau lien de synchronisation créé. Un ancien lien ne fonctionne plus.', 'success')
+    return redirect(url_for('courses.planning'))
+
+
 
 @courses_bp.route('/<int:course_id>/feedback', methods=['GET', 'POST'])
 @login_required
 def submit_feedback(course_id):
-    if not current_user.student:
+    if not current_user.student_id:
         flash('Seuls les étudiants peuvent soumettre des avis', 'error')
         return redirect(url_for('courses.course_detail', course_id=course_id))
-    enrollment = Enrollment.query.filter_by(student_id=current_user.student.id, course_id=course_id).first()
+    enrollment = Enrollment.query.filter_by(student_id=current_user.student_id, course_id=course_id).first()
     if not enrollment:
         flash('Vous devez être inscrit à ce cours', 'warning')
         return redirect(url_for('courses.course_detail', course_id=course_id))
@@ -301,6 +425,7 @@ def submit_feedback(course_id):
             if not status:
                 flash('Veuillez sélectionner un statut', 'warning')
                 return redirect(url_for('courses.submit_feedback', course_id=course_id))
+            before = snapshot(enrollment)
             enrollment.status = status
             if status == 'completed':
                 if weekly_hours and student_grade is not None:
@@ -310,6 +435,10 @@ def submit_feedback(course_id):
                 else:
                     flash('Veuillez renseigner les heures hebdomadaires et votre note', 'warning')
                     return redirect(url_for('courses.submit_feedback', course_id=course_id))
+            db.session.flush()
+            record_enrollment_change(course_id, before, snapshot(enrollment))
+            invalidate_courses(course_id)
+            invalidate_planning(current_user.id)
             db.session.commit()
             flash('Merci pour votre retour!', 'success')
             return redirect(url_for('courses.my_courses'))
@@ -338,11 +467,16 @@ def create_activity():
         flash("Merci de remplir tous les champs.", "error")
         return redirect(url_for("courses.new_activity"))
 
+    conflicts = check_schedule_conflicts(current_user, day, start, end)
+
     a = Activity(user_id=current_user.id, title=title, day_of_week=day, start_time=start, end_time=end)
     db.session.add(a)
+    invalidate_planning(current_user.id)
     db.session.commit()
 
     flash("Activité ajoutée !", "success")
+    if conflicts:
+        flash(conflict_message(conflicts), "warning")
     return redirect(url_for("courses.planning"))
 
 
@@ -367,14 +501,19 @@ def edit_activity(activity_id):
             flash("Merci de remplir tous les champs obligatoires.", "error")
             return render_template("courses/activity_edit.html", activity=activity)
         
+        conflicts = check_schedule_conflicts(current_user, day, start, end, exclude=("activity", activity.id))
+
         try:
             activity.title = title
             activity.day_of_week = day
             activity.start_time = start
             activity.end_time = end
             activity.description = description if description else None
+            invalidate_planning(current_user.id)
             db.session.commit()
             flash("Activité modifiée avec succès !", "success")
+            if conflicts:
+                flash(conflict_message(conflicts), "warning")
             return redirect(url_for("courses.planning"))
         except Exception as e:
             db.session.rollback()
@@ -397,6 +536,7 @@ def delete_activity(activity_id):
     try:
         activity_title = activity.title
         db.session.delete(activity)
+        invalidate_planning(current_user.id)
         db.session.commit()
         flash(f"Activité '{activity_title}' supprimée avec succès", "success")
     except Exception as e:
@@ -1,102 +1,71 @@
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, with_expression
 from datetime import datetime, date
 
 from . import events_bp
 from ..extensions import db
-from ..models import Event, EventParticipant, Activity, Enrollment
+from ..models import Event, EventParticipant
+from ..planning import invalidate_planning
+from ..routing import read_only
+from ..schedule import check_schedule_conflicts, conflict_message
 
 
-def _time_to_minutes(t: str | None):
-    """Convert time (HH:MM) to minutes since 00:00"""
-    if not t:
-        return None
-    try:
-        hh, mm = t.strip().split(":")
-        return int(hh) * 60 + int(mm)
-    except Exception:
-        return None
-
-
-def _times_overlap(start1, end1, start2, end2):
-    """Check if two time ranges overlap"""
-    s1 = _time_to_minutes(start1)
-    e1 = _time_to_minutes(end1)
-    s2 = _time_to_minutes(start2)
-    e2 = _time_to_minutes(end2)
-    
-    if any(x is None for x in [s1, e1, s2, e2]):
-        return False
-    
-    # Overlap if: start1 < end2 AND start2 < end1
-    return s1 < e2 and s2 < e1
-
+def public_events_query(category='', sort='date', columns=None):
+    """Public events with their participant count, filtered and sorted as in list_events
 
-def check_schedule_conflicts(user, day, start_time, end_time):
-    """Check for scheduling conflicts with courses, activities, and events"""
-    conflicts = []
+    columns: optional function of the participant count expression returning the
+    entity to select (e.g. a Bundle of Event columns) instead of Event objects.
+    """
+    # Participant counts aggregated once, joined to the events of the page
+    counts = (
+        select(EventParticipant.event_id, func.count(EventParticipant.id).label('total'))
+        .group_by(EventParticipant.event_id)
+        .subquery()
+    )
+    participant_count = func.coalesce(counts.c.total, 0)
     
-    # Check courses (enrolled students only)
-    if hasattr(user, 'student') and user.student:
-        enrollments = Enrollment.query.filter_by(
-            student_id=user.student.id, 
-            status='enrolled'
-        ).all()
-        
-        for e in enrollments:
-            c = e.course
-            if c.day_of_week == day and _times_overlap(start_time, end_time, c.start_time, c.end_time):
-                conflicts.append({
-                    'type': 'Cours',
-                    'title': c.name,
-                    'time': f"{c.start_time} - {c.end_time}"
-                })
+    if columns is not None:
+        query = db.session.query(columns(participant_count)).select_from(Event)
+    else:
+        query = Event.query.options(
+            joinedload(Event.creator),
+            with_expression(Event.loaded_participant_count, participant_count),
+        )
+    query = (
+        query
+        .filter_by(is_public=True)
+        .outerjoin(counts, counts.c.event_id == Event.id)
+    )
     
-    # Check personal activities
-    activities = Activity.query.filter_by(user_id=user.id).all()
-    for a in activities:
-        if a.day_of_week == day and _times_overlap(start_time, end_time, a.start_time, a.end_time):
-            conflicts.append({
-                'type': 'Activité',
-                'title': a.title,
-                'time': f"{a.start_time} - {a.end_time}"
-            })
+    # Filter by category
+    if category:
+        query = query.filter(Event.category == category)
     
-    # Check other joined events
-    participations = EventParticipant.query.filter_by(user_id=user.id).all()
-    for p in participations:
-        ev = p.event
-        if ev.day_of_week == day and _times_overlap(start_time, end_time, ev.start_time, ev.end_time):
-            conflicts.append({
-                'type': 'Événement',
-                'title': ev.title,
-                'time': f"{ev.start_time} - {ev.end_time}"
-            })
+    # Sort (Event.id keeps the order stable between pages)
+    if sort == 'popularity':
+        query = query.order_by(participant_count.desc(), Event.created_at.desc(), Event.id.desc())
+    elif sort == 'recent':
+        query = query.order_by(Event.created_at.desc(), Event.id.desc())
+    else:  # date
+        query = query.order_by(Event.day_index, Event.start_minute, Event.id)
     
-    return conflicts
+    return query
 
 
 @events_bp.route('/')
+@read_only
 def list_events():
     """List all public events"""
     category_filter = request.args.get('category', '').strip()
     sort = request.args.get('sort', 'date').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = 24
     
-    query = Event.query.filter_by(is_public=True)
+    query = public_events_query(category_filter, sort)
     
-    # Filter by category
-    if category_filter:
-        query = query.filter_by(category=category_filter)
-    
-    # Sort
-    if sort == 'popularity':
-        # This is simplified - in production would use a subquery
-        events = query.all()
-        events.sort(key=lambda x: x.participant_count, reverse=True)
-    elif sort == 'recent':
-        events = query.order_by(Event.created_at.desc()).all()
-    else:  # date
-        events = query.order_by(Event.day_of_week, Event.start_time).all()
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     categories = [
         {'value': 'study', 'label': '📚 Révisions / Étude'},
@@ -110,7 +79,8 @@ def list_events():
     
     return render_template(
         'events/list.html',
-        events=events,
+        events=pagination.items,
+        pagination=pagination,
         categories=categories,
         current_category=category_filter,
         current_sort=sort
@@ -174,6 +144,7 @@ def create_event():
 
 
 @events_bp.route('/<int:event_id>')
+@read_only
 def event_detail(event_id):
     """Show event details"""
     event = Event.query.get_or_404(event_id)
@@ -228,11 +199,16 @@ def join_event(event_id):
         flash('Cet événement est complet', 'warning')
         return redirect(url_for('events.event_detail', event_id=event_id))
     
+    conflicts = check_schedule_conflicts(current_user, event.day_of_week, event.start_time, event.end_time)
+    
     try:
         participant = EventParticipant(event_id=event_id, user_id=current_user.id)
         db.session.add(participant)
+        invalidate_planning(current_user.id)
         db.session.commit()
         flash(f'Vous participez maintenant à "{event.title}" !', 'success')
+        if conflicts:
+            flash(conflict_message(conflicts), 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'Erreur: {str(e)}', 'error')
@@ -256,6 +232,7 @@ def leave_event(event_id):
     try:
         event_title = participant.event.title
         db.session.delete(participant)
+        invalidate_planning(current_user.id)
         db.session.commit()
         flash(f'Vous ne participez plus à "{event_title}"', 'info')
     except Exception as e:
@@ -277,7 +254,12 @@ def delete_event(event_id):
     
     try:
         event_title = event.title
+        participant_ids = db.session.scalars(
+            select(EventParticipant.user_id).where(EventParticipant.event_id == event_id)
+        ).all()
         db.session.delete(event)
+        # Seuls les plannings des participants changent
+        invalidate_planning(*participant_ids)
         db.session.commit()
         flash(f'Événement "{event_title}" supprimé', 'success')
     except Exception as e:
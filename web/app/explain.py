@@ -0,0 +1,90 @@
+from sqlalchemy import select
+
+from .extensions import db
+from .models import Course, Enrollment, Event, EventParticipant, Faculty, StudyPlan, Student
+from .planning import planning_statements
+from .schedule import _timetable_query
+
+
+def _first(column):
+    return db.session.scalar(select(column).order_by(column).limit(1))
+
+
+def route_queries():
+    """[(nom, requête)] : la requête principale de chaque route, avec des valeurs prises dans la base"""
+    from .courses.routes import catalog_query
+    from .events.routes import public_events_query
+
+    student_id = _first(Student.id) or 1
+    user_id = db.session.scalar(select(Student.user_id).where(Student.id == student_id)) or 1
+    course_id = _first(Course.id) or 1
+    professor_id = db.session.scalar(select(Course.professor_id).where(Course.id == course_id)) or 1
+    event_id = _first(Event.id) or 1
+    faculty_ext = _first(Faculty.external_id) or ""
+    plan_id = _first(StudyPlan.id)
+
+    def page(query, keys):
+        return query.order_by(*[e.desc() if d else e.asc() for e, d in keys]).limit(25).statement
+
+    queries = []
+    for label, kwargs in (
+        ("code", {}),
+        ("sort=name", {"sort": "name"}),
+        ("sort=credits", {"sort": "credits"}),
+        ("faculty", {"faculty_ext": faculty_ext}),
+        ("plan_id", {"plan_id": plan_id}),
+        ("q", {"q": "introduction histoire", "sort": "relevance"}),
+    ):
+        query, _, keys = catalog_query(**kwargs)
+        queries.append((f"courses.catalog [{label}]", page(query, keys)))
+    queries += [
+        ("courses.course_detail", Course.query.filter_by(id=course_id).statement),
+        ("courses.course_detail [enrollment]",
+         Enrollment.query.filter_by(student_id=student_id, course_id=course_id).statement),
+        ("courses.my_courses [student]", Enrollment.query.filter_by(student_id=student_id).statement),
+        ("courses.my_courses [professor]", Course.query.filter_by(professor_id=professor_id).statement),
+        *zip(("courses.planning [courses]", "courses.planning [activities]", "courses.planning [events]"),
+             planning_statements(user_id)),
+        ("schedule.check_schedule_conflicts", _timetable_query(user_id, 0, 600, 720)),
+    ]
+    for sort in ("date", "recent", "popularity"):
+        queries.append((f"events.list_events [{sort}]", public_events_query("", sort).limit(24).statement))
+    queries += [
+        ("events.list_events [category]", public_events_query("sport", "recent").limit(24).statement),
+        ("events.event_detail [participant]",
+         EventParticipant.query.filter_by(event_id=event_id, user_id=user_id).statement),
+        ("events.my_events", EventParticipant.query.filter_by(user_id=user_id).statement),
+    ]
+    return queries
+
+
+def explain(stmt):
+    """Plan d'exécution d'une requête: [(ligne, parcours complet ?)]"""
+    conn = db.session.connection()
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[k] for k in compiled.positiontup)
+
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+        depth = {0: -1}
+        subqueries = {d.split()[-1] for _, _, _, d in rows if d.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            full_scan = (
+                detail.startswith("SCAN ") and " USING " not in detail
+                and detail.split()[1] not in subqueries
+            )
+            lines.append(("  " * depth[node_id] + detail, full_scan))
+        return lines
+
+    result = conn.exec_driver_sql("EXPLAIN " + str(compiled), params)
+    keys = list(result.keys())
+    lines = []
+    for row in result:
+        info = dict(zip(keys, row))
+        full_scan = str(info.get("type", "")).upper() == "ALL"
+        lines.append((", ".join(f"{k}={v}" for k, v in info.items() if v is not None), full_scan))
+    return lines
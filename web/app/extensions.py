@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from .routing import RoutingSession
 
-db = SQLAlchemy() # variable for SQLAlchemy
+db = SQLAlchemy(session_options={"class_": RoutingSession}) # variable for SQLAlchemy (lectures sur réplica: routing.py)
 login_manager = LoginManager() # variable for Login_Manager
 login_manager.login_view = "auth.login" #login route name
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Saisie des notes d'un cours en masse (Enrollment.grade, sur 20).
+
+Les notes arrivent par (matricule, note): fichier CSV ou grille de la page des
+inscrits. Les inscriptions du cours sont lues en une requête (matricule -> id,
+note actuelle), les lignes sont validées en mémoire, puis seules les notes
+modifiées sont écrites: un UPDATE ... CASE id par lot de UPDATE_CHUNK
+inscriptions, le tout dans la transaction de l'appelant.
+"""
+import csv
+import io
+
+from sqlalchemy import case, select, update
+
+from .extensions import db
+from .importer import _chunks
+from .models import Enrollment, Student
+
+MAX_GRADE = 20
+UPDATE_CHUNK = 1000
+DELIMITERS = ",;\t"
+
+
+def parse_grade(value):
+    """Note entre 0 et MAX_GRADE ("12.5" ou "12,5"), None si vide; ValueError sinon"""
+    text = (value or "").strip()
+    if not text:
+        return None
+    try:
+        grade = float(text.replace(",", "."))
+    except ValueError:
+        raise ValueError(f"note illisible: {text}") from None
+    if not 0 <= grade <= MAX_GRADE:
+        raise ValueError(f"note hors de l'intervalle 0-{MAX_GRADE}")
+    return grade
+
+
+def iter_grade_rows(text):
+    """(numéro de ligne, matricule, note brute) d'un CSV à en-tête matricule, grade
+
+    Le séparateur (virgule, point-virgule ou tabulation) est déduit de l'en-tête.
+    """
+    header = text.split("\n", 1)[0]
+    delimiter = max(DELIMITERS, key=header.count)
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    fieldnames = [f.strip().lower() for f in reader.fieldnames or []]
+    missing = [f for f in ("matricule", "grade") if f not in fieldnames]
+    if missing:
+        raise ValueError(f"CSV invalide: colonnes manquantes: {', '.join(missing)}")
+    reader.fieldnames = fieldnames
+    for row in reader:
+        yield reader.line_num, row["matricule"], row["grade"]
+
+
+def apply_grades(course_id, rows, clear_blank=False):
+    """Applique les notes de rows [(ligne, matricule, note brute)] aux inscrits du cours
+
+    Une note vide efface la note si clear_blank (grille, où chaque champ montre
+    la note actuelle), sinon la laisse telle quelle (fichier: cellule non
+    remplie). Ne valide pas la transaction. Retourne le résumé: applied,
+    unchanged, et les lignes écartées unknown (matricule non inscrit au cours) et
+    invalid (note manquante ou illisible, matricule répété) avec leur motif.
+    """
+    current = {
+        matricule: (enrollment_id, grade)
+        for matricule, enrollment_id, grade in db.session.execute(
+            select(Student.matricule, Enrollment.id, Enrollment.grade)
+            .join(Student, Student.id == Enrollment.student_id)
+            .where(Enrollment.course_id == course_id)
+        )
+    }
+
+    changes, seen = {}, set()
+    summary = {"applied": 0, "unchanged": 0, "unknown": [], "invalid": []}
+    for line, matricule, raw in rows:
+        matricule = (matricule or "").strip()
+        if matricule not in current:
+            summary["unknown"].append((line, matricule))
+            continue
+        if matricule in seen:
+            summary["invalid"].append((line, matricule, "matricule répété"))
+            continue
+        seen.add(matricule)
+        if raw is None:
+            # Ligne du fichier sans colonne grade
+            summary["invalid"].append((line, matricule, "note manquante"))
+            continue
+        if not raw.strip() and not clear_blank:
+            summary["unchanged"] += 1
+            continue
+        try:
+            grade = parse_grade(raw)
+        except ValueError as e:
+            summary["invalid"].append((line, matricule, str(e)))
+            continue
+        enrollment_id, before = current[matricule]
+        if grade == before:
+            summary["unchanged"] += 1
+        else:
+            changes[enrollment_id] = grade
+
+    ids = list(changes)
+    for chunk in _chunks(ids, UPDATE_CHUNK):
+        db.session.execute(
+            update(Enrollment)
+            .where(Enrollment.id.in_(chunk))
+            .values(grade=case({i: changes[i] for i in chunk}, value=Enrollment.id))
+            .execution_options(synchronize_session=False)
+        )
+    summary["applied"] = len(ids)
+    return summary
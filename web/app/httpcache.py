@@ -0,0 +1,111 @@
+"""
+Réponses conditionnelles (ETag / Last-Modified) calculées depuis les versions
+de données (table data_version), et cache optionnel des pages anonymes.
+
+Une vue décorée par @conditional(versions) ne lit que ses versions quand le
+navigateur renvoie l'ETag de sa copie: si rien n'a changé, la réponse est un
+304 sans requête ni rendu. Tout code qui modifie ce qu'affichent ces pages doit
+appeler invalidate_courses() dans la même transaction.
+"""
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+from .cache import TTLCache, bump_version, version_stamps
+
+COURSES = "courses"               # tout changement d'un cours ou de ses statistiques
+COURSE_IMPORT = "course-import"   # écritures en masse (seed, import)
+
+_pages = TTLCache(maxsize=256)
+_releases = {}
+
+
+def course_version(course_id):
+    """Nom de version d'un cours (inscriptions, avis, création)"""
+    return f"course:{course_id}"
+
+
+def invalidate_courses(course_id=None):
+    """À appeler par tout code qui modifie des cours ou leurs statistiques (sans commit).
+
+    Sans course_id: modification en masse, toutes les pages de cours changent.
+    """
+    bump_version(COURSES)
+    bump_version(COURSE_IMPORT if course_id is None else course_version(course_id))
+    # Les autres processus changent de clé au prochain accès; ici on libère tout de suite
+    _pages.clear()
+
+
+def _release():
+    """Empreinte du code et des templates: un déploiement change tous les ETags"""
+    root = current_app.root_path
+    if root not in _releases:
+        h = hashlib.sha1()
+        for path, _, files in sorted(os.walk(root)):
+            for name in sorted(files):
+                if name.endswith((".py", ".html")):
+                    st = os.stat(os.path.join(path, name))
+                    h.update(f"{path}/{name}:{st.st_mtime_ns}:{st.st_size}".encode())
+        _releases[root] = h.hexdigest()
+    return _releases[root]
+
+
+def validators(names, *parts):
+    """(etag, last_modified) d'une réponse qui dépend des versions names et de parts (URL, utilisateur...)"""
+    stamps = version_stamps(names)
+    etag = hashlib.sha1(repr((_release(), parts, sorted(stamps.items()))).encode()).hexdigest()
+    last_modified = max((at for _, at in stamps.values() if at is not None), default=None)
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    """Vrai si la copie du client (If-None-Match / If-Modified-Since) est à jour"""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified, private):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Le client garde la réponse mais la revalide à chaque usage
+    response.cache_control.no_cache = True
+    response.cache_control.private = private or None
+    response.vary.add("Cookie")
+    return response
+
+
+def conditional(versions):
+    """Décorateur de vue GET: ETag/Last-Modified depuis versions(**view_args) -> [noms de version]"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            config = current_app.config
+            # Un message flash en attente doit être affiché: rendu normal
+            if not config["HTTP_CACHE_ENABLED"] or request.method not in ("GET", "HEAD") or "_flashes" in session:
+                return view(**kwargs)
+
+            user_id = current_user.get_id() if current_user.is_authenticated else None
+            etag, last_modified = validators(versions(**kwargs), request.full_path, user_id)
+            private = user_id is not None
+            if not_modified(etag, last_modified):
+                return set_validators(Response(status=304), etag, last_modified, private)
+
+            if private or config["PAGE_CACHE_TTL"] <= 0:
+                response = make_response(view(**kwargs))
+            else:
+                # Pages anonymes: le rendu est partagé; la clé (ETag) change avec les versions
+                def render():
+                    rv = make_response(view(**kwargs))
+                    return rv.get_data(), rv.status_code, rv.mimetype
+                body, status, mimetype = _pages.get(etag, render, ttl=config["PAGE_CACHE_TTL"])
+                response = Response(body, status=status, mimetype=mimetype)
+            return set_validators(response, etag, last_modified, private)
+        return wrapper
+    return decorator
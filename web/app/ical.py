@@ -0,0 +1,142 @@
+"""
+Flux iCalendar (.ics) du planning d'un étudiant.
+
+Chaque créneau hebdomadaire du planning devient un VEVENT répété chaque semaine
+(RRULE) sur la période de son semestre; les créneaux sans semestre connu
+(activités, événements) se répètent sans fin à partir de leur création.
+Le flux est produit ligne par ligne, sans construire le fichier en mémoire.
+"""
+import re
+import secrets
+from datetime import date, datetime, timedelta
+
+from .planning import planning_slots
+
+TZID = "Europe/Zurich"
+PRODID = "-//Unify//Planning//FR"
+
+# Périodes de cours par semestre: (décalage d'année, mois, jour) de début et de
+# fin, l'année académique "2022" allant de septembre 2022 à juin 2023
+SEMESTER_PERIODS = {
+    "Fall": ((0, 9, 15), (0, 12, 23)),
+    "Spring": ((1, 2, 17), (1, 6, 2)),
+    "Annual": ((0, 9, 15), (1, 6, 2)),
+}
+
+VTIMEZONE = (
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TZID}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0100",
+    "TZOFFSETTO:+0200",
+    "TZNAME:CEST",
+    "DTSTART:19700329T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0100",
+    "TZNAME:CET",
+    "DTSTART:19701025T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+)
+
+_YEAR_RE = re.compile(r"\b(\d{4})\b")
+_EPOCH = date(2000, 1, 3)  # date de départ des créneaux sans date de création
+
+
+def new_calendar_token():
+    return secrets.token_urlsafe(32)
+
+
+def semester_period(semester, academical_year):
+    """(premier jour, dernier jour) d'un semestre, ou None si inconnu"""
+    if not semester:
+        return None
+    name, _, rest = str(semester).strip().partition(" ")
+    period = SEMESTER_PERIODS.get(name)
+    match = _YEAR_RE.search(str(academical_year or "")) or _YEAR_RE.search(rest)
+    if period is None or match is None:
+        return None
+    year = int(match.group(1))
+    (dy1, m1, d1), (dy2, m2, d2) = period
+    return date(year + dy1, m1, d1), date(year + dy2, m2, d2)
+
+
+def _first_weekday(start, weekday):
+    """Premier jour >= start tombant le jour weekday (0 = lundi)"""
+    return start + timedelta(days=(weekday - start.weekday()) % 7)
+
+
+def _escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line):
+    """Coupe une ligne à 75 octets (RFC 5545 §3.1), sans couper un caractère UTF-8"""
+    out, chunk, size = [], "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > (75 if not out else 74):
+            out.append(chunk)
+            chunk, size = "", 0
+        chunk += ch
+        size += n
+    out.append(chunk)
+    return "\r\n ".join(out) + "\r\n"
+
+
+def _local(d, minute):
+    return f"{d:%Y%m%d}T{minute // 60:02d}{minute % 60:02d}00"
+
+
+def _vevent(day, item, stamp):
+    s, e = item["start_minute"], item["end_minute"]
+    if day is None or s is None or e is None or e <= s:
+        return None
+
+    period = semester_period(item.get("semester"), item.get("academical_year"))
+    if period is not None:
+        first = _first_weekday(period[0], day)
+        if first > period[1]:
+            return None
+        rule = f"RRULE:FREQ=WEEKLY;UNTIL={period[1]:%Y%m%d}T235959Z"
+    else:
+        created = item.get("created_at")
+        first = _first_weekday(created.date() if created else _EPOCH, day)
+        rule = "RRULE:FREQ=WEEKLY"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{item['kind']}-{item['id']}@unify",
+        f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+        f"DTSTART;TZID={TZID}:{_local(first, s)}",
+        f"DTEND;TZID={TZID}:{_local(first, e)}",
+        rule,
+        f"SUMMARY:{_escape(item['title'])}",
+        f"CATEGORIES:{item['kind'].upper()}",
+    ]
+    description = item.get("description")
+    if item.get("professor_full_name"):
+        description = f"{item['professor_full_name']}\n{description or ''}".strip()
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(description)}")
+    if item.get("location"):
+        lines.append(f"LOCATION:{_escape(item['location'])}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def generate_calendar(user_id, stamp=None):
+    """Lignes du fichier .ics du planning de user_id (générateur)"""
+    stamp = stamp or datetime(2000, 1, 1)
+    for line in ("BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+                 "X-WR-CALNAME:Unify", f"X-WR-TIMEZONE:{TZID}", *VTIMEZONE):
+        yield _fold(line)
+    for day, item in planning_slots(user_id):
+        for line in _vevent(day, item, stamp) or ():
+            yield _fold(line)
+    yield _fold("END:VCALENDAR")
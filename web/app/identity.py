@@ -0,0 +1,98 @@
+"""
+Identité de l'utilisateur connecté (current_user), chargée par Flask-Login à
+chaque requête authentifiée.
+
+load_identity lit un enregistrement compact (id, nom d'utilisateur, id étudiant
+et professeur, jeton du flux iCalendar) en une requête jointe, gardé
+IDENTITY_CACHE_TTL secondes par processus: une page authentifiée ne coûte
+alors aucune requête d'identité. Les profils complets (current_user.student,
+.professor) et les autres colonnes du User sont lus à la demande.
+
+invalidate_identity(user_id) est à appeler quand le profil ou le jeton d'un
+utilisateur change; pour l'utilisateur courant, un jeton en session écarte aussi
+les copies gardées par les autres processus.
+"""
+import secrets
+from functools import cached_property
+
+from flask import current_app, has_request_context, session
+from flask_login import UserMixin, current_user
+from sqlalchemy import select
+
+from .cache import TTLCache
+from .extensions import db
+from .models import Professor, Student, User
+
+SESSION_KEY = "_identity"
+
+_identities = TTLCache(maxsize=10000)
+
+
+class Identity(UserMixin):
+    """Utilisateur connecté: identité en cache, profils et User chargés à la demande"""
+
+    def __init__(self, id, username, student_id, professor_id, calendar_token):
+        self.id = id
+        self.username = username
+        self.student_id = student_id
+        self.professor_id = professor_id
+        self.calendar_token = calendar_token
+
+    @property
+    def role(self):
+        if self.student_id is not None:
+            return 'student'
+        elif self.professor_id is not None:
+            return 'professor'
+        return 'user'
+
+    @cached_property
+    def user(self):
+        """Objet User complet (une requête)"""
+        return db.session.get(User, self.id)
+
+    @cached_property
+    def student(self):
+        return db.session.get(Student, self.student_id) if self.student_id is not None else None
+
+    @cached_property
+    def professor(self):
+        return db.session.get(Professor, self.professor_id) if self.professor_id is not None else None
+
+    def __getattr__(self, name):
+        # Autres attributs du User (email, created_at, relations...)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<Identity {self.username}>'
+
+
+def _key(user_id):
+    return user_id, session.get(SESSION_KEY) if has_request_context() else None
+
+
+def _read(user_id):
+    row = db.session.execute(
+        select(User.id, User.username, Student.id, Professor.id, User.calendar_token)
+        .outerjoin(Student, Student.user_id == User.id)
+        .outerjoin(Professor, Professor.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    return tuple(row) if row is not None else None
+
+
+def load_identity(user_id):
+    """Identity de user_id (None si l'utilisateur n'existe plus)"""
+    row = _identities.get(_key(user_id), lambda: _read(user_id), ttl=current_app.config["IDENTITY_CACHE_TTL"])
+    return Identity(*row) if row is not None else None
+
+
+def invalidate_identity(*user_ids):
+    """À appeler quand le profil (étudiant, professeur) ou le jeton d'agenda de ces utilisateurs change"""
+    for user_id in user_ids:
+        _identities.delete((user_id, None))
+        if has_request_context() and current_user.is_authenticated and current_user.id == user_id:
+            _identities.delete(_key(user_id))
+            session[SESSION_KEY] = secrets.token_hex(4)
@@ -0,0 +1,642 @@
+import hashlib
+import json
+import time
+from datetime import datetime
+from itertools import islice
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import delete, insert, or_, select, tuple_, update
+
+from .extensions import db
+from .models import User, Professor, Course, Faculty, StudyPlan, CourseStudyPlan, CourseFingerprint
+from .passwords import hash_password, hash_passwords
+from .httpcache import invalidate_courses
+from .planning import invalidate_all_plannings
+from .reference import invalidate_reference
+from .schedule import schedule_fields
+from .search import index_course_rows
+
+
+DAY_MAP = {
+    "Monday": "Lundi",
+    "Tuesday": "Mardi",
+    "Wednesday": "Mercredi",
+    "Thursday": "Jeudi",
+    "Friday": "Vendredi",
+    "Saturday": "Samedi",
+    "Sunday": "Dimanche",
+}
+
+SEMESTER_MAP = {
+    "Automne": "Fall",
+    "Printemps": "Spring",
+    "Annuel": "Annual",
+}
+
+PLACEHOLDER_PID = 0
+
+
+def _hour_to_str(h):
+    if h is None:
+        return None
+    try:
+        return f"{int(h):02d}:00"
+    except (ValueError, TypeError):
+        return None
+
+
+def _credits_to_int(c):
+    # Course.credits est int dans ta DB ; JSON est float.
+    if c is None:
+        return 0
+    try:
+        return int(round(float(c)))
+    except (ValueError, TypeError):
+        return 0
+
+
+def _plan_credits_decimal(x):
+    # listStudyPlan[].planCredits est string/null dans ton JSON
+    if x is None:
+        return None
+    s = str(x).strip()
+    if not s:
+        return None
+    try:
+        return Decimal(s)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _build_description(obj: dict):
+    parts = []
+    if obj.get("objective"):
+        parts.append(str(obj["objective"]).strip())
+    if obj.get("description"):
+        parts.append(str(obj["description"]).strip())
+    txt = "\n\n".join([p for p in parts if p])
+    return txt or None
+
+
+def _normalize_day(day):
+    if not day:
+        return None
+    day = str(day).strip()
+    return DAY_MAP.get(day, day)
+
+
+def _normalize_semester(periodicity):
+    if not periodicity:
+        return None
+    p = str(periodicity).strip()
+    return SEMESTER_MAP.get(p, p)
+
+
+def _person_id(c):
+    pid = c.get("personId")
+    if pid and str(pid).isdigit():
+        return int(pid)
+    return None
+
+
+DIFF_SAMPLE = 20
+
+
+def course_digest(payload):
+    """Empreinte du contenu d'un cours importé (created_at exclu)"""
+    content = {k: v for k, v in payload.items() if k != "created_at"}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def batched(iterable, size):
+    """Découpe un itérable en listes de size éléments"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class FeedFormatError(ValueError):
+    """Fichier courses.json illisible (syntaxe JSON ou structure inattendue)"""
+
+
+class _JsonStream:
+    """Lecture incrémentale d'un fichier JSON avec un tampon borné"""
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, fp, read_size):
+        self.fp = fp
+        self.read_size = read_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Oublie la partie déjà consommée pour garder un tampon borné
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Prochain caractère significatif (None en fin de fichier)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return None
+
+    def expect(self, chars):
+        ch = self.peek()
+        if ch is None or ch not in chars:
+            raise FeedFormatError(f"JSON invalide: attendu {chars!r}, trouvé {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        """Décode la valeur suivante; relit si elle est coupée par la fin du tampon"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise FeedFormatError(f"JSON invalide: {e}") from e
+            # Un nombre en fin de tampon peut être tronqué: on s'assure d'avoir la suite
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_courses(fp, read_size=1 << 16):
+    """Génère les éléments de courses[] sans charger le fichier en mémoire.
+
+    Accepte aussi plusieurs documents {"courses": [...]} concaténés (une
+    année académique par document). Les autres clés sont ignorées.
+    """
+    stream = _JsonStream(fp, read_size)
+    while stream.peek() is not None:
+        stream.expect("{")
+        if stream.peek() == "}":
+            stream.expect("}")
+            continue
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key == "courses":
+                if stream.peek() != "[":
+                    raise FeedFormatError("JSON invalide: 'courses' doit être une liste.")
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.expect("]")
+                else:
+                    while True:
+                        yield stream.value()
+                        if stream.expect(",]") == "]":
+                            break
+            else:
+                stream.value()
+            if stream.expect(",}") == "}":
+                break
+
+
+class CourseImporter:
+    """Import ensembliste des cours de courses.json.
+
+    Les clés existantes (utilisateurs, professeurs, facultés, plans d'étude,
+    cours, liens cours-plan) sont préchargées une fois, les insertions et mises
+    à jour sont calculées en mémoire puis écrites par lots de chunk_size
+    (INSERT multi-lignes, UPDATE par clé primaire en executemany).
+    Le résultat est identique à l'ancien import ligne à ligne.
+
+    Les mots de passe des comptes professeurs créés sont hachés dans un pool
+    de hash_workers processus, ou, si reuse_hash, hachés une seule fois et le
+    même hash est partagé par tous les comptes créés lors de cet import.
+
+    En mode delta, chaque cours garde une empreinte de son contenu
+    (CourseFingerprint): un cours inchangé n'est ni réécrit ni réindexé, un
+    cours modifié garde son created_at, et seuls les liens cours-plan
+    réellement ajoutés, modifiés ou disparus du flux donnent lieu à un
+    INSERT/UPDATE/DELETE.
+
+    Utilisation: add_batch(records) autant de fois que nécessaire, puis
+    finish() ; rien n'est commité.
+    """
+
+    def __init__(self, default_password, chunk_size=1000, now=None, hash_workers=None, reuse_hash=False, delta=False):
+        self.default_password = default_password
+        self.chunk_size = chunk_size
+        self.now = now or datetime.utcnow()
+        self.hash_workers = hash_workers
+        self.reuse_hash = reuse_hash
+        self.delta = delta
+        self._shared_hash = None
+        self._desired_links = {}     # delta: course_id -> {study_plan_id} présents dans le flux
+        self.changed_codes = []      # delta: premiers codes insérés ou modifiés (résumé)
+        self.timings = {"professors_sec": 0.0, "password_hash_sec": 0.0}
+        self.started = time.perf_counter()
+        self.counts = {
+            "users_created": 0,
+            "professors_created": 0,
+            "faculties_created": 0,
+            "study_plans_created": 0,
+            "courses_inserted": 0,
+            "courses_updated": 0,
+            "course_plan_links_inserted": 0,
+            "course_plan_links_updated": 0,
+        }
+        if delta:
+            self.counts.update({
+                "professors_updated": 0,
+                "courses_unchanged": 0,
+                "course_plan_links_unchanged": 0,
+                "course_plan_links_deleted": 0,
+            })
+        self.records = 0
+
+        self.professor_id_by_pid = {}
+        self.faculty_id_by_external = {f.external_id: f.id for f in Faculty.query.all()}
+        # Même résolution que l'ancien import: external_id d'abord, puis libellé
+        self.plan_by_external = {}
+        self.plan_by_label = {}
+        for sp_id, ext, label in db.session.execute(select(StudyPlan.id, StudyPlan.external_id, StudyPlan.label)):
+            ref = {"id": sp_id}
+            if ext is not None:
+                self.plan_by_external[ext] = ref
+            self.plan_by_label[label] = ref
+
+    # ------------------------------------------------------------------
+    # Écritures par lots
+
+    def _insert_returning_ids(self, model, rows):
+        """INSERT par lots; retourne les ids dans l'ordre des lignes"""
+        ids = []
+        for chunk in _chunks(rows, self.chunk_size):
+            ids.extend(db.session.scalars(
+                insert(model).returning(model.id, sort_by_parameter_order=True), chunk
+            ))
+        return ids
+
+    def _bulk_insert(self, model, rows):
+        for chunk in _chunks(rows, self.chunk_size):
+            db.session.execute(insert(model), chunk)
+
+    def _bulk_update(self, model, rows):
+        """UPDATE par clé primaire (les dicts contiennent la clé primaire)"""
+        for chunk in _chunks(rows, self.chunk_size):
+            db.session.execute(update(model), chunk)
+
+    # ------------------------------------------------------------------
+    # Phases
+
+    def _hash_default_password(self, count):
+        started = time.perf_counter()
+        if self.reuse_hash:
+            if self._shared_hash is None:
+                self._shared_hash = hash_password(self.default_password)
+            hashes = [self._shared_hash] * count
+        else:
+            hashes = hash_passwords([self.default_password] * count, workers=self.hash_workers)
+        self.timings["password_hash_sec"] += time.perf_counter() - started
+        return hashes
+
+    def _import_professors(self, records):
+        started = time.perf_counter()
+        try:
+            self._import_professor_rows(records)
+        finally:
+            self.timings["professors_sec"] += time.perf_counter() - started
+
+    def _import_professor_rows(self, records):
+        payload = {}
+        for c in records:
+            pid = _person_id(c)
+            if pid is not None and pid not in self.professor_id_by_pid and pid not in payload:
+                payload[pid] = {
+                    "first_name": (c.get("displayFirstName") or "Unknown").strip() or "Unknown",
+                    "last_name": (c.get("displayLastName") or "Unknown").strip() or "Unknown",
+                    "department": (c.get("facultyLabel") or "Unknown").strip() or "Unknown",
+                }
+        if PLACEHOLDER_PID not in self.professor_id_by_pid:
+            payload.setdefault(PLACEHOLDER_PID, {"first_name": "TBD", "last_name": "TBD", "department": "Unknown"})
+        if not payload:
+            return
+
+        usernames = {pid: f"prof_{pid}" for pid in payload}
+        emails = {pid: f"prof_{pid}@unige.local" for pid in payload}
+
+        user_by_username, user_by_email = {}, {}
+        for chunk in _chunks(list(payload), self.chunk_size):
+            names = [usernames[pid] for pid in chunk]
+            mails = [emails[pid] for pid in chunk]
+            rows = db.session.execute(
+                select(User.id, User.username, User.email)
+                .where(or_(User.username.in_(names), User.email.in_(mails)))
+            )
+            for user_id, username, email in rows:
+                user_by_username[username] = user_id
+                user_by_email[email] = user_id
+
+        user_id_by_pid = {}
+        new_users = []
+        for pid in payload:
+            user_id = user_by_username.get(usernames[pid]) or user_by_email.get(emails[pid])
+            if user_id is None:
+                new_users.append(pid)
+            else:
+                user_id_by_pid[pid] = user_id
+
+        if new_users:
+            hashes = self._hash_default_password(len(new_users))
+            ids = self._insert_returning_ids(User, [
+                {
+                    "username": usernames[pid],
+                    "email": emails[pid],
+                    "password_hash": password_hash,
+                    "created_at": self.now,
+                }
+                for pid, password_hash in zip(new_users, hashes)
+            ])
+            user_id_by_pid.update(zip(new_users, ids))
+            self.counts["users_created"] += len(ids)
+
+        professor_by_user = {}
+        current = {}
+        for chunk in _chunks(list(user_id_by_pid.values()), self.chunk_size):
+            rows = db.session.execute(
+                select(Professor.id, Professor.user_id, Professor.first_name, Professor.last_name, Professor.department)
+                .where(Professor.user_id.in_(chunk))
+            )
+            for prof_id, user_id, first_name, last_name, department in rows:
+                professor_by_user[user_id] = prof_id
+                current[prof_id] = {"first_name": first_name, "last_name": last_name, "department": department}
+
+        new_profs, updates = [], []
+        for pid, p in payload.items():
+            prof_id = professor_by_user.get(user_id_by_pid[pid])
+            if prof_id is None:
+                new_profs.append(pid)
+            else:
+                # update soft
+                if not self.delta or current[prof_id] != p:
+                    updates.append({"id": prof_id, **p})
+                self.professor_id_by_pid[pid] = prof_id
+
+        if new_profs:
+            ids = self._insert_returning_ids(Professor, [
+                {"user_id": user_id_by_pid[pid], **payload[pid]} for pid in new_profs
+            ])
+            self.professor_id_by_pid.update(zip(new_profs, ids))
+            self.counts["professors_created"] += len(ids)
+        self._bulk_update(Professor, updates)
+        if self.delta:
+            self.counts["professors_updated"] += len(updates)
+
+    def _import_faculties(self, records):
+        new = {}
+        for c in records:
+            faculty_ext = str(c.get("facultyId") or "").strip()
+            faculty_label = (c.get("facultyLabel") or "").strip()
+            if faculty_ext and faculty_label and faculty_ext not in self.faculty_id_by_external:
+                new.setdefault(faculty_ext, faculty_label)
+        if new:
+            exts = list(new)
+            ids = self._insert_returning_ids(Faculty, [{"external_id": e, "name": new[e]} for e in exts])
+            self.faculty_id_by_external.update(zip(exts, ids))
+            self.counts["faculties_created"] += len(ids)
+
+    def _resolve_plan(self, sp, pending):
+        ext = sp.get("studyPlanGroupId") or sp.get("studyPlanId")
+        ext = str(ext).strip() if ext is not None else None
+        label = (sp.get("studyPlanLabel") or "Unknown plan").strip()
+
+        ref = self.plan_by_external.get(ext) if ext else None
+        if ref is None:
+            ref = self.plan_by_label.get(label)
+        if ref is None:
+            ref = {"id": None, "external_id": ext, "label": label}
+            pending.append(ref)
+            if ext:
+                self.plan_by_external[ext] = ref
+            self.plan_by_label[label] = ref
+        return ref
+
+    def _course_payload(self, c):
+        faculty_ext = str(c.get("facultyId") or "").strip()
+        faculty_label = (c.get("facultyLabel") or "").strip()
+        faculty_id = None
+        if faculty_ext and faculty_label:
+            faculty_id = self.faculty_id_by_external[faculty_ext]
+
+        pid = _person_id(c)
+        professor_id = self.professor_id_by_pid.get(pid, self.professor_id_by_pid[PLACEHOLDER_PID])
+
+        day_of_week = _normalize_day(c.get("day"))
+        start_time = _hour_to_str(c.get("startHour"))
+        end_time = _hour_to_str(c.get("endHour"))
+
+        # INSERT/UPDATE groupés: pas d'événement ORM, les colonnes en minutes sont calculées ici
+        return dict(
+            code=str(c.get("code"))[:20],
+            name=str(c.get("title"))[:200],
+            description=_build_description(c),
+            credits=_credits_to_int(c.get("credits")),
+            professor_id=professor_id,
+            created_at=self.now,
+            day_of_week=day_of_week,
+            start_time=start_time,
+            end_time=end_time,
+            **schedule_fields(day_of_week, start_time, end_time),
+            semester=_normalize_semester(c.get("periodicity")),
+            academical_year=str(c.get("academicalYear") or "").strip() or None,
+            faculty_id=faculty_id,
+        )
+
+    def add_batch(self, records):
+        """Importe un lot d'enregistrements de courses[]"""
+        records = [c for c in records if c.get("code") and c.get("title")]
+        self.records += len(records)
+        if not records:
+            return
+
+        self._import_professors(records)
+        self._import_faculties(records)
+
+        # Cours: la dernière occurrence d'un code l'emporte, comme avec les setattr successifs
+        payload_by_code = {}
+        occurrences = 0
+        links = {}          # (code, id(plan ref)) -> (ref, plan_credits) ; dernier gagnant
+        pending_plans = []
+        for c in records:
+            payload = self._course_payload(c)
+            payload_by_code[payload["code"]] = payload
+            occurrences += 1
+            for sp in c.get("listStudyPlan") or []:
+                ref = self._resolve_plan(sp, pending_plans)
+                key = (payload["code"], id(ref))
+                links[key] = (payload["code"], ref, _plan_credits_decimal(sp.get("planCredits")))
+        link_occurrences = sum(len(c.get("listStudyPlan") or []) for c in records)
+
+        if pending_plans:
+            ids = self._insert_returning_ids(StudyPlan, [
+                {"external_id": ref["external_id"], "label": ref["label"]} for ref in pending_plans
+            ])
+            for ref, sp_id in zip(pending_plans, ids):
+                ref["id"] = sp_id
+            self.counts["study_plans_created"] += len(ids)
+
+        digest_by_code = {code: course_digest(p) for code, p in payload_by_code.items()}
+        existing, stored_digest = {}, {}
+        for chunk in _chunks(list(payload_by_code), self.chunk_size):
+            rows = db.session.execute(
+                select(Course.code, Course.id, CourseFingerprint.digest)
+                .outerjoin(CourseFingerprint, CourseFingerprint.course_id == Course.id)
+                .where(Course.code.in_(chunk))
+            )
+            for code, course_id, digest in rows:
+                existing[code] = course_id
+                stored_digest[code] = digest
+
+        new_codes = [code for code in payload_by_code if code not in existing]
+        course_id_by_code = dict(existing)
+        if new_codes:
+            ids = self._insert_returning_ids(Course, [payload_by_code[code] for code in new_codes])
+            course_id_by_code.update(zip(new_codes, ids))
+        self.counts["courses_inserted"] += len(new_codes)
+
+        if self.delta:
+            changed = [code for code in existing if stored_digest[code] != digest_by_code[code]]
+            # Pas de created_at: un cours modifié garde sa date de création
+            self._bulk_update(Course, [
+                {"id": existing[code], **{k: v for k, v in payload_by_code[code].items() if k != "created_at"}}
+                for code in changed
+            ])
+            self.counts["courses_updated"] += len(changed)
+            self.counts["courses_unchanged"] += len(existing) - len(changed)
+            room = DIFF_SAMPLE - len(self.changed_codes)
+            if room > 0:
+                self.changed_codes.extend((new_codes + changed)[:room])
+        else:
+            changed = list(existing)
+            self._bulk_update(Course, [{"id": existing[code], **payload_by_code[code]} for code in changed])
+            self.counts["courses_updated"] += occurrences - len(new_codes)
+
+        # Empreintes des cours écrits
+        written = new_codes + changed
+        for chunk in _chunks(written, self.chunk_size):
+            db.session.execute(delete(CourseFingerprint).where(
+                CourseFingerprint.course_id.in_([course_id_by_code[code] for code in chunk])
+            ))
+        self._bulk_insert(CourseFingerprint, [
+            {"course_id": course_id_by_code[code], "digest": digest_by_code[code]} for code in written
+        ])
+
+        # Liens cours <-> plan d'étude
+        link_rows = {}
+        for code, ref, plan_credits in links.values():
+            link_rows[(course_id_by_code[code], ref["id"])] = plan_credits
+        if self.delta:
+            self._write_links_delta(link_rows, [course_id_by_code[code] for code in payload_by_code])
+        else:
+            self._write_links(link_rows, link_occurrences)
+
+        # Index de recherche du catalogue
+        index_course_rows([
+            {"id": course_id_by_code[code], "code": code, "name": payload_by_code[code]["name"],
+             "description": payload_by_code[code]["description"]}
+            for code in written
+        ], chunk_size=self.chunk_size)
+
+    def _write_links(self, link_rows, link_occurrences):
+        existing_links = set()
+        for chunk in _chunks(list(link_rows), self.chunk_size):
+            existing_links.update(db.session.execute(
+                select(CourseStudyPlan.course_id, CourseStudyPlan.study_plan_id)
+                .where(tuple_(CourseStudyPlan.course_id, CourseStudyPlan.study_plan_id).in_(chunk))
+            ).all())
+
+        inserts, updates = [], []
+        for (course_id, study_plan_id), plan_credits in link_rows.items():
+            row = {"course_id": course_id, "study_plan_id": study_plan_id, "plan_credits": plan_credits}
+            (updates if (course_id, study_plan_id) in existing_links else inserts).append(row)
+        self._bulk_insert(CourseStudyPlan, inserts)
+        self._bulk_update(CourseStudyPlan, updates)
+        self.counts["course_plan_links_inserted"] += len(inserts)
+        self.counts["course_plan_links_updated"] += link_occurrences - len(inserts)
+
+    def _write_links_delta(self, link_rows, course_ids):
+        """N'écrit que les liens nouveaux ou dont plan_credits a changé"""
+        for course_id in course_ids:
+            self._desired_links.setdefault(course_id, set())
+        current = {}
+        for chunk in _chunks(list(course_ids), self.chunk_size):
+            rows = db.session.execute(
+                select(CourseStudyPlan.course_id, CourseStudyPlan.study_plan_id, CourseStudyPlan.plan_credits)
+                .where(CourseStudyPlan.course_id.in_(chunk))
+            )
+            current.update({(course_id, sp_id): credits for course_id, sp_id, credits in rows})
+
+        inserts, updates = [], []
+        for key, plan_credits in link_rows.items():
+            self._desired_links.setdefault(key[0], set()).add(key[1])
+            row = {"course_id": key[0], "study_plan_id": key[1], "plan_credits": plan_credits}
+            if key not in current:
+                inserts.append(row)
+            elif current[key] != plan_credits:
+                updates.append(row)
+        self._bulk_insert(CourseStudyPlan, inserts)
+        self._bulk_update(CourseStudyPlan, updates)
+        self.counts["course_plan_links_inserted"] += len(inserts)
+        self.counts["course_plan_links_updated"] += len(updates)
+        self.counts["course_plan_links_unchanged"] += len(link_rows) - len(inserts) - len(updates)
+
+    def _delete_stale_links(self):
+        """Delta: supprime les liens des cours importés qui ne figurent plus dans le flux"""
+        stale = []
+        for chunk in _chunks(list(self._desired_links), self.chunk_size):
+            rows = db.session.execute(
+                select(CourseStudyPlan.course_id, CourseStudyPlan.study_plan_id)
+                .where(CourseStudyPlan.course_id.in_(chunk))
+            )
+            stale.extend(key for key in rows if key[1] not in self._desired_links[key[0]])
+        for chunk in _chunks(stale, self.chunk_size):
+            db.session.execute(delete(CourseStudyPlan).where(
+                tuple_(CourseStudyPlan.course_id, CourseStudyPlan.study_plan_id).in_([tuple(k) for k in chunk])
+            ))
+        self.counts["course_plan_links_deleted"] += len(stale)
+
+    def finish(self):
+        """Compteurs + temps total et débit (lignes écrites par seconde)"""
+        if self.delta:
+            self._delete_stale_links()
+        written = sum(v for k, v in self.counts.items() if not k.endswith("_unchanged"))
+        if written:
+            invalidate_reference()
+            invalidate_courses()
+            invalidate_all_plannings()
+        elapsed = time.perf_counter() - self.started
+        return {
+            **self.counts,
+            "records": self.records,
+            "professors_sec": round(self.timings["professors_sec"], 2),
+            "password_hash_sec": round(self.timings["password_hash_sec"], 2),
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(written / elapsed) if elapsed else None,
+        }
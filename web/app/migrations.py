@@ -0,0 +1,122 @@
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import inspect, insert, select, text
+
+from .extensions import db
+from .models import (
+    Activity, Course, CourseStudyPlan, Enrollment, Event, EventParticipant, SchemaMigration, User,
+)
+from .httpcache import invalidate_courses
+from .schedule import backfill_schedule_columns
+from .search import rebuild_index
+from .stats import rebuild_course_stats
+
+
+Migration = namedtuple("Migration", "version name apply")
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Enregistre une migration. Chaque migration doit être idempotente: une base
+    créée avant ce système n'a pas d'historique et les rejoue toutes."""
+    def register(fn):
+        MIGRATIONS.append(Migration(version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return register
+
+
+def _add_columns(conn, model, names):
+    table = model.__table__
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    for name in names:
+        if name not in existing:
+            col_type = table.c[name].type.compile(dialect=conn.dialect)
+            table_name = conn.dialect.identifier_preparer.quote(table.name)
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {col_type}"))
+
+
+def _create_indexes(conn, model, names):
+    for index in model.__table__.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+@migration(1, "create missing tables")
+def _create_tables(conn):
+    db.metadata.create_all(conn)
+
+
+@migration(2, "schedule day index and minute columns")
+def _schedule_columns(conn):
+    for model, index in ((Course, "ix_course_day_start"), (Activity, "ix_activity_user_day_start"),
+                         (Event, "ix_event_day_start")):
+        _add_columns(conn, model, ("day_index", "start_minute", "end_minute"))
+        _create_indexes(conn, model, {index})
+    backfill_schedule_columns()
+
+
+@migration(3, "indexes for the hot lookup paths")
+def _hot_path_indexes(conn):
+    _create_indexes(conn, Enrollment, {"ix_enrollment_student_status", "ix_enrollment_course_status"})
+    _create_indexes(conn, EventParticipant, {"ix_event_participant_user"})
+    _create_indexes(conn, Event, {
+        "ix_event_public_category_created", "ix_event_public_created", "ix_event_public_day_start",
+    })
+    _create_indexes(conn, Course, {
+        "ix_course_faculty_code", "ix_course_name_code", "ix_course_credits_code", "ix_course_professor",
+    })
+    _create_indexes(conn, CourseStudyPlan, {"ix_course_study_plan_plan"})
+
+
+@migration(4, "calendar feed token")
+def _calendar_token(conn):
+    _add_columns(conn, User, ("calendar_token",))
+    _create_indexes(conn, User, {"ix_user_calendar_token"})
+
+
+@migration(5, "build the catalog search index")
+def _search_index(conn):
+    # course_search_term est créée vide par la migration 1 sur une base existante
+    rebuild_index()
+
+
+@migration(6, "build the course statistics")
+def _course_stats(conn):
+    # Idem pour course_stats: sans calcul, chaque cours afficherait 0 inscrit
+    rebuild_course_stats()
+    invalidate_courses()
+
+
+def applied_versions():
+    SchemaMigration.__table__.create(db.session.connection(), checkfirst=True)
+    return set(db.session.scalars(select(SchemaMigration.version)))
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def _record(m):
+    db.session.execute(insert(SchemaMigration).values(version=m.version, name=m.name, applied_at=datetime.utcnow()))
+
+
+def upgrade(echo=print):
+    """Applique les migrations en attente, une transaction (et un commit) par migration"""
+    done = []
+    for m in pending_migrations():
+        echo(f"  -> {m.version:04d} {m.name}")
+        m.apply(db.session.connection())
+        _record(m)
+        db.session.commit()
+        done.append(m)
+    return done
+
+
+def stamp():
+    """Marque toutes les migrations comme appliquées (base créée par create_all)"""
+    for m in pending_migrations():
+        _record(m)
+    db.session.commit()
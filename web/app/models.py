@@ -2,6 +2,7 @@ from .extensions import db
 from flask_login import UserMixin
 from datetime import datetime
 from sqlalchemy import Numeric
+from sqlalchemy.orm import query_expression
 
 
 class User(db.Model, UserMixin):
@@ -13,10 +14,15 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    calendar_token = db.Column(db.String(64))  # secret of the .ics planning feed (None = no feed)
     
     # Relationships
     student = db.relationship('Student', backref='user', uselist=False, cascade='all, delete-orphan')
     professor = db.relationship('Professor', backref='user', uselist=False, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index("ix_user_calendar_token", "calendar_token", unique=True),
+    )
     
     @property
     def role(self):
@@ -26,6 +32,15 @@ class User(db.Model, UserMixin):
         elif self.professor:
             return 'professor'
         return 'user'
+
+    # Same interface as identity.Identity (current_user)
+    @property
+    def student_id(self):
+        return self.student.id if self.student else None
+
+    @property
+    def professor_id(self):
+        return self.professor.id if self.professor else None
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -99,10 +114,31 @@ class CourseStudyPlan(db.Model):
     # Course Credits in this Study Plan
     plan_credits = db.Column(Numeric(4, 1), nullable=True)
 
+    __table_args__ = (
+        db.Index("ix_course_study_plan_plan", "study_plan_id", "course_id"),
+    )
+
     course = db.relationship("Course", back_populates="study_plans")
     study_plan = db.relationship("StudyPlan", back_populates="courses")
 
 
+def difficulty_from_hours(avg_hours):
+    """Difficulty rating (1-5 scale) from the average weekly hours"""
+    if not avg_hours:
+        return None
+    # 0-5h = 1, 5-10h = 2, 10-15h = 3, 15-20h = 4, 20+h = 5
+    if avg_hours < 5:
+        return 1
+    elif avg_hours < 10:
+        return 2
+    elif avg_hours < 15:
+        return 3
+    elif avg_hours < 20:
+        return 4
+    else:
+        return 5
+
+
 class Course(db.Model):
     """Course model"""
     __tablename__ = 'course'
@@ -121,6 +157,11 @@ class Course(db.Model):
     end_time = db.Column(db.String(10))  # e.g., "12:00"
     semester = db.Column(db.String(20))  # e.g., "Fall"
     academical_year = db.Column(db.String(10)) # e.g., "2022"
+
+    # Derived from day_of_week/start_time/end_time on flush (see schedule.py)
+    day_index = db.Column(db.SmallInteger)  # 0 = Lundi ... 6 = Dimanche
+    start_minute = db.Column(db.SmallInteger)  # minutes since 00:00
+    end_minute = db.Column(db.SmallInteger)
     
     # Relationships
     enrollments = db.relationship('Enrollment', backref='course', lazy=True, cascade='all, delete-orphan')
@@ -128,50 +169,88 @@ class Course(db.Model):
     # Study Plan informations
     faculty_id = db.Column(db.Integer, db.ForeignKey("faculty.id"), nullable=True)
     study_plans = db.relationship("CourseStudyPlan", back_populates="course", cascade="all, delete-orphan")
+
+    # Denormalized enrollment/feedback statistics (see app/stats.py)
+    stats = db.relationship('CourseStats', uselist=False, lazy='joined', cascade='all, delete-orphan')
     
     @property
     def enrolled_count(self):
-        return len([e for e in self.enrollments if e.status == 'enrolled'])
+        return self.stats.enrolled_count if self.stats else 0
     
     @property
     def average_hours(self):
         """Average weekly hours from student feedback"""
-        completed = [e for e in self.enrollments if e.status == 'completed' and e.weekly_hours]
-        return round(sum(e.weekly_hours for e in completed) / len(completed), 1) if completed else None
+        s = self.stats
+        return round(s.hours_sum / s.hours_count, 1) if s and s.hours_count else None
     
     @property
     def average_grade(self):
         """Average grade from student feedback"""
-        completed = [e for e in self.enrollments if e.status == 'completed' and e.student_grade is not None]
-        return round(sum(e.student_grade for e in completed) / len(completed), 1) if completed else None
+        s = self.stats
+        return round(s.grade_sum / s.grade_count, 1) if s and s.grade_count else None
     
     @property
     def difficulty_rating(self):
         """Difficulty rating based on hours (1-5 scale)"""
-        avg_hours = self.average_hours
-        if not avg_hours:
-            return None
-        # 0-5h = 1, 5-10h = 2, 10-15h = 3, 15-20h = 4, 20+h = 5
-        if avg_hours < 5:
-            return 1
-        elif avg_hours < 10:
-            return 2
-        elif avg_hours < 15:
-            return 3
-        elif avg_hours < 20:
-            return 4
-        else:
-            return 5
+        return difficulty_from_hours(self.average_hours)
     
     @property
     def feedback_count(self):
         """Number of students who provided feedback"""
-        return len([e for e in self.enrollments if e.status == 'completed'])
+        return self.stats.feedback_count if self.stats else 0
     
+    __table_args__ = (
+        db.Index('ix_course_day_start', 'day_index', 'start_minute'),
+        # Catalog filters and keyset sorts (code is the tiebreak)
+        db.Index('ix_course_faculty_code', 'faculty_id', 'code'),
+        db.Index('ix_course_name_code', 'name', 'code'),
+        db.Index('ix_course_credits_code', credits.desc(), code),  # credits desc, code asc
+        db.Index('ix_course_professor', 'professor_id'),
+    )
+
     def __repr__(self):
         return f'<Course {self.code} - {self.name}>'
 
 
+class CourseFingerprint(db.Model):
+    """Content hash of the last imported courses.json record of a course"""
+    __tablename__ = 'course_fingerprint'
+
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), primary_key=True)
+    digest = db.Column(db.String(40), nullable=False)  # sha1 of the normalized course fields
+
+    def __repr__(self):
+        return f'<CourseFingerprint Course:{self.course_id} {self.digest[:8]}>'
+
+
+class CourseStats(db.Model):
+    """Per-course aggregates of enrollments, maintained incrementally"""
+    __tablename__ = 'course_stats'
+
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), primary_key=True)
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0)  # status == 'enrolled'
+    feedback_count = db.Column(db.Integer, nullable=False, default=0)  # status == 'completed'
+    hours_sum = db.Column(db.Integer, nullable=False, default=0)       # completed with weekly_hours
+    hours_count = db.Column(db.Integer, nullable=False, default=0)
+    grade_sum = db.Column(db.Float, nullable=False, default=0)         # completed with student_grade
+    grade_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CourseStats Course:{self.course_id} Enrolled:{self.enrolled_count} Feedback:{self.feedback_count}>'
+
+
+class CourseSearchTerm(db.Model):
+    """Inverted index entry: one normalized term of a course and its weight"""
+    __tablename__ = 'course_search_term'
+
+    term = db.Column(db.String(64), primary_key=True)  # folded token, e.g. "economie"
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), primary_key=True, index=True)
+    weight = db.Column(db.Integer, nullable=False, default=1)  # sum of field weights
+
+    def __repr__(self):
+        return f'<CourseSearchTerm {self.term} Course:{self.course_id} Weight:{self.weight}>'
+
+
 class Enrollment(db.Model):
     """Enrollment model - many-to-many relationship between Student and Course"""
     __tablename__ = 'enrollment'
@@ -191,6 +270,8 @@ class Enrollment(db.Model):
     # Ensure a student can only enroll once per course
     __table_args__ = (
         db.UniqueConstraint('student_id', 'course_id', name='unique_student_course'),
+        db.Index('ix_enrollment_student_status', 'student_id', 'status'),
+        db.Index('ix_enrollment_course_status', 'course_id', 'status'),
     )
     
     def __repr__(self):
@@ -211,6 +292,11 @@ class Activity(db.Model):
     start_time = db.Column(db.String(10), nullable=False)     # "18:00"
     end_time = db.Column(db.String(10), nullable=False)       # "19:00"
 
+    # Dérivés de day_of_week/start_time/end_time au flush (voir schedule.py)
+    day_index = db.Column(db.SmallInteger)                    # 0 = Lundi ... 6 = Dimanche
+    start_minute = db.Column(db.SmallInteger)                 # minutes depuis 00:00
+    end_minute = db.Column(db.SmallInteger)
+
     semester = db.Column(db.String(20), nullable=True)        # optionnel si tu veux filtrer
     academical_year = db.Column(db.String(10), nullable=True) # optionnel aussi
 
@@ -218,6 +304,10 @@ class Activity(db.Model):
 
     user = db.relationship("User", backref=db.backref("activities", lazy=True, cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        db.Index("ix_activity_user_day_start", "user_id", "day_index", "start_minute"),
+    )
+
     def __repr__(self):
         return f"<Activity {self.title} {self.day_of_week} {self.start_time}-{self.end_time}>"
 
@@ -239,6 +329,9 @@ class Event(db.Model):
     start_time = db.Column(db.String(10), nullable=False)  # e.g., "18:00"
     end_time = db.Column(db.String(10), nullable=False)  # e.g., "20:00"
     event_date = db.Column(db.Date, nullable=True)  # For one-time events
+    day_index = db.Column(db.SmallInteger)  # derived on flush: 0 = Lundi ... 6 = Dimanche
+    start_minute = db.Column(db.SmallInteger)  # derived on flush: minutes since 00:00
+    end_minute = db.Column(db.SmallInteger)
     
     # Details
     location = db.Column(db.String(200))
@@ -250,9 +343,14 @@ class Event(db.Model):
     # Relationships
     creator = db.relationship('User', backref='created_events')
     participants = db.relationship('EventParticipant', back_populates='event', cascade='all, delete-orphan')
+
+    # Participant count computed by the query itself (with_expression), see events.list_events
+    loaded_participant_count = query_expression()
     
     @property
     def participant_count(self):
+        if self.loaded_participant_count is not None:
+            return self.loaded_participant_count
         return len(self.participants)
     
     @property
@@ -274,6 +372,14 @@ class Event(db.Model):
         }
         return emojis.get(self.category, '💼')
     
+    __table_args__ = (
+        db.Index('ix_event_day_start', 'day_index', 'start_minute'),
+        # events.list_events: public events by category, sorted by date or creation
+        db.Index('ix_event_public_category_created', 'is_public', 'category', 'created_at'),
+        db.Index('ix_event_public_created', 'is_public', 'created_at'),
+        db.Index('ix_event_public_day_start', 'is_public', 'day_index', 'start_minute'),
+    )
+    
     def __repr__(self):
         return f"<Event {self.title} {self.day_of_week} {self.start_time}-{self.end_time}>"
 
@@ -294,7 +400,32 @@ class EventParticipant(db.Model):
     # Ensure a user can only join an event once
     __table_args__ = (
         db.UniqueConstraint('event_id', 'user_id', name='unique_event_user'),
+        db.Index('ix_event_participant_user', 'user_id', 'event_id'),
     )
     
     def __repr__(self):
         return f"<EventParticipant User:{self.user_id} Event:{self.event_id}>"
+
+
+class DataVersion(db.Model):
+    """Version counter of a set of data, bumped by its writers to invalidate caches"""
+    __tablename__ = 'data_version'
+
+    name = db.Column(db.String(100), primary_key=True)  # ex: "reference"
+    version = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DataVersion {self.name}={self.version}>"
+
+
+class SchemaMigration(db.Model):
+    """Schema migrations applied to this database (see migrations.py)"""
+    __tablename__ = 'schema_migration'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchemaMigration {self.version} {self.name}>"
@@ -0,0 +1,141 @@
+import base64
+import binascii
+import json
+import math
+from decimal import Decimal
+from sqlalchemy import and_, or_
+
+
+SHALLOW_PAGES = 5   # pages accessibles par numéro (OFFSET) ; au-delà, curseurs uniquement
+
+
+def encode_cursor(sort, values):
+    """Curseur opaque: valeurs des clés de tri d'une ligne, pour un tri donné"""
+    raw = json.dumps([sort, values], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """Valeurs d'un curseur, ou None s'il est invalide ou émis pour un autre tri"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_sort, values = json.loads(raw)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if cursor_sort != sort or not isinstance(values, list):
+        return None
+    return values
+
+
+def _beyond(keys, values):
+    """Lignes situées après values dans l'ordre keys: (k1 > v1) OR (k1 = v1 AND k2 > v2) ...
+
+    La borne redondante k1 >= v1 permet à la base de parcourir l'index par intervalle.
+    """
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        step = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*[k == v for (k, _), v in zip(keys[:i], values[:i])], step))
+    first, descending = keys[0]
+    bound = first <= values[0] if descending else first >= values[0]
+    return and_(bound, or_(*clauses))
+
+
+class KeysetPage:
+    """Page de résultats, avec la même interface que flask_sqlalchemy.Pagination pour les templates"""
+
+    def __init__(self, items, per_page, page, total, next_cursor, prev_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def pages(self):
+        if not self.total:
+            return 0
+        return math.ceil(self.total / self.per_page)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.page else None
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.page and self.page > 1 else None
+
+    def page_links(self):
+        """Numéros de page accessibles directement"""
+        return list(range(1, min(self.pages, SHALLOW_PAGES) + 1))
+
+
+def keyset_paginate(query, sort, keys, per_page, after=None, before=None, page=1, total=None):
+    """Pagine query selon keys [(expression, descendant)], dont la dernière doit être unique.
+
+    after/before: curseurs (encode_cursor) de la page suivante/précédente.
+    Sans curseur, la page est lue par OFFSET (pages peu profondes). page n'est
+    qu'indicatif avec un curseur ; total (COUNT) est fourni par l'appelant.
+    """
+    exprs = [expr for expr, _ in keys]
+    query = query.add_columns(*exprs)
+    after_values = decode_cursor(after, sort)
+    before_values = None if after_values is not None else decode_cursor(before, sort)
+
+    if before_values is not None:
+        # Page précédente: on remonte dans l'ordre inverse puis on retourne la page
+        rows = (
+            query.filter(_beyond([(e, not d) for e, d in keys], before_values))
+            .order_by(*[e.asc() if d else e.desc() for e, d in keys])
+            .limit(per_page + 1)
+            .all()
+        )
+        more_before = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_prev, has_next = more_before, True
+    else:
+        query = query.order_by(*[e.desc() if d else e.asc() for e, d in keys])
+        if after_values is not None:
+            query = query.filter(_beyond(keys, after_values))
+        else:
+            query = query.offset((max(page, 1) - 1) * per_page)
+        rows = query.limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after_values is not None or page > 1
+
+    if not rows and (after_values is not None or before_values is not None):
+        has_prev = has_next = False
+
+    def cursor_of(row):
+        return encode_cursor(sort, [_json_value(v) for v in row[1:]])
+
+    return KeysetPage(
+        items=[row[0] for row in rows],
+        per_page=per_page,
+        page=page,
+        total=total,
+        next_cursor=cursor_of(rows[-1]) if rows and has_next else None,
+        prev_cursor=cursor_of(rows[0]) if rows and has_prev else None,
+    )
+
+
+def _json_value(value):
+    """Valeur de clé sérialisable en JSON sans perte pour la comparaison"""
+    if isinstance(value, Decimal):
+        # SUM() d'entiers sous MariaDB: on garde un nombre (une chaîne se compare mal sous SQLite)
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    return str(value)
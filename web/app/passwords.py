@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from .profiling import register_metrics
+
+# Paramètres par défaut de werkzeug, tels qu'écrits dans le hash ("scrypt:32768:8:1$...")
+_METHOD_DEFAULTS = {
+    "scrypt": ["32768", "8", "1"],
+    "pbkdf2": ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)],
+}
+
+
+def hash_method():
+    """Méthode werkzeug configurée (Config.PASSWORD_HASH_METHOD)"""
+    return current_app.config["PASSWORD_HASH_METHOD"]
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+def hash_passwords(passwords, workers=None):
+    """Hache une liste de mots de passe dans un pool de processus; résultats dans l'ordre.
+
+    Le KDF est volontairement lent et tient le GIL: seuls des processus
+    séparés permettent d'utiliser plusieurs cœurs.
+    """
+    passwords = list(passwords)
+    fn = partial(generate_password_hash, method=hash_method())
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1:
+        return [fn(p) for p in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def _full_method(method):
+    """Méthode complétée par les paramètres par défaut ("scrypt" -> "scrypt:32768:8:1")"""
+    name, *args = method.split(":")
+    defaults = _METHOD_DEFAULTS.get(name, [])
+    return ":".join([name, *args, *defaults[len(args):]])
+
+
+def needs_rehash(pwhash):
+    """Vrai si pwhash n'a pas été calculé avec PASSWORD_HASH_METHOD (coût changé depuis)"""
+    return pwhash.split("$", 1)[0] != _full_method(hash_method())
+
+
+class VerificationBusy(Exception):
+    """Trop de vérifications en cours ou en attente: la demande est refusée"""
+
+
+class PasswordVerifier:
+    """Exécuteur borné des calculs de KDF de la connexion.
+
+    Au plus `workers` calculs en parallèle (hashlib libère le GIL pendant le
+    KDF) et `queue` en attente; au-delà, ou après `timeout` secondes d'attente,
+    VerificationBusy est levée au lieu de bloquer un fil du serveur de plus.
+    """
+
+    def __init__(self, workers, queue, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._lock = threading.Lock()
+        self.pending = 0       # calculs en cours ou en attente
+        self.counts = Counter()  # "verified", "failed", "rehashed", "queued", "rejected"
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise VerificationBusy()
+        with self._lock:
+            if self.pending >= self.workers:
+                self.counts["queued"] += 1  # a attendu un fil libre
+            self.pending += 1
+        # Le créneau n'est rendu qu'à la fin du calcul, même si l'appelant a abandonné
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            self._count("rejected")
+            raise VerificationBusy()
+
+    def verify(self, pwhash, password):
+        ok = self.run(check_password_hash, pwhash, password)
+        self._count("verified" if ok else "failed")
+        return ok
+
+    def rehash(self, password, method):
+        pwhash = self.run(partial(generate_password_hash, method=method), password)
+        self._count("rehashed")
+        return pwhash
+
+
+def verifier():
+    """Exécuteur de l'application (créé au premier usage, donc après le fork des workers gunicorn)"""
+    app = current_app
+    v = app.extensions.get("password_verifier")
+    if v is None:
+        config = app.config
+        workers = config["PASSWORD_VERIFY_WORKERS"] or os.cpu_count() or 1
+        v = PasswordVerifier(workers, config["PASSWORD_VERIFY_QUEUE"], config["PASSWORD_VERIFY_TIMEOUT"])
+        app.extensions["password_verifier"] = v
+    return v
+
+
+def verify_password(pwhash, password):
+    """Vérifie password dans l'exécuteur borné; lève VerificationBusy s'il est saturé"""
+    return verifier().verify(pwhash, password)
+
+
+def rehash_password(password):
+    """Nouveau hash de password avec PASSWORD_HASH_METHOD, calculé dans l'exécuteur borné"""
+    return verifier().rehash(password, hash_method())
+
+
+def metrics_lines():
+    v = current_app.extensions.get("password_verifier")
+    counts = v.counts if v else Counter()
+    lines = [
+        "# HELP unify_password_verifications_total Password KDF computations at login, by outcome (queued: had to wait)",
+        "# TYPE unify_password_verifications_total counter",
+    ]
+    for outcome in ("verified", "failed", "rehashed", "queued", "rejected"):
+        lines.append(f'unify_password_verifications_total{{outcome="{outcome}"}} {counts[outcome]}')
+    lines += [
+        "# HELP unify_password_pending Password KDF computations running or queued",
+        "# TYPE unify_password_pending gauge",
+        f"unify_password_pending {v.pending if v else 0}",
+    ]
+    return lines
+
+
+register_metrics(metrics_lines)
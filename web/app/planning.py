@@ -0,0 +1,173 @@
+"""
+Planning hebdomadaire d'un étudiant (cours suivis, activités, événements
+rejoints), calculé en trois requêtes et gardé en cache par utilisateur.
+
+Le cache (PLANNING_CACHE_BACKEND, par défaut un LRU en mémoire du processus)
+est invalidé:
+- par invalidate_planning(user_id) quand les inscriptions, activités ou
+  événements d'un utilisateur changent (suppression d'un événement: chacun de
+  ses participants): la version planning:<id> (data_version), relue à chaque
+  lecture, écarte aussi les copies gardées par les autres processus et sert de
+  validateur au flux iCalendar;
+- par invalidate_all_plannings() après un import: la version "planning"
+  (data_version) est relue au plus toutes les PLANNING_CACHE_CHECK secondes
+  par chaque processus.
+"""
+from importlib import import_module
+
+from flask import current_app
+from sqlalchemy import select
+
+from .cache import TTLCache, bump_version, current_version
+from .extensions import db
+from .models import Activity, Course, Enrollment, Event, EventParticipant, Professor, Student
+from .schedule import DAYS
+
+PLANNING = "planning"   # nom de version: changements en masse (imports)
+
+# Paramètres de la grille
+GRID_START_HOUR = 6
+GRID_END_HOUR = 23
+PX_PER_HOUR = 64  # Hauteur d'une heure
+MIN_HEIGHT = 18   # Minimum visuel
+
+_generation = TTLCache(maxsize=1)
+
+
+def _slot(kind, item_id, title, day, start, end, start_minute, end_minute, **extra):
+    return day, {
+        "kind": kind,
+        "id": item_id,
+        "title": title,
+        "start": start,
+        "end": end,
+        "start_minute": start_minute,
+        "end_minute": end_minute,
+        **extra,
+    }
+
+
+def planning_version(user_id):
+    """Nom de version du planning d'un utilisateur"""
+    return f"planning:{user_id}"
+
+
+def planning_statements(user_id):
+    """Les trois requêtes du planning de user_id: cours suivis, activités, événements rejoints"""
+    courses = (
+        select(Course.id, Course.name, Course.day_index, Course.start_time, Course.end_time,
+               Course.start_minute, Course.end_minute, Course.description,
+               Professor.first_name, Professor.last_name,
+               Course.semester, Course.academical_year, Course.created_at)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .join(Student, Student.id == Enrollment.student_id)
+        .outerjoin(Professor, Professor.id == Course.professor_id)
+        .where(Student.user_id == user_id, Enrollment.status == 'enrolled')
+    )
+    activities = (
+        select(Activity.id, Activity.title, Activity.day_index, Activity.start_time, Activity.end_time,
+               Activity.start_minute, Activity.end_minute, Activity.description,
+               Activity.semester, Activity.academical_year, Activity.created_at)
+        .where(Activity.user_id == user_id)
+    )
+    events = (
+        select(Event.id, Event.title, Event.day_index, Event.start_time, Event.end_time,
+               Event.start_minute, Event.end_minute, Event.description, Event.location, Event.created_at)
+        .join(EventParticipant, EventParticipant.event_id == Event.id)
+        .where(EventParticipant.user_id == user_id)
+    )
+    return courses, activities, events
+
+
+def planning_slots(user_id):
+    """(index du jour, créneau) des cours suivis, activités et événements rejoints de user_id"""
+    courses, activities, events = planning_statements(user_id)
+    rows = db.session.execute(courses)
+    for cid, name, day, start, end, s, e, description, first, last, semester, year, created_at in rows:
+        yield _slot("course", cid, name, day, start, end, s, e,
+                    professor_full_name=f"{first} {last}" if first is not None else None,
+                    description=description, semester=semester, academical_year=year, created_at=created_at)
+
+    for *row, description, semester, year, created_at in db.session.execute(activities):
+        yield _slot("activity", *row, description=description,
+                    semester=semester, academical_year=year, created_at=created_at)
+
+    for *row, description, location, created_at in db.session.execute(events):
+        yield _slot("event", *row, description=description, location=location, created_at=created_at)
+
+
+def build_planning(user_id):
+    """{jour: [créneaux positionnés sur la grille, triés par heure]}"""
+    schedule = {d: [] for d in DAYS}
+    min_start = GRID_START_HOUR * 60
+    max_end = GRID_END_HOUR * 60
+
+    for day, item in planning_slots(user_id):
+        s, e = item["start_minute"], item["end_minute"]
+        if day is None or s is None or e is None or e <= s:
+            continue
+
+        # Clamp à 06:00-23:00
+        s_clamped = max(s, min_start)
+        e_clamped = min(e, max_end)
+        if e_clamped <= s_clamped:
+            continue
+
+        item["top"] = round(((s_clamped - min_start) / 60) * PX_PER_HOUR, 2)
+        item["height"] = round(max(((e_clamped - s_clamped) / 60) * PX_PER_HOUR, MIN_HEIGHT), 2)
+        schedule[DAYS[day]].append(item)
+
+    for items in schedule.values():
+        items.sort(key=lambda x: x["start_minute"])
+    return schedule
+
+
+def _cache():
+    """Cache des plannings de l'application (créé au premier usage)"""
+    app = current_app
+    cache = app.extensions.get("planning_cache")
+    if cache is None:
+        backend = app.config["PLANNING_CACHE_BACKEND"]
+        if backend:
+            # "module:fabrique", appelée avec l'application; l'objet renvoyé offre
+            # get(key, build, ttl=None), delete(key) et clear() comme TTLCache
+            module, _, factory = backend.partition(":")
+            cache = getattr(import_module(module), factory)(app)
+        else:
+            cache = TTLCache(maxsize=app.config["PLANNING_CACHE_SIZE"], ttl=app.config["PLANNING_CACHE_TTL"])
+        app.extensions["planning_cache"] = cache
+    return cache
+
+
+def planning_for(user_id):
+    """Planning de user_id, depuis le cache s'il est encore valable"""
+    generation = _generation.get(
+        PLANNING, lambda: current_version(PLANNING), ttl=current_app.config["PLANNING_CACHE_CHECK"],
+    )
+    cache = _cache()
+    key = planning_version(user_id)
+    version = current_version(key)
+
+    def build():
+        return generation, version, build_planning(user_id)
+
+    entry = cache.get(key, build)
+    if entry[:2] != (generation, version):
+        cache.delete(key)
+        entry = cache.get(key, build)
+    return entry[2]
+
+
+def invalidate_planning(*user_ids):
+    """À appeler quand les inscriptions, activités ou événements de ces utilisateurs changent"""
+    cache = _cache()
+    for user_id in user_ids:
+        bump_version(planning_version(user_id))
+        cache.delete(planning_version(user_id))
+
+
+def invalidate_all_plannings():
+    """À appeler après des changements d'horaires en masse (sans commit)"""
+    bump_version(PLANNING)
+    _generation.clear()
+    _cache().clear()
@@ -0,0 +1,226 @@
+import hashlib
+import heapq
+import hmac
+import re
+import threading
+import time
+from collections import Counter
+from flask import Response, abort, before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+from .extensions import db
+
+
+SLOWEST_KEPT = 5       # requêtes les plus lentes gardées par endpoint
+STATEMENT_MAX = 300    # longueur max d'une requête dans les logs (slow query, N+1)
+
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """Forme d'une requête: IN (?, ?, ?) -> IN (?), espaces normalisés"""
+    return _SPACES_RE.sub(" ", _IN_LIST_RE.sub("(?)", statement)).strip()
+
+
+def statement_id(statement):
+    """Empreinte courte de la forme d'une requête (label Prometheus, logs)"""
+    return hashlib.sha1(statement_shape(statement).encode()).hexdigest()[:12]
+
+
+class RequestProfile:
+    """Mesures d'une requête HTTP: requêtes SQL, temps base, temps de rendu"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.shapes = Counter()
+        self.slowest = []          # tas (durée, empreinte, requête) des plus lentes
+        self._render_started = []
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+        item = (seconds, statement_id(statement), statement)
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+
+class EndpointStats:
+    """Cumul par endpoint depuis le démarrage du processus"""
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.seconds = 0.0
+        self.n_plus_one = 0
+        self.slowest = []
+
+    def add(self, profile, seconds, n_plus_one):
+        self.requests += 1
+        self.queries += profile.queries
+        self.db_seconds += profile.db_seconds
+        self.render_seconds += profile.render_seconds
+        self.seconds += seconds
+        self.n_plus_one += n_plus_one
+        self.slowest = heapq.nlargest(SLOWEST_KEPT, self.slowest + profile.slowest)
+
+
+_stats = {}
+_lock = threading.Lock()
+_collectors = []  # fonctions -> lignes ajoutées à /metrics (passwords, throttle...)
+_logged_ids = set()  # empreintes dont le texte SQL a déjà été journalisé
+
+
+def register_metrics(collect):
+    """Ajoute les lignes Prometheus renvoyées par collect() à /metrics"""
+    _collectors.append(collect)
+
+
+def endpoint_stats():
+    """Copie {endpoint: EndpointStats} des mesures du processus"""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+        _logged_ids.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profile_started", None)
+    if started is None or not has_request_context():
+        return
+    profile = g.get("profile")
+    if profile is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile.record(statement, elapsed)
+    if elapsed * 1000 >= current_app.config["PROFILING_SLOW_QUERY_MS"]:
+        current_app.logger.warning(
+            "Slow query %s (%.1f ms) in %s: %s",
+            statement_id(statement), elapsed * 1000, request.endpoint, statement[:STATEMENT_MAX],
+        )
+
+
+def _before_render(sender, template, context, **extra):
+    profile = g.get("profile") if has_request_context() else None
+    if profile is not None:
+        profile._render_started.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    profile = g.get("profile") if has_request_context() else None
+    if profile is not None and profile._render_started:
+        profile.render_seconds += time.perf_counter() - profile._render_started.pop()
+
+
+def _start_request():
+    g.profile = RequestProfile()
+
+
+def _finish_request(response):
+    profile = g.pop("profile", None)
+    if profile is None or request.endpoint is None:
+        return response
+    seconds = time.perf_counter() - profile.started
+    endpoint = request.endpoint
+
+    # N+1: la même forme de requête répétée dans une seule requête HTTP
+    threshold = current_app.config["PROFILING_N_PLUS_ONE"]
+    repeated = [(shape, n) for shape, n in profile.shapes.items() if n > threshold]
+    for shape, n in repeated:
+        current_app.logger.warning(
+            "Possible N+1 %s in %s: %d x %s", statement_id(shape), endpoint, n, shape[:STATEMENT_MAX],
+        )
+
+    with _lock:
+        _stats.setdefault(endpoint, EndpointStats()).add(profile, seconds, len(repeated))
+        new = {digest: statement for _, digest, statement in profile.slowest if digest not in _logged_ids}
+        _logged_ids.update(new)
+    # /metrics n'expose que l'empreinte: le texte complet est journalisé une fois
+    for digest, statement in new.items():
+        current_app.logger.info("SQL statement %s: %s", digest, statement)
+
+    if current_app.config["PROFILING_HEADER"]:
+        response.headers["Server-Timing"] = (
+            f'db;dur={profile.db_seconds * 1000:.1f};desc="{profile.queries} queries", '
+            f"render;dur={profile.render_seconds * 1000:.1f}, "
+            f"total;dur={seconds * 1000:.1f}"
+        )
+        response.headers["X-DB-Queries"] = str(profile.queries)
+    return response
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", " ").replace('"', '\\"')
+
+
+def metrics_text():
+    """Mesures au format texte Prometheus"""
+    stats = sorted(endpoint_stats().items())
+    lines = []
+    for name, attr, kind, help_text in (
+        ("unify_requests_total", "requests", "counter", "HTTP requests handled"),
+        ("unify_db_queries_total", "queries", "counter", "SQL statements executed"),
+        ("unify_db_seconds_total", "db_seconds", "counter", "Time spent in SQL statements"),
+        ("unify_render_seconds_total", "render_seconds", "counter", "Time spent rendering templates"),
+        ("unify_request_seconds_total", "seconds", "counter", "Time spent handling requests"),
+        ("unify_n_plus_one_total", "n_plus_one", "counter", "Repeated statement shapes (possible N+1)"),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for endpoint, s in stats:
+            lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {getattr(s, attr)}')
+    lines.append("# HELP unify_slowest_query_seconds Slowest SQL statements per endpoint")
+    lines.append("# TYPE unify_slowest_query_seconds gauge")
+    for endpoint, s in stats:
+        for rank, (seconds, digest, _) in enumerate(sorted(s.slowest, reverse=True), start=1):
+            lines.append(
+                f'unify_slowest_query_seconds{{endpoint="{_label(endpoint)}",rank="{rank}",'
+                f'statement="{digest}"}} {seconds:.6f}'
+            )
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+def metrics():
+    # Texte des requêtes SQL et temps par route: jeton exigé, sauf en mode debug sans jeton
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        expected = f"Bearer {token}".encode()
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+            abort(403)
+    elif not current_app.debug:
+        abort(403)
+    return Response(metrics_text(), mimetype="text/plain; version=0.0.4")
+
+
+def init_profiling(app):
+    """Branche le profilage SQL/rendu sur l'application et expose /metrics"""
+    if not app.config["PROFILING_ENABLED"]:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,76 @@
+from sqlalchemy import select
+
+from .cache import VersionedCache, bump_version, current_version
+from .extensions import db
+from .models import Course, CourseStudyPlan, Faculty, StudyPlan
+from .search import fold
+
+
+REFERENCE = "reference"   # nom de version: facultés, plans d'étude et leurs liens
+PLAN_LIMIT = 50           # nombre max de plans renvoyés par find_study_plans
+
+_cache = VersionedCache()
+
+
+def _load():
+    faculties = [
+        {"id": fid, "external_id": ext, "name": name}
+        for fid, ext, name in db.session.execute(
+            select(Faculty.id, Faculty.external_id, Faculty.name).order_by(Faculty.name.asc())
+        )
+    ]
+    plans = [
+        {"id": pid, "label": label, "folded": fold(label)}
+        for pid, label in db.session.execute(
+            select(StudyPlan.id, StudyPlan.label).order_by(StudyPlan.label.asc())
+        )
+    ]
+    # Un plan "appartient" aux facultés des cours qu'il contient
+    plans_by_faculty = {}
+    rows = db.session.execute(
+        select(Faculty.external_id, CourseStudyPlan.study_plan_id)
+        .join(Course, Course.faculty_id == Faculty.id)
+        .join(CourseStudyPlan, CourseStudyPlan.course_id == Course.id)
+        .distinct()
+    )
+    for ext, plan_id in rows:
+        plans_by_faculty.setdefault(ext, set()).add(plan_id)
+    return {
+        "faculties": faculties,
+        "plans": plans,
+        "plan_by_id": {p["id"]: p for p in plans},
+        "plans_by_faculty": plans_by_faculty,
+    }
+
+
+def reference_lists():
+    """Listes de référence du catalogue, reconstruites seulement après invalidate_reference()"""
+    return _cache.get(REFERENCE, current_version(REFERENCE), _load)
+
+
+def faculty_choices():
+    """[{id, external_id, name}] triées par nom"""
+    return reference_lists()["faculties"]
+
+
+def study_plan(plan_id):
+    """{id, label} d'un plan d'étude, ou None"""
+    return reference_lists()["plan_by_id"].get(plan_id)
+
+
+def find_study_plans(faculty_ext=None, q=None, limit=PLAN_LIMIT):
+    """Plans d'étude triés par libellé, filtrés par faculté et par texte (sans accents ni casse)"""
+    ref = reference_lists()
+    plans = ref["plans"]
+    if faculty_ext:
+        ids = ref["plans_by_faculty"].get(faculty_ext, set())
+        plans = [p for p in plans if p["id"] in ids]
+    needle = fold(q).strip() if q else ""
+    if needle:
+        plans = [p for p in plans if needle in p["folded"]]
+    return [{"id": p["id"], "label": p["label"]} for p in plans[:limit]]
+
+
+def invalidate_reference():
+    """À appeler par tout code qui modifie facultés, plans ou liens cours-plan (sans commit)"""
+    bump_version(REFERENCE)
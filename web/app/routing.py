@@ -0,0 +1,63 @@
+"""
+Routage des lectures vers les réplicas de la base.
+
+Les vues marquées @read_only lisent sur un réplica (choisi au hasard parmi
+DB_REPLICAS) quand la requête est un GET; tout le reste, et toute écriture
+(flush, INSERT/UPDATE/DELETE) même depuis une vue read_only, va sur la base
+principale. Après une écriture, le navigateur de l'auteur reste sur la base
+principale pendant REPLICA_STICKY_SECONDS pour relire ce qu'il vient d'écrire
+malgré le retard de réplication.
+"""
+import random
+import time
+
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.expression import SelectBase
+
+STICKY_KEY = "_db_primary_until"
+
+
+def read_only(view):
+    """Marque une vue qui n'écrit pas: ses lectures peuvent aller sur un réplica"""
+    view.read_only = True
+    return view
+
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy qui envoie les SELECT sur le réplica de la requête"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if isinstance(clause, SelectBase):
+                replica = g.get("db_replica")
+                if replica is not None:
+                    return self._db.engines[replica]
+            elif clause is not None or mapper is not None:
+                # flush (mapper sans clause) ou INSERT/UPDATE/DELETE
+                g.db_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _choose_bind():
+    g.db_replica = None
+    replicas = current_app.config["DB_REPLICAS"]
+    if not replicas or request.method not in ("GET", "HEAD"):
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, "read_only", False):
+        return
+    if session.get(STICKY_KEY, 0) > time.time():
+        return
+    g.db_replica = random.choice(replicas)
+
+
+def _stick_to_primary(response):
+    if g.get("db_wrote") and current_app.config["DB_REPLICAS"]:
+        session[STICKY_KEY] = time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+    return response
+
+
+def init_routing(app):
+    app.before_request(_choose_bind)
+    app.after_request(_stick_to_primary)
@@ -0,0 +1,240 @@
+from bisect import bisect_left
+from sqlalchemy import event, literal, select, union_all, update
+
+from .extensions import db
+from .models import Activity, Course, Enrollment, Event, EventParticipant, Student
+
+
+DAYS = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+
+DAY_ALIASES = {
+    "monday": "Lundi",
+    "tuesday": "Mardi",
+    "wednesday": "Mercredi",
+    "thursday": "Jeudi",
+    "friday": "Vendredi",
+    "saturday": "Samedi",
+    "sunday": "Dimanche",
+}
+DAY_ALIASES.update({d.lower(): d for d in DAYS})
+
+KIND_LABELS = {
+    "course": "Cours",
+    "activity": "Activité",
+    "event": "Événement",
+}
+
+
+def time_to_minutes(t: str | None):
+    """Convertit l'heure (HH:MM) en minutes depuis 00:00"""
+    if not t:
+        return None
+    try:
+        hh, mm = t.strip().split(":")
+        return int(hh) * 60 + int(mm)
+    except Exception:
+        return None
+
+
+def normalize_day(day):
+    """'Monday', 'lundi ' -> 'Lundi' ; None si inconnu"""
+    if not day:
+        return None
+    return DAY_ALIASES.get(str(day).strip().lower())
+
+
+def day_index(day):
+    """'Monday', 'Lundi' -> 0 ; None si inconnu"""
+    day = normalize_day(day)
+    return DAYS.index(day) if day else None
+
+
+def schedule_fields(day, start_time, end_time):
+    """Colonnes dérivées d'un créneau texte: day_index, start_minute, end_minute"""
+    return {
+        "day_index": day_index(day),
+        "start_minute": time_to_minutes(start_time),
+        "end_minute": time_to_minutes(end_time),
+    }
+
+
+class Timetable:
+    """Emploi du temps hebdomadaire d'un utilisateur, indexé par jour (0 = Lundi).
+
+    Chaque jour est une liste d'intervalles [début, fin[ en minutes triés par
+    début, avec le maximum cumulé des fins: savoir si [start, end[ chevauche
+    un créneau coûte une recherche dichotomique.
+    """
+
+    def __init__(self, entries=()):
+        by_day = {}
+        for day, start, end, item in entries:
+            if day is None or start is None or end is None or end <= start:
+                continue
+            by_day.setdefault(day, []).append((start, end, item))
+
+        self._days = {}
+        for day, intervals in by_day.items():
+            intervals.sort(key=lambda x: (x[0], x[1]))
+            max_end = []
+            current = None
+            for _, end, _ in intervals:
+                current = end if current is None else max(current, end)
+                max_end.append(current)
+            self._days[day] = ([s for s, _, _ in intervals], max_end, intervals)
+
+    def _candidates(self, day, start, end):
+        """(nombre de créneaux du jour commençant avant end, données du jour)"""
+        data = self._days.get(day)
+        if data is None or start is None or end is None or end <= start:
+            return None, None
+        return bisect_left(data[0], end), data
+
+    def overlaps(self, day, start, end):
+        """True si [start, end[ (minutes) chevauche un créneau du jour (index)"""
+        k, data = self._candidates(day, start, end)
+        if not k:
+            return False
+        return data[1][k - 1] > start
+
+    def conflicts(self, day, start, end, exclude=None):
+        """Créneaux du jour (index) qui chevauchent [start, end[ (minutes), par heure de début.
+
+        exclude: (kind, id) d'un élément à ignorer, p.ex. l'activité en cours d'édition.
+        """
+        k, data = self._candidates(day, start, end)
+        if not k:
+            return []
+        _, max_end, intervals = data
+        found = []
+        i = k - 1
+        # Au-delà, plus aucun créneau précédent ne se termine après start
+        while i >= 0 and max_end[i] > start:
+            s, e, item = intervals[i]
+            if e > start and (exclude is None or (item["kind"], item["id"]) != exclude):
+                found.append(item)
+            i -= 1
+        found.reverse()
+        return found
+
+
+def _slot_columns(kind, model, title):
+    return (
+        literal(kind).label("kind"), model.id, title.label("title"),
+        model.day_index, model.start_minute, model.end_minute, model.start_time, model.end_time,
+    )
+
+
+def _overlapping(model, day, start, end):
+    """Prédicats SQL: créneau valide du jour day qui chevauche [start, end["""
+    return (
+        model.day_index == day,
+        model.start_minute < end,
+        model.end_minute > start,
+        model.end_minute > model.start_minute,
+    )
+
+
+def _timetable_query(user_id, day=None, start=None, end=None):
+    """Créneaux d'un utilisateur (cours suivis, activités, événements rejoints) en une requête.
+
+    Avec day/start/end (index, minutes), seulement ceux qui chevauchent ce créneau.
+    """
+    courses = (
+        select(*_slot_columns("course", Course, Course.name))
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .join(Student, Student.id == Enrollment.student_id)
+        .where(Student.user_id == user_id, Enrollment.status == 'enrolled')
+    )
+    activities = (
+        select(*_slot_columns("activity", Activity, Activity.title))
+        .where(Activity.user_id == user_id)
+    )
+    events = (
+        select(*_slot_columns("event", Event, Event.title))
+        .join(EventParticipant, EventParticipant.event_id == Event.id)
+        .where(EventParticipant.user_id == user_id)
+    )
+    if day is not None:
+        courses = courses.where(*_overlapping(Course, day, start, end))
+        activities = activities.where(*_overlapping(Activity, day, start, end))
+        events = events.where(*_overlapping(Event, day, start, end))
+    return union_all(courses, activities, events)
+
+
+def _item(kind, item_id, title, start_time, end_time):
+    return {
+        "kind": kind,
+        "id": item_id,
+        "type": KIND_LABELS[kind],
+        "title": title,
+        "time": f"{start_time} - {end_time}",
+    }
+
+
+def load_timetable(user_id):
+    """Construit le Timetable d'un utilisateur"""
+    entries = []
+    for kind, item_id, title, day, start, end, start_time, end_time in db.session.execute(_timetable_query(user_id)):
+        entries.append((day, start, end, _item(kind, item_id, title, start_time, end_time)))
+    return Timetable(entries)
+
+
+def check_schedule_conflicts(user, day, start_time, end_time, exclude=None, timetable=None):
+    """Conflits entre le créneau (day, "HH:MM", "HH:MM") et l'emploi du temps de user.
+
+    Sans timetable, le chevauchement est filtré en SQL sur les colonnes en minutes.
+    """
+    slot = schedule_fields(day, start_time, end_time)
+    day, start, end = slot["day_index"], slot["start_minute"], slot["end_minute"]
+    if timetable is not None:
+        return timetable.conflicts(day, start, end, exclude=exclude)
+    if day is None or start is None or end is None or end <= start:
+        return []
+
+    rows = db.session.execute(_timetable_query(user.id, day, start, end)).all()
+    rows.sort(key=lambda r: (r.start_minute, r.end_minute))
+    return [
+        _item(kind, item_id, title, start_time, end_time)
+        for kind, item_id, title, _, _, _, start_time, end_time in rows
+        if exclude is None or (kind, item_id) != exclude
+    ]
+
+
+def conflict_message(conflicts):
+    """Message d'avertissement à afficher après une action créant un conflit"""
+    titles = ", ".join(f"{c['type']} « {c['title']} » ({c['time']})" for c in conflicts)
+    return f"Attention, conflit d'horaire avec : {titles}"
+
+
+def backfill_schedule_columns(chunk_size=1000):
+    """Recalcule day_index/start_minute/end_minute de toutes les lignes (sans commit).
+
+    Retourne {table: lignes modifiées}.
+    """
+    counts = {}
+    for model in (Course, Activity, Event):
+        changes = []
+        rows = db.session.execute(
+            select(model.id, model.day_of_week, model.start_time, model.end_time,
+                   model.day_index, model.start_minute, model.end_minute)
+        )
+        for item_id, day, start_time, end_time, *current in rows:
+            fields = schedule_fields(day, start_time, end_time)
+            if list(fields.values()) != current:
+                changes.append({"id": item_id, **fields})
+        for i in range(0, len(changes), chunk_size):
+            db.session.execute(update(model), changes[i:i + chunk_size])
+        counts[model.__tablename__] = len(changes)
+    return counts
+
+
+def _sync_schedule_fields(mapper, connection, target):
+    """Tient les colonnes en minutes à jour à chaque écriture ORM"""
+    for key, value in schedule_fields(target.day_of_week, target.start_time, target.end_time).items():
+        setattr(target, key, value)
+
+
+for _model in (Course, Activity, Event):
+    event.listen(_model, "before_insert", _sync_schedule_fields)
+    event.listen(_model, "before_update", _sync_schedule_fields)
@@ -0,0 +1,172 @@
+import re
+import unicodedata
+from sqlalchemy import case, delete, exists, func, insert, select
+
+from .cache import TTLCache
+from .extensions import db
+from .models import Course, CourseSearchTerm
+
+
+# Poids de chaque champ dans le score d'un cours
+FIELD_WEIGHTS = {
+    "code": 10,
+    "name": 4,
+    "description": 1,
+}
+EXACT_BONUS = 2          # un terme exact compte double par rapport à un simple préfixe
+MAX_TERM_LENGTH = 64     # = CourseSearchTerm.term
+MAX_QUERY_TERMS = 8
+MAX_OCCURRENCES = 3      # plafond par champ pour éviter qu'une longue description domine
+
+STOPWORDS = {
+    "a", "au", "aux", "avec", "d", "dans", "de", "des", "du", "en", "et", "l", "la",
+    "le", "les", "ou", "par", "pour", "sur", "un", "une",
+    "and", "for", "in", "of", "on", "the", "to",
+}
+
+INDEX_CHECK_TTL = 60     # relecture (s) de l'état de l'index, par processus
+
+_index_state = TTLCache(maxsize=1)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+
+def fold(text):
+    """Minuscules sans accents: 'Économie' -> 'economie'"""
+    text = str(text).lower().translate(_LIGATURES)
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    """Découpe un texte en termes normalisés (sans mots vides)"""
+    if not text:
+        return []
+    return [
+        t[:MAX_TERM_LENGTH]
+        for t in _TOKEN_RE.findall(fold(text))
+        if t not in STOPWORDS
+    ]
+
+
+def course_terms(code, name, description):
+    """Calcule {terme: poids} pour un cours"""
+    weights = {}
+    for field, text in (("code", code), ("name", name), ("description", description)):
+        counts = {}
+        for t in tokenize(text):
+            counts[t] = counts.get(t, 0) + 1
+        for t, n in counts.items():
+            weights[t] = weights.get(t, 0) + FIELD_WEIGHTS[field] * min(n, MAX_OCCURRENCES)
+    return weights
+
+
+def query_terms(q):
+    """Termes distincts d'une recherche, dans l'ordre de saisie"""
+    seen = []
+    for t in tokenize(q):
+        if t not in seen:
+            seen.append(t)
+    return seen[:MAX_QUERY_TERMS]
+
+
+def _rows_for(course_id, code, name, description):
+    return [
+        {"term": t, "course_id": course_id, "weight": w}
+        for t, w in course_terms(code, name, description).items()
+    ]
+
+
+def index_courses(courses, chunk_size=500):
+    """(Ré)indexe les cours donnés dans la session courante (sans commit).
+
+    Les cours doivent avoir un id (après flush).
+    """
+    index_course_rows(
+        [{"id": c.id, "code": c.code, "name": c.name, "description": c.description}
+         for c in courses if c.id is not None],
+        chunk_size=chunk_size,
+    )
+
+
+def index_course_rows(courses, chunk_size=500):
+    """Comme index_courses, pour des dicts {id, code, name, description}"""
+    for i in range(0, len(courses), chunk_size):
+        chunk = courses[i:i + chunk_size]
+        ids = [c["id"] for c in chunk]
+        db.session.execute(delete(CourseSearchTerm).where(CourseSearchTerm.course_id.in_(ids)))
+        rows = []
+        for c in chunk:
+            rows.extend(_rows_for(c["id"], c["code"], c["name"], c["description"]))
+        if rows:
+            db.session.execute(insert(CourseSearchTerm), rows)
+
+
+def rebuild_index(chunk_size=1000):
+    """Reconstruit tout l'index depuis la table course (sans commit). Retourne le nombre de termes."""
+    db.session.execute(delete(CourseSearchTerm))
+    total = 0
+    rows = []
+    stmt = select(Course.id, Course.code, Course.name, Course.description).execution_options(yield_per=chunk_size)
+    for course_id, code, name, description in db.session.execute(stmt):
+        rows.extend(_rows_for(course_id, code, name, description))
+        if len(rows) >= chunk_size:
+            db.session.execute(insert(CourseSearchTerm), rows)
+            total += len(rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(CourseSearchTerm), rows)
+        total += len(rows)
+    _index_state.clear()
+    return total
+
+
+def index_ready():
+    """L'index contient-il des termes ? (faux sur une base pas encore indexée)"""
+    return _index_state.get("ready", lambda: bool(db.session.scalar(select(exists().select_from(CourseSearchTerm)))),
+                            ttl=INDEX_CHECK_TTL)
+
+
+def _prefix_upper_bound(term):
+    """Plus petite chaîne supérieure à tous les termes commençant par term"""
+    return term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def search_subquery(q):
+    """Sous-requête (course_id, score) des cours contenant tous les termes de q.
+
+    Chaque terme est cherché en préfixe via un intervalle [terme, borne[ sur la
+    clé primaire (term, course_id), ce qui évite le parcours complet qu'impose
+    un LIKE insensible à la casse. Retourne None si q ne contient aucun terme
+    exploitable.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return None
+
+    parts = []
+    for i, t in enumerate(terms):
+        weight = case(
+            (CourseSearchTerm.term == t, CourseSearchTerm.weight * EXACT_BONUS),
+            else_=CourseSearchTerm.weight,
+        )
+        parts.append(
+            select(CourseSearchTerm.course_id, func.sum(weight).label("score"))
+            .where(CourseSearchTerm.term >= t, CourseSearchTerm.term < _prefix_upper_bound(t))
+            .group_by(CourseSearchTerm.course_id)
+            .subquery(f"term_{i}")
+        )
+
+    first = parts[0]
+    joined = first
+    score = first.c.score
+    for p in parts[1:]:
+        joined = joined.join(p, p.c.course_id == first.c.course_id)
+        score = score + p.c.score
+
+    return (
+        select(first.c.course_id.label("course_id"), score.label("score"))
+        .select_from(joined)
+        .subquery("search")
+    )
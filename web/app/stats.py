@@ -0,0 +1,105 @@
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm.util import identity_key
+
+from .extensions import db
+from .models import Course, CourseStats, Enrollment
+
+
+STAT_COLUMNS = ("enrolled_count", "feedback_count", "hours_sum", "hours_count", "grade_sum", "grade_count")
+
+
+def snapshot(enrollment):
+    """Valeurs d'une inscription qui comptent dans les statistiques (None si absente)"""
+    if enrollment is None:
+        return None
+    return (enrollment.status, enrollment.weekly_hours, enrollment.student_grade)
+
+
+def _contribution(snap):
+    """Contribution d'une inscription à chaque colonne de CourseStats"""
+    if snap is None:
+        return dict.fromkeys(STAT_COLUMNS, 0)
+    status, weekly_hours, student_grade = snap
+    completed = status == 'completed'
+    has_hours = completed and bool(weekly_hours)
+    has_grade = completed and student_grade is not None
+    return {
+        "enrolled_count": 1 if status == 'enrolled' else 0,
+        "feedback_count": 1 if completed else 0,
+        "hours_sum": weekly_hours if has_hours else 0,
+        "hours_count": 1 if has_hours else 0,
+        "grade_sum": student_grade if has_grade else 0,
+        "grade_count": 1 if has_grade else 0,
+    }
+
+
+def record_enrollment_change(course_id, before, after):
+    """Applique à course_stats la différence entre deux snapshots d'une inscription.
+
+    À appeler après le flush du changement, dans la même transaction.
+    before=None pour une création, after=None pour une suppression.
+    """
+    old, new = _contribution(before), _contribution(after)
+    delta = {k: new[k] - old[k] for k in STAT_COLUMNS if new[k] != old[k]}
+    if not delta:
+        return
+
+    values = {k: getattr(CourseStats, k) + d for k, d in delta.items()}
+    result = db.session.execute(
+        update(CourseStats).where(CourseStats.course_id == course_id).values(**values),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount == 0:
+        # Pas encore de ligne pour ce cours: on la calcule depuis les inscriptions
+        refresh_course_stats(course_id)
+    else:
+        _forget_loaded(course_id)
+
+
+def _forget_loaded(course_id):
+    """Écarte les statistiques déjà chargées dans la session, modifiées en SQL direct"""
+    stats = db.session.identity_map.get(identity_key(CourseStats, course_id))
+    if stats is not None:
+        db.session.expunge(stats)
+    course = db.session.identity_map.get(identity_key(Course, course_id))
+    if course is not None:
+        db.session.expire(course, ["stats"])
+
+
+def _aggregate_select():
+    completed = Enrollment.status == 'completed'
+    has_hours = completed & (Enrollment.weekly_hours.isnot(None)) & (Enrollment.weekly_hours != 0)
+    has_grade = completed & (Enrollment.student_grade.isnot(None))
+    return select(
+        Enrollment.course_id,
+        func.sum(case((Enrollment.status == 'enrolled', 1), else_=0)),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((has_hours, Enrollment.weekly_hours), else_=0)),
+        func.sum(case((has_hours, 1), else_=0)),
+        func.sum(case((has_grade, Enrollment.student_grade), else_=0.0)),
+        func.sum(case((has_grade, 1), else_=0)),
+    ).group_by(Enrollment.course_id)
+
+
+def refresh_course_stats(course_id):
+    """Recalcule la ligne course_stats d'un cours (sans commit)"""
+    db.session.execute(delete(CourseStats).where(CourseStats.course_id == course_id))
+    db.session.execute(
+        insert(CourseStats).from_select(
+            ["course_id", *STAT_COLUMNS],
+            _aggregate_select().where(Enrollment.course_id == course_id),
+        )
+    )
+    _forget_loaded(course_id)
+
+
+def rebuild_course_stats():
+    """Recalcule toute la table course_stats en une requête (sans commit). Retourne le nombre de cours."""
+    db.session.execute(delete(CourseStats))
+    db.session.execute(insert(CourseStats).from_select(["course_id", *STAT_COLUMNS], _aggregate_select()))
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, CourseStats):
+            db.session.expunge(obj)
+        elif isinstance(obj, Course):
+            db.session.expire(obj, ["stats"])
+    return db.session.scalar(select(func.count()).select_from(CourseStats))
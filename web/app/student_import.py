@@ -0,0 +1,176 @@
+"""
+Création en masse de comptes étudiants (User + Student) depuis un CSV.
+
+Colonnes: username, email, matricule, first_name, last_name, et password
+(facultatif: le mot de passe par défaut sinon). Les noms d'utilisateur,
+emails et matricules existants sont préchargés une fois; chaque lot est validé
+en mémoire (champs requis, longueurs des colonnes, doublons en base et dans le
+fichier, sans tenir compte de la casse comme la collation de MariaDB), haché
+dans un pool de processus puis inséré en deux INSERT multi-lignes. Une ligne
+invalide est écartée avec son motif au lieu d'interrompre l'import; si la base
+refuse un lot, il est coupé en deux jusqu'à isoler les lignes fautives.
+"""
+import csv
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .extensions import db
+from .importer import batched
+from .models import Student, User
+from .passwords import hash_password, hash_passwords
+
+REQUIRED = ("username", "email", "matricule", "first_name", "last_name")
+UNIQUE = ("username", "email", "matricule")
+COLUMNS = {
+    "username": User.username, "email": User.email, "matricule": Student.matricule,
+    "first_name": Student.first_name, "last_name": Student.last_name,
+}
+MAX_LENGTHS = {field: column.type.length for field, column in COLUMNS.items()}
+
+
+class CsvFormatError(ValueError):
+    """Fichier CSV inutilisable (colonnes requises absentes, syntaxe)"""
+
+
+class StudentImporter:
+    """Import des comptes étudiants par lots, un commit par lot.
+
+    Utilisation: add_batch(rows) avec des (numéro de ligne, dict) autant de fois
+    que nécessaire, puis finish(). Les lignes refusées sont dans errors.
+    """
+
+    def __init__(self, default_password, chunk_size=1000, hash_workers=None, reuse_hash=False):
+        self.default_password = default_password
+        self.chunk_size = chunk_size
+        self.hash_workers = hash_workers
+        self.reuse_hash = reuse_hash
+        self._shared_hash = None
+        self.started = time.perf_counter()
+        self.hash_seconds = 0.0
+        self.records = 0
+        self.created = 0
+        self.errors = []  # (numéro de ligne, ligne, motif)
+
+        # Clés uniques déjà prises (casefold), complétées au fil de l'import
+        self.taken = {
+            field: {value.casefold() for value in db.session.scalars(select(COLUMNS[field]))}
+            for field in UNIQUE
+        }
+
+    def _validate(self, row):
+        """Motif du refus d'une ligne, ou None"""
+        missing = [f for f in REQUIRED if not row[f]]
+        if missing:
+            return f"champs manquants: {', '.join(missing)}"
+        too_long = [f"{f} > {n}" for f, n in MAX_LENGTHS.items() if len(row[f]) > n]
+        if too_long:
+            return f"champs trop longs: {', '.join(too_long)}"
+        if "@" not in row["email"]:
+            return "email invalide"
+        for field in UNIQUE:
+            if row[field].casefold() in self.taken[field]:
+                return f"{field} déjà utilisé: {row[field]}"
+        return None
+
+    def _hash(self, passwords):
+        """Hashes de passwords (None = mot de passe par défaut), dans l'ordre"""
+        started = time.perf_counter()
+        if self.reuse_hash:
+            # Mot de passe par défaut haché une seule fois pour tout l'import
+            custom = [i for i, p in enumerate(passwords) if p is not None]
+            if self._shared_hash is None and len(custom) < len(passwords):
+                self._shared_hash = hash_password(self.default_password)
+            hashes = [self._shared_hash] * len(passwords)
+        else:
+            custom = list(range(len(passwords)))
+            hashes = [None] * len(passwords)
+        computed = hash_passwords([passwords[i] or self.default_password for i in custom], workers=self.hash_workers)
+        for i, h in zip(custom, computed):
+            hashes[i] = h
+        self.hash_seconds += time.perf_counter() - started
+        return hashes
+
+    def add_batch(self, rows):
+        """Valide, hache et insère un lot de (numéro de ligne, dict brut du CSV)"""
+        accepted = []
+        for line, raw in rows:
+            self.records += 1
+            row = {f: (raw.get(f) or "").strip() for f in (*REQUIRED, "password")}
+            reason = self._validate(row)
+            if reason:
+                self.errors.append((line, raw, reason))
+                continue
+            for field in UNIQUE:
+                self.taken[field].add(row[field].casefold())
+            accepted.append((line, raw, row))
+        if not accepted:
+            return
+
+        hashes = self._hash([row["password"] or None for _, _, row in accepted])
+        self._insert(list(zip(accepted, hashes)))
+
+    def _insert(self, items):
+        """Insère et valide items [((ligne, brut, row), hash)]; coupe le lot en deux si la base le refuse"""
+        try:
+            for chunk in batched(items, self.chunk_size):
+                user_ids = db.session.scalars(
+                    insert(User).returning(User.id, sort_by_parameter_order=True),
+                    [{"username": row["username"], "email": row["email"], "password_hash": h}
+                     for (_, _, row), h in chunk],
+                ).all()
+                db.session.execute(insert(Student), [
+                    {"user_id": user_id, "matricule": row["matricule"],
+                     "first_name": row["first_name"], "last_name": row["last_name"]}
+                    for user_id, ((_, _, row), _) in zip(user_ids, chunk)
+                ])
+            db.session.commit()
+        except (IntegrityError, DataError) as e:
+            # Compte créé entre-temps par un autre chemin (inscription), valeur refusée
+            # par la base: seules les lignes fautives sont écartées
+            db.session.rollback()
+            if len(items) == 1:
+                (line, raw, _), _ = items[0]
+                self.errors.append((line, raw, f"refusé par la base: {e.orig}"))
+                return
+            middle = len(items) // 2
+            self._insert(items[:middle])
+            self._insert(items[middle:])
+            return
+        self.created += len(items)
+
+    def finish(self):
+        """Compteurs, temps total et débit (lignes lues par seconde)"""
+        elapsed = time.perf_counter() - self.started
+        return {
+            "records": self.records,
+            "students_created": self.created,
+            "errors": len(self.errors),
+            "password_hash_sec": round(self.hash_seconds, 2),
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(self.records / elapsed) if elapsed else None,
+        }
+
+    def write_errors(self, path):
+        """Fichier CSV des lignes refusées: numéro de ligne, motif, colonnes d'origine"""
+        # Sans la colonne password: le fichier d'erreurs ne doit pas contenir de mots de passe en clair
+        fieldnames = [k for k in self.errors[0][1] if k not in (None, "password")] if self.errors else list(REQUIRED)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["line", "error", *fieldnames], extrasaction="ignore")
+            writer.writeheader()
+            for line, raw, reason in self.errors:
+                writer.writerow({**raw, "line": line, "error": reason})
+
+
+def iter_csv_rows(fp, delimiter=","):
+    """(numéro de ligne, dict) des lignes d'un CSV à en-tête; vérifie les colonnes requises"""
+    reader = csv.DictReader(fp, delimiter=delimiter)
+    try:
+        missing = [f for f in REQUIRED if f not in (reader.fieldnames or [])]
+        if missing:
+            raise CsvFormatError(f"CSV invalide: colonnes manquantes: {', '.join(missing)}")
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as e:
+        raise CsvFormatError(f"CSV invalide (ligne {reader.line_num}): {e}") from e
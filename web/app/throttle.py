@@ -0,0 +1,111 @@
+"""
+Limitation du nombre de tentatives par seau à jetons (token bucket).
+
+Chaque clé (compte, adresse IP) a un seau de `burst` jetons, rempli au rythme
+de burst jetons par `period` secondes; une tentative consomme un jeton et est
+refusée quand le seau est vide. Les seaux vivent en mémoire du processus
+(LOGIN_THROTTLE_BACKEND remplace ce stockage par un stockage partagé).
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from importlib import import_module
+
+from flask import current_app
+
+from .profiling import register_metrics
+
+
+class TokenBuckets:
+    """Seaux à jetons en mémoire du processus, bornés en nombre (LRU)"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, burst, period):
+        """Consomme un jeton du seau key; secondes à attendre si le seau est vide, sinon 0"""
+        rate = burst / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, at = self._data.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - at) * rate)
+            if tokens < 1:
+                self._data[key] = (tokens, now)
+                self._data.move_to_end(key)
+                return (1 - tokens) / rate
+            self._data[key] = (tokens - 1, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return 0
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+throttled = Counter()  # tentatives refusées par portée ("account", "ip")
+_throttled_lock = threading.Lock()
+
+
+def parse_limit(value):
+    """"burst/period" (ex. "10/300") -> (burst, period), ou None si désactivé ("0" ou vide)"""
+    if not value or value == "0":
+        return None
+    burst, _, period = value.partition("/")
+    return int(burst), float(period or 60)
+
+
+def buckets():
+    """Stockage des seaux de l'application (créé au premier usage)"""
+    app = current_app
+    store = app.extensions.get("login_buckets")
+    if store is None:
+        backend = app.config["LOGIN_THROTTLE_BACKEND"]
+        if backend:
+            # "module:fabrique", appelée avec l'application; l'objet renvoyé
+            # offre take(key, burst, period) comme TokenBuckets
+            module, _, factory = backend.partition(":")
+            store = getattr(import_module(module), factory)(app)
+        else:
+            store = TokenBuckets()
+        app.extensions["login_buckets"] = store
+    return store
+
+
+def login_wait(account=None, ip=None):
+    """Secondes avant la prochaine tentative de connexion permise pour ce compte et cette IP (0 = permise)
+
+    Une clé absente n'est pas limitée: la route prend le seau de l'IP avant de
+    chercher le compte, puis celui du compte.
+    """
+    config = current_app.config
+    store = buckets()
+    wait = 0
+    for scope, key, limit in (
+        ("ip", ip, parse_limit(config["LOGIN_THROTTLE_IP"])),
+        ("account", account, parse_limit(config["LOGIN_THROTTLE_ACCOUNT"])),
+    ):
+        if limit is None or not key:
+            continue
+        scope_wait = store.take(f"login:{scope}:{key}", *limit)
+        if scope_wait:
+            with _throttled_lock:
+                throttled[scope] += 1
+            wait = max(wait, scope_wait)
+    return wait
+
+
+def metrics_lines():
+    lines = [
+        "# HELP unify_login_throttled_total Login attempts refused by the rate limiter",
+        "# TYPE unify_login_throttled_total counter",
+    ]
+    for scope in ("account", "ip"):
+        lines.append(f'unify_login_throttled_total{{scope="{scope}"}} {throttled[scope]}')
+    return lines
+
+
+register_metrics(metrics_lines)
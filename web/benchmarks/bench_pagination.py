@@ -0,0 +1,94 @@
+"""
+Benchmark de la pagination du catalogue: OFFSET vs pagination par clé (curseurs).
+
+Remplit une base SQLite temporaire de --size cours (courses.json dupliqué) puis
+mesure, pour chaque tri, la latence de la première page, du milieu et de la
+dernière page avec les deux méthodes (hors COUNT, mis en cache par le catalogue).
+
+Usage (depuis web/):
+    python -m benchmarks.bench_pagination --size 50000 --repeat 10
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_search import _load_courses, _median_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", default=str(Path(__file__).resolve().parents[1] / "app" / "ressources" / "courses.json"))
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URI"] = f"sqlite:///{tmp.name}"
+
+    from sqlalchemy import insert
+    from app import create_app
+    from app.extensions import db
+    from app.models import User, Professor, Course
+    from app.pagination import encode_cursor, keyset_paginate
+
+    app = create_app()
+    source = _load_courses(args.json)
+    per_page = 25
+    sorts = {
+        "code": [(Course.code, False)],
+        "name": [(Course.name, False), (Course.code, False)],
+        "credits": [(Course.credits, True), (Course.code, False)],
+    }
+
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@unige.local", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        prof = Professor(user_id=user.id, first_name="Bench", last_name="Bench", department="Bench")
+        db.session.add(prof)
+        db.session.flush()
+        rows = []
+        for i in range(args.size):
+            c = source[i % len(source)]
+            suffix = i // len(source)
+            rows.append({
+                "code": f"{c['code']}-{suffix}"[:20] if suffix else str(c["code"])[:20],
+                "name": str(c["title"])[:200],
+                "credits": 1 + i % 12,
+                "professor_id": prof.id,
+            })
+        db.session.execute(insert(Course), rows)
+        db.session.commit()
+
+        last_page = (args.size + per_page - 1) // per_page
+        print(f"{'sort':<8} {'page':>7} {'offset ms':>10} {'keyset ms':>10}")
+        for sort, keys in sorts.items():
+            order = [e.desc() if d else e.asc() for e, d in keys]
+            exprs = [e for e, _ in keys]
+            for page in (1, last_page // 2, last_page):
+                # Curseur de la ligne qui précède la page, comme le lien "Suivant" de la page d'avant
+                cursor = None
+                if page > 1:
+                    prev = Course.query.with_entities(*exprs).order_by(*order).offset((page - 1) * per_page - 1).first()
+                    cursor = encode_cursor(sort, list(prev))
+
+                def offset_page():
+                    return Course.query.order_by(*order).offset((page - 1) * per_page).limit(per_page).all()
+
+                def keyset_page():
+                    return keyset_paginate(Course.query, sort, keys, per_page, after=cursor, page=page).items
+
+                assert [c.id for c in offset_page()] == [c.id for c in keyset_page()]
+                t_offset = _median_ms(offset_page, args.repeat)
+                t_keyset = _median_ms(keyset_page, args.repeat)
+                print(f"{sort:<8} {page:>7} {t_offset:>10.2f} {t_keyset:>10.2f}")
+                db.session.expunge_all()
+
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark de la recherche du catalogue: latence vs taille du catalogue.
+
+Compare l'ancien filtre `ilike '%q%'` et l'index inversé (app.search) sur une
+base SQLite temporaire remplie à partir de courses.json (dupliqué pour atteindre
+les tailles demandées).
+
+Usage (depuis web/):
+    python -m benchmarks.bench_search --sizes 1000,5000,20000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+QUERIES = ["hist", "droit", "32J", "introduction programmation", "economie", "séminaire littérature"]
+
+
+def _load_courses(json_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        return [c for c in json.load(f).get("courses", []) if c.get("code") and c.get("title")]
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", default=str(Path(__file__).resolve().parents[1] / "app" / "ressources" / "courses.json"))
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URI"] = f"sqlite:///{tmp.name}"
+
+    from sqlalchemy import or_
+    from app import create_app
+    from app.extensions import db
+    from app.models import User, Professor, Course
+    from app.search import index_courses, search_subquery
+
+    app = create_app()
+    source = _load_courses(args.json)
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@unige.local", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        prof = Professor(user_id=user.id, first_name="Bench", last_name="Bench", department="Bench")
+        db.session.add(prof)
+        db.session.commit()
+        prof_id = prof.id
+
+        # Comme le catalogue: première page de 25 + COUNT(*) de la pagination
+        def ilike_search(q):
+            like = f"%{q}%"
+            query = Course.query.filter(or_(Course.code.ilike(like), Course.name.ilike(like)))
+            return query.count(), query.order_by(Course.code.asc()).limit(25).all()
+
+        def index_search(q):
+            search = search_subquery(q)
+            query = Course.query.join(search, search.c.course_id == Course.id)
+            return query.count(), query.order_by(search.c.score.desc(), Course.code.asc()).limit(25).all()
+
+        count = 0
+        print(f"{'size':>8} {'query':<28} {'ilike ms':>10} {'index ms':>10}")
+        for size in sizes:
+            batch = []
+            while count < size:
+                c = source[count % len(source)]
+                suffix = count // len(source)
+                batch.append(Course(
+                    code=f"{c['code']}-{suffix}"[:20] if suffix else str(c["code"])[:20],
+                    name=str(c["title"])[:200],
+                    description="\n\n".join(str(c[k]) for k in ("objective", "description") if c.get(k)) or None,
+                    credits=3,
+                    professor_id=prof_id,
+                ))
+                count += 1
+            db.session.add_all(batch)
+            db.session.flush()
+            index_courses(batch)
+            db.session.commit()
+
+            for q in QUERIES:
+                t_ilike = _median_ms(lambda: ilike_search(q), args.repeat)
+                t_index = _median_ms(lambda: index_search(q), args.repeat)
+                print(f"{size:>8} {q:<28} {t_ilike:>10.2f} {t_index:>10.2f}")
+                db.session.expunge_all()
+
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Banc de mesure des pages de chaque blueprint, avec sortie JSON comparable.
+
+Construit l'application (create_app) sur une base SQLite temporaire (ou
+--database-uri, qui est vidée), génère un jeu de données à l'échelle demandée
+(cours de courses.json, étudiants, inscriptions, activités, événements), puis
+mesure pour chaque scénario les percentiles de latence, le débit et le nombre
+de requêtes SQL par page (en-tête X-DB-Queries du profilage).
+
+Usage (depuis web/):
+    python -m benchmarks.run --students 500 --courses 5000 --out bench.json
+    python -m benchmarks.run --baseline bench.json      # code de sortie 1 si régression
+
+Avec --url, les requêtes passent par HTTP vers un serveur déjà lancé sur la même
+base (--database-uri), --concurrency clients à la fois; --reuse garde les
+données générées par un passage précédent.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+PASSWORD = "bench-password"
+CATEGORIES = ["study", "sport", "social", "gaming", "food", "creative", "other"]
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _slot(rng):
+    start = rng.randint(8, 19) * 60 + rng.choice([0, 15, 30, 45])
+    end = start + rng.choice([45, 60, 90, 120])
+    return rng.choice(DAYS), f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"
+
+
+def build_dataset(args, rng):
+    """Remplit la base; retourne les identifiants utiles aux scénarios"""
+    from sqlalchemy import insert, select
+    from app.extensions import db
+    from app.importer import CourseImporter, batched
+    from app.models import Activity, Course, Enrollment, Event, EventParticipant, Student, User
+    from app.passwords import hash_password
+    from app.schedule import schedule_fields
+    from app.search import index_course_rows
+    from app.stats import rebuild_course_stats
+
+    def insert_ids(model, rows):
+        ids = []
+        for chunk in batched(rows, 1000):
+            ids += db.session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), chunk).scalars().all()
+        return ids
+
+    db.create_all()
+
+    # Cours: le flux réel, puis des copies jusqu'à --courses
+    with open(args.json, "r", encoding="utf-8") as f:
+        records = json.load(f).get("courses", [])
+    importer = CourseImporter("bench", reuse_hash=True)
+    for batch in batched(records, 1000):
+        importer.add_batch(batch)
+    importer.finish()
+
+    existing = db.session.execute(
+        select(Course.code, Course.name, Course.description, Course.credits, Course.professor_id,
+               Course.day_of_week, Course.start_time, Course.end_time, Course.faculty_id)
+    ).all()
+    extra = []
+    for i in range(max(0, args.courses - len(existing))):
+        row = existing[i % len(existing)]._asdict()
+        row["code"] = f"{row['code']}-{i // len(existing) + 1}"[:20]
+        extra.append({**row, **schedule_fields(row["day_of_week"], row["start_time"], row["end_time"])})
+    ids = insert_ids(Course, extra)
+    index_course_rows([{"id": i, **r} for i, r in zip(ids, extra)], chunk_size=1000)
+
+    course_ids = db.session.scalars(select(Course.id).where(Course.day_index.isnot(None))).all()
+
+    # Étudiants (un seul hachage du mot de passe pour tous)
+    password_hash = hash_password(PASSWORD)
+    now = datetime.utcnow()
+    user_ids = insert_ids(User, [
+        {"username": f"bench{i}", "email": f"bench{i}@etu.unige.local", "password_hash": password_hash, "created_at": now}
+        for i in range(args.students)
+    ])
+    student_ids = insert_ids(Student, [
+        {"user_id": uid, "first_name": "Bench", "last_name": str(i), "matricule": f"B{i:07d}"}
+        for i, uid in enumerate(user_ids)
+    ])
+
+    enrollments, activities = [], []
+    for sid, uid in zip(student_ids, user_ids):
+        for cid in rng.sample(course_ids, min(args.enrollments, len(course_ids))):
+            completed = rng.random() < 0.3
+            enrollments.append({
+                "student_id": sid, "course_id": cid, "enrollment_date": now,
+                "status": "completed" if completed else "enrolled",
+                "weekly_hours": rng.randint(2, 15) if completed else None,
+                "student_grade": round(rng.uniform(3, 6), 1) if completed else None,
+            })
+        for j in range(args.activities):
+            day, start, end = _slot(rng)
+            activities.append({
+                "user_id": uid, "title": f"Activité {j}", "day_of_week": day, "start_time": start,
+                "end_time": end, "created_at": now, **schedule_fields(day, start, end),
+            })
+    for chunk in batched(enrollments, 1000):
+        db.session.execute(insert(Enrollment), chunk)
+    for chunk in batched(activities, 1000):
+        db.session.execute(insert(Activity), chunk)
+
+    events = []
+    for i in range(args.events):
+        day, start, end = _slot(rng)
+        events.append({
+            "creator_id": rng.choice(user_ids), "title": f"Événement {i}", "category": rng.choice(CATEGORIES),
+            "day_of_week": day, "start_time": start, "end_time": end, "is_public": rng.random() < 0.9,
+            "max_participants": rng.choice([None, 10, 30]), "created_at": now, **schedule_fields(day, start, end),
+        })
+    event_ids = insert_ids(Event, events)
+    participants = []
+    for eid in event_ids:
+        for uid in rng.sample(user_ids, min(len(user_ids), rng.randint(0, 8))):
+            participants.append({"event_id": eid, "user_id": uid, "joined_at": now})
+    for chunk in batched(participants, 1000):
+        db.session.execute(insert(EventParticipant), chunk)
+
+    rebuild_course_stats()
+    db.session.commit()
+
+
+def load_dataset():
+    """Identifiants utilisés par les scénarios et taille du jeu de données en base"""
+    from sqlalchemy import func, select
+    from app.extensions import db
+    from app.models import Activity, Course, Enrollment, Event, EventParticipant, Faculty, Student, StudyPlan, User
+
+    def count(model):
+        return db.session.scalar(select(func.count()).select_from(model))
+
+    usernames = db.session.scalars(
+        select(User.username).join(Student, Student.user_id == User.id)
+        .where(User.username.like("bench%")).order_by(User.id)
+    ).all()
+    if not usernames:
+        raise RuntimeError("Aucun étudiant de test en base: lancer sans --reuse pour générer les données")
+    return {
+        "course_ids": db.session.scalars(select(Course.id)).all(),
+        "public_event_ids": db.session.scalars(select(Event.id).where(Event.is_public.is_(True))).all(),
+        "faculties": db.session.scalars(select(Faculty.external_id)).all(),
+        "plan_ids": db.session.scalars(select(StudyPlan.id)).all(),
+        "usernames": usernames,
+        "counts": {
+            "courses": count(Course),
+            "students": count(Student),
+            "enrollments": count(Enrollment),
+            "activities": count(Activity),
+            "events": count(Event),
+            "event_participants": count(EventParticipant),
+        },
+    }
+
+
+class HttpResponse:
+    def __init__(self, status_code, headers, data):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+
+
+class HttpClient:
+    """Client HTTP minimal (cookies, sans suivre les redirections) avec l'interface du client de test Flask"""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self._NoRedirect,
+        )
+
+    def _open(self, url, body=None):
+        try:
+            with self._opener.open(self.base_url + url, data=body) as r:
+                return HttpResponse(r.status, r.headers, r.read())
+        except urllib.error.HTTPError as e:
+            return HttpResponse(e.code, e.headers, e.read())
+
+    def get(self, url):
+        return self._open(url)
+
+    def post(self, url, data=None):
+        return self._open(url, urllib.parse.urlencode(data or {}).encode())
+
+
+def scenarios(data, rng):
+    """[(nom, méthode, fabrique d'URL/données, connecté ?)]"""
+    return [
+        ("auth.login", "POST", lambda: ("/auth/login", {"username": rng.choice(data["usernames"]), "password": PASSWORD}), False),
+        ("courses.catalog", "GET", lambda: ("/courses/", None), False),
+        ("courses.catalog[q]", "GET", lambda: (f"/courses/?q={rng.choice(['histoire', 'droit', 'intro', 'economie'])}", None), False),
+        ("courses.catalog[faculty]", "GET", lambda: (f"/courses/?faculty={rng.choice(data['faculties'])}", None), False),
+        ("courses.catalog[plan_id]", "GET", lambda: (f"/courses/?plan_id={rng.choice(data['plan_ids'])}", None), False),
+        ("courses.catalog[sort=name]", "GET", lambda: ("/courses/?sort=name", None), False),
+        ("courses.catalog[page=5]", "GET", lambda: ("/courses/?page=5", None), False),
+        ("courses.course_detail", "GET", lambda: (f"/courses/{rng.choice(data['course_ids'])}", None), True),
+        ("courses.planning", "GET", lambda: ("/courses/planning", None), True),
+        ("courses.my_courses", "GET", lambda: ("/courses/my-courses", None), True),
+        ("events.list_events", "GET", lambda: ("/events/", None), False),
+        ("events.list_events[popularity]", "GET", lambda: ("/events/?sort=popularity", None), False),
+        ("events.event_detail", "GET", lambda: (f"/events/{rng.choice(data['public_event_ids'])}", None), True),
+        ("api.courses", "GET", lambda: ("/api/v1/courses", None), False),
+        ("api.courses[q]", "GET", lambda: (f"/api/v1/courses?q={rng.choice(['histoire', 'droit', 'intro', 'economie'])}", None), False),
+        ("api.courses[faculty]", "GET", lambda: (f"/api/v1/courses?faculty={rng.choice(data['faculties'])}", None), False),
+        ("api.courses[fields=code,name]", "GET", lambda: ("/api/v1/courses?fields=code,name&limit=100", None), False),
+        ("api.course", "GET", lambda: (f"/api/v1/courses/{rng.choice(data['course_ids'])}", None), False),
+        ("api.planning", "GET", lambda: ("/api/v1/planning", None), True),
+        ("api.events", "GET", lambda: ("/api/v1/events", None), False),
+        ("api.events[popularity]", "GET", lambda: ("/api/v1/events?sort=popularity&fields=id,title,participant_count", None), False),
+    ]
+
+
+def measure(clients, method, make_request, n, warmup):
+    """Mesure n requêtes réparties entre les clients (un fil d'exécution par client)"""
+    def once(client):
+        url, form = make_request()
+        t0 = time.perf_counter()
+        r = client.post(url, data=form) if method == "POST" else client.get(url)
+        elapsed = time.perf_counter() - t0
+        # Un POST réussi redirige (PRG); sinon le formulaire est réaffiché
+        if r.status_code >= 400 or (method == "POST" and r.status_code != 302):
+            raise RuntimeError(f"{method} {url} -> {r.status_code}")
+        return elapsed, int(r.headers.get("X-DB-Queries", 0)), len(r.data)
+
+    def run(client, count):
+        return [once(client) for _ in range(count)]
+
+    for client in clients:
+        run(client, warmup)
+    shares = [n // len(clients) + (i < n % len(clients)) for i in range(len(clients))]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        outcomes = [o for part in pool.map(run, clients, shares) for o in part]
+    total = time.perf_counter() - started
+    samples = [elapsed * 1000 for elapsed, _, _ in outcomes]
+    queries = [q for _, q, _ in outcomes]
+    sizes = [size for _, _, size in outcomes]
+    samples.sort()
+    return {
+        "requests": n,
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p90_ms": round(_percentile(samples, 90), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(samples[-1], 3),
+        "rps": round(n / total, 1) if total else None,
+        "queries": max(queries),
+        "bytes": round(statistics.fmean(sizes)),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Régressions par rapport à un fichier JSON précédent: latence p50/p95 et nombre de requêtes SQL"""
+    failures = []
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if b is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if r[key] > b[key] * (1 + tolerance) and r[key] - b[key] > min_delta_ms:
+                failures.append(f"{name}: {key} {b[key]} -> {r[key]}")
+        if r["queries"] > b["queries"]:
+            failures.append(f"{name}: queries {b['queries']} -> {r['queries']}")
+    return failures
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", default=str(Path(__file__).resolve().parents[1] / "app" / "ressources" / "courses.json"))
+    parser.add_argument("--database-uri", help="Base à utiliser (vidée!) au lieu d'un SQLite temporaire")
+    parser.add_argument("--reuse", action="store_true", help="Garde les données déjà générées dans --database-uri")
+    parser.add_argument("--url", help="Mesure un serveur lancé sur --database-uri (ex. http://127.0.0.1:5000) au lieu du client de test")
+    parser.add_argument("--concurrency", type=int, default=1, help="Clients simultanés")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--courses", type=int, default=3000, help="Cours au total (courses.json dupliqué au besoin)")
+    parser.add_argument("--enrollments", type=int, default=8, help="Inscriptions par étudiant")
+    parser.add_argument("--activities", type=int, default=3, help="Activités par étudiant")
+    parser.add_argument("--events", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=50, help="Requêtes mesurées par scénario")
+    parser.add_argument("--login-requests", type=int, default=10, help="Requêtes mesurées pour auth.login (coût du hachage)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", action="append", help="Préfixe de scénario à mesurer (répétable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Fichier JSON de résultats (sinon stdout)")
+    parser.add_argument("--baseline", help="Résultats précédents à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse de latence tolérée (0.25 = +25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Écart de latence ignoré en dessous de ce seuil")
+    args = parser.parse_args()
+    if (args.url or args.reuse) and not args.database_uri:
+        parser.error("--url et --reuse demandent --database-uri")
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    base_results = baseline["results"] if baseline else {}
+
+    tmp = None
+    if args.database_uri:
+        os.environ["DATABASE_URI"] = args.database_uri
+    else:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        os.environ["DATABASE_URI"] = f"sqlite:///{tmp.name}"
+    os.environ["PROFILING_HEADER"] = "1"
+    # Toutes les connexions viennent de la même adresse: pas de limite de tentatives
+    os.environ.setdefault("LOGIN_THROTTLE_IP", "0")
+    os.environ.setdefault("LOGIN_THROTTLE_ACCOUNT", "0")
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    try:
+        build_seconds = None
+        with app.app_context():
+            if not args.reuse:
+                if args.database_uri:
+                    db.drop_all()
+                t0 = time.perf_counter()
+                build_dataset(args, rng)
+                build_seconds = round(time.perf_counter() - t0, 2)
+            data = load_dataset()
+            db.session.remove()
+
+        def new_client():
+            return HttpClient(args.url) if args.url else app.test_client()
+
+        anonymous = [new_client() for _ in range(args.concurrency)]
+        logged_in = [new_client() for _ in range(args.concurrency)]
+        for i, client in enumerate(logged_in):
+            username = data["usernames"][i % len(data["usernames"])]
+            if client.post("/auth/login", data={"username": username, "password": PASSWORD}).status_code != 302:
+                raise RuntimeError(f"Connexion de l'étudiant de test {username} impossible")
+
+        results = {}
+        for name, method, make_request, needs_login in scenarios(data, rng):
+            if args.only and not any(name.startswith(p) for p in args.only):
+                continue
+            n = args.login_requests if name == "auth.login" else args.requests
+            clients = logged_in if needs_login else anonymous
+            r = results[name] = measure(clients, method, make_request, n, min(args.warmup, n))
+            # Écart du nombre de requêtes SQL avec --baseline (ex. "-2")
+            delta = f" ({r['queries'] - base_results[name]['queries']:+d})" if name in base_results else ""
+            print(f"{name:<34} p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+                  f"{r['rps']:>7.1f} req/s  {r['queries']:>3} queries{delta}", file=sys.stderr)
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+    report = {
+        "meta": {
+            "date": datetime.utcnow().isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            "sqlite": sqlite3.sqlite_version,
+            "seed": args.seed,
+            "dataset": data["counts"],
+            "build_seconds": build_seconds,
+            "target": args.url or "test client",
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if baseline:
+        report["queries_delta"] = {
+            name: r["queries"] - base_results[name]["queries"] for name, r in results.items() if name in base_results
+        }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if baseline:
+        failures = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for f in failures:
+            print(f"REGRESSION {f}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
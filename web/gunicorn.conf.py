@@ -0,0 +1,38 @@
+# Configuration gunicorn (lue automatiquement depuis le répertoire courant)
+#   gunicorn wsgi:app
+# Redémarrage sans coupure: kill -HUP <pid du maître> recharge le code et remplace
+# les workers un par un; les requêtes en cours ont graceful_timeout pour finir.
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Processus x threads: chaque worker garde son pool de connexions (DB_POOL_SIZE),
+# à garder >= GUNICORN_THREADS pour qu'aucun thread n'attende une connexion
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle périodiquement les workers (fuites mémoire), avec un décalage pour
+# qu'ils ne redémarrent pas tous en même temps
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Avec preload_app, l'application (et son moteur) est créée dans le maître:
+    # les connexions déjà ouvertes ne doivent pas être partagées entre workers
+    if preload_app:
+        from wsgi import app
+        from app.extensions import db
+        with app.app_context():
+            db.engine.dispose(close=False)
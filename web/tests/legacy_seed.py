@@ -0,0 +1,241 @@
+"""
+Import seed-from-json d'avant l'import ensembliste (importer.CourseImporter),
+recopié tel quel depuis l'ancien cli.py: référence des tests d'équivalence.
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import User, Professor, Course, Faculty, StudyPlan, CourseStudyPlan
+
+
+DAY_MAP = {
+    "Monday": "Lundi",
+    "Tuesday": "Mardi",
+    "Wednesday": "Mercredi",
+    "Thursday": "Jeudi",
+    "Friday": "Vendredi",
+    "Saturday": "Samedi",
+    "Sunday": "Dimanche",
+}
+
+SEMESTER_MAP = {
+    "Automne": "Fall",
+    "Printemps": "Spring",
+    "Annuel": "Annual",
+}
+
+def _hour_to_str(h):
+    if h is None:
+        return None
+    try:
+        return f"{int(h):02d}:00"
+    except (ValueError, TypeError):
+        return None
+
+def _credits_to_int(c):
+    # Course.credits est int dans ta DB ; JSON est float.
+    if c is None:
+        return 0
+    try:
+        return int(round(float(c)))
+    except (ValueError, TypeError):
+        return 0
+
+def _plan_credits_decimal(x):
+    # listStudyPlan[].planCredits est string/null dans ton JSON
+    if x is None:
+        return None
+    s = str(x).strip()
+    if not s:
+        return None
+    try:
+        return Decimal(s)
+    except (InvalidOperation, ValueError):
+        return None
+
+def _build_description(obj: dict):
+    parts = []
+    if obj.get("objective"):
+        parts.append(str(obj["objective"]).strip())
+    if obj.get("description"):
+        parts.append(str(obj["description"]).strip())
+    txt = "\n\n".join([p for p in parts if p])
+    return txt or None
+
+def _normalize_day(day):
+    if not day:
+        return None
+    day = str(day).strip()
+    return DAY_MAP.get(day, day)
+
+def _normalize_semester(periodicity):
+    if not periodicity:
+        return None
+    p = str(periodicity).strip()
+    return SEMESTER_MAP.get(p, p)
+
+
+def legacy_seed(raw_courses, default_password, now=None):
+    """Import ligne à ligne de raw_courses (courses[] de courses.json), avec commit"""
+    now = now or datetime.utcnow()
+
+    prof_payload = {}
+    for c in raw_courses:
+        pid = c.get("personId")
+        if pid and str(pid).isdigit():
+            pid = int(pid)
+            if pid not in prof_payload:
+                prof_payload[pid] = {
+                    "first_name": (c.get("displayFirstName") or "Unknown").strip() or "Unknown",
+                    "last_name": (c.get("displayLastName") or "Unknown").strip() or "Unknown",
+                    "department": (c.get("facultyLabel") or "Unknown").strip() or "Unknown",
+                }
+
+
+    PLACEHOLDER_PID = 0
+    prof_payload.setdefault(PLACEHOLDER_PID, {"first_name": "TBD", "last_name": "TBD", "department": "Unknown"})
+
+    created_users = created_profs = 0
+    professor_by_pid = {}
+
+    for pid, p in prof_payload.items():
+        username = f"prof_{pid}"
+        email = f"{username}@unige.local"
+
+        user = User.query.filter((User.username == username) | (User.email == email)).first()
+        if user is None:
+            user = User(
+                username=username,
+                email=email,
+                password_hash=generate_password_hash(default_password),
+                created_at=now,
+            )
+            db.session.add(user)
+            db.session.flush()
+            created_users += 1
+
+        prof = Professor.query.filter_by(user_id=user.id).first()
+        if prof is None:
+            prof = Professor(
+                user_id=user.id,
+                first_name=p["first_name"],
+                last_name=p["last_name"],
+                department=p["department"],
+            )
+            db.session.add(prof)
+            created_profs += 1
+        else:
+            # update soft
+            prof.first_name = p["first_name"]
+            prof.last_name = p["last_name"]
+            prof.department = p["department"]
+
+        professor_by_pid[pid] = prof
+
+    db.session.commit()
+    placeholder_prof = professor_by_pid[PLACEHOLDER_PID]
+
+    faculty_by_external = {f.external_id: f for f in Faculty.query.all()}
+
+    studyplan_by_external = {sp.external_id: sp for sp in StudyPlan.query.filter(StudyPlan.external_id.isnot(None)).all()}
+    studyplan_by_label = {sp.label: sp for sp in StudyPlan.query.all()}
+
+    inserted_courses = updated_courses = 0
+    link_inserted = link_updated = 0
+
+    codes = [c.get("code") for c in raw_courses if c.get("code")]
+    existing_courses = Course.query.filter(Course.code.in_(codes)).all()
+    course_by_code = {cc.code: cc for cc in existing_courses}
+
+    for c in raw_courses:
+        code = c.get("code")
+        title = c.get("title")
+        if not code or not title:
+            continue
+
+        # Faculty
+        faculty_ext = str(c.get("facultyId") or "").strip()
+        faculty_label = (c.get("facultyLabel") or "").strip()
+        faculty_id = None
+        if faculty_ext and faculty_label:
+            fac = faculty_by_external.get(faculty_ext)
+            if fac is None:
+                fac = Faculty(external_id=faculty_ext, name=faculty_label)
+                db.session.add(fac)
+                db.session.flush()
+                faculty_by_external[faculty_ext] = fac
+            faculty_id = fac.id
+
+        # Professor
+        pid = c.get("personId")
+        if pid and str(pid).isdigit():
+            prof = professor_by_pid.get(int(pid), placeholder_prof)
+        else:
+            prof = placeholder_prof
+
+        payload = dict(
+            code=str(code)[:20],
+            name=str(title)[:200],
+            description=_build_description(c),
+            credits=_credits_to_int(c.get("credits")),
+            professor_id=prof.id,
+            created_at=now,
+            day_of_week=_normalize_day(c.get("day")),
+            start_time=_hour_to_str(c.get("startHour")),
+            end_time=_hour_to_str(c.get("endHour")),
+            semester=_normalize_semester(c.get("periodicity")),
+            academical_year=str(c.get("academicalYear") or "").strip() or None,
+            faculty_id=faculty_id,
+        )
+
+        obj = course_by_code.get(payload["code"])
+        if obj is None:
+            obj = Course(**payload)
+            db.session.add(obj)
+            db.session.flush()  # obj.id pour liens
+            course_by_code[obj.code] = obj
+            inserted_courses += 1
+        else:
+            for k, v in payload.items():
+                setattr(obj, k, v)
+            db.session.flush()
+            updated_courses += 1
+
+        # Associations StudyPlan (listStudyPlan)
+        list_plans = c.get("listStudyPlan") or []
+        for sp in list_plans:
+            ext = sp.get("studyPlanGroupId") or sp.get("studyPlanId")
+            ext = str(ext).strip() if ext is not None else None
+            label = (sp.get("studyPlanLabel") or "Unknown plan").strip()
+
+            study_plan = None
+            if ext:
+                study_plan = studyplan_by_external.get(ext)
+            if study_plan is None:
+                study_plan = studyplan_by_label.get(label)
+
+            if study_plan is None:
+                study_plan = StudyPlan(external_id=ext, label=label)
+                db.session.add(study_plan)
+                db.session.flush()
+                if ext:
+                    studyplan_by_external[ext] = study_plan
+                studyplan_by_label[label] = study_plan
+
+            assoc = CourseStudyPlan.query.filter_by(course_id=obj.id, study_plan_id=study_plan.id).first()
+            if assoc is None:
+                assoc = CourseStudyPlan(
+                    course_id=obj.id,
+                    study_plan_id=study_plan.id,
+                    plan_credits=_plan_credits_decimal(sp.get("planCredits")),
+                )
+                db.session.add(assoc)
+                link_inserted += 1
+            else:
+                assoc.plan_credits = _plan_credits_decimal(sp.get("planCredits"))
+                link_updated += 1
+
+    db.session.commit()
@@ -0,0 +1,20 @@
+from sqlalchemy.dialects import mysql
+
+from app.cache import _upsert, bump_version, current_version
+from app.extensions import db
+
+
+def test_bump_version_creates_then_increments(app):
+    assert current_version("course:1") == 0
+    bump_version("course:1")
+    first = current_version("course:1")
+    assert first > 0
+    bump_version("course:1")
+    bump_version("course:1")
+    assert current_version("course:1") == first + 2
+    db.session.commit()
+
+
+def test_bump_version_is_a_single_upsert_on_mariadb():
+    stmt = _upsert("mysql")({"name": "planning:1", "version": 1, "updated_at": None}, {"version": 2})
+    assert "ON DUPLICATE KEY UPDATE" in str(stmt.compile(dialect=mysql.dialect()))
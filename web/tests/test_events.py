@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Event, EventParticipant, User
+
+
+def _add_events(count, start=0):
+    """count événements publics, chacun avec son créateur et trois participants"""
+    now = datetime.utcnow()
+    for i in range(start, start + count):
+        creator = User(username=f"creator{i}", email=f"creator{i}@example.com", password_hash="x")
+        members = [User(username=f"member{i}_{j}", email=f"member{i}_{j}@example.com", password_hash="x")
+                   for j in range(3)]
+        db.session.add_all([creator, *members])
+        db.session.flush()
+        event = Event(creator_id=creator.id, title=f"Événement {i}", category="study", day_of_week="Lundi",
+                      start_time="10:00", end_time="11:00", is_public=True, max_participants=10,
+                      created_at=now - timedelta(minutes=i))
+        db.session.add(event)
+        db.session.flush()
+        db.session.add_all([EventParticipant(event_id=event.id, user_id=m.id, joined_at=now) for m in members])
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def _list_queries(client, count_queries, url):
+    def fetch():
+        response = client.get(url)
+        assert response.status_code == 200
+        db.session.expunge_all()
+    return count_queries(fetch)
+
+
+def test_events_list_query_count_is_constant(client, count_queries):
+    _add_events(1)
+    one = {sort: _list_queries(client, count_queries, f"/events/?sort={sort}") for sort in ("date", "popularity")}
+    _add_events(20, start=1)
+    many = {sort: _list_queries(client, count_queries, f"/events/?sort={sort}") for sort in ("date", "popularity")}
+    assert one == many
+
+
+def test_events_list_sorts_by_popularity_in_sql(client):
+    _add_events(2)
+    popular = Event.query.filter_by(title="Événement 1").one()
+    extra = User(username="extra", email="extra@example.com", password_hash="x")
+    db.session.add(extra)
+    db.session.flush()
+    db.session.add(EventParticipant(event_id=popular.id, user_id=extra.id, joined_at=datetime.utcnow()))
+    db.session.commit()
+
+    body = client.get("/events/?sort=popularity").get_data(as_text=True)
+    assert body.index("Événement 1") < body.index("Événement 0")
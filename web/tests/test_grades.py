@@ -0,0 +1,62 @@
+import io
+
+from app.extensions import db
+from app.models import Course, Enrollment, Professor, Student, User
+
+
+def _course_with_students(grades):
+    """Cours d'un professeur connecté par la suite, un inscrit par note de grades"""
+    prof_user = User(username="prof", email="prof@example.com", password_hash="x")
+    db.session.add(prof_user)
+    db.session.flush()
+    professor = Professor(user_id=prof_user.id, first_name="Ada", last_name="Lovelace", department="Info")
+    db.session.add(professor)
+    db.session.flush()
+    course = Course(code="INF101", name="Informatique", credits=6, professor_id=professor.id)
+    db.session.add(course)
+    for i, grade in enumerate(grades):
+        user = User(username=f"s{i}", email=f"s{i}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        student = Student(user_id=user.id, first_name="Étudiant", last_name=str(i), matricule=f"M{i}")
+        db.session.add(student)
+        db.session.flush()
+        db.session.add(Enrollment(student_id=student.id, course_id=course.id, grade=grade))
+    db.session.commit()
+    return prof_user.id, course.id
+
+
+def _grades(course_id):
+    db.session.expire_all()
+    return {
+        matricule: grade for matricule, grade in
+        db.session.query(Student.matricule, Enrollment.grade).join(Enrollment).filter(Enrollment.course_id == course_id)
+    }
+
+
+def _login(client, user_id):
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+
+
+def test_csv_upload_keeps_grades_of_blank_and_short_rows(client):
+    prof_id, course_id = _course_with_students([12.0, 14.0, 9.0, None])
+    _login(client, prof_id)
+    csv_text = "matricule;grade\nM0;15,5\nM1;\nM2\nM3;25\nX9;10\n"
+    response = client.post(f"/courses/{course_id}/grades", content_type="multipart/form-data",
+                           data={"file": (io.BytesIO(csv_text.encode()), "notes.csv")})
+    assert response.status_code == 302
+    assert _grades(course_id) == {"M0": 15.5, "M1": 14.0, "M2": 9.0, "M3": None}
+
+    with client.session_transaction() as session:
+        messages = " ".join(message for _, message in session["_flashes"])
+    assert "1 note(s) enregistrée(s), 1 inchangée(s)" in messages
+    assert "X9" in messages and "note manquante" in messages and "intervalle" in messages
+
+
+def test_grid_blank_field_clears_the_grade(client):
+    prof_id, course_id = _course_with_students([12.0, 14.0])
+    _login(client, prof_id)
+    response = client.post(f"/courses/{course_id}/grades", data={"matricule": ["M0", "M1"], "grade": ["", "16"]})
+    assert response.status_code == 302
+    assert _grades(course_id) == {"M0": None, "M1": 16.0}
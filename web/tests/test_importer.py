@@ -0,0 +1,130 @@
+import copy
+from decimal import Decimal
+
+from app.extensions import db
+from app.importer import CourseImporter
+from app.models import Course, CourseStudyPlan, Faculty, Professor, StudyPlan, User
+
+from legacy_seed import legacy_seed
+
+
+def _course(code, title, pid, plans, **extra):
+    return {
+        "code": code, "title": title, "objective": f"Objectifs de {title}", "description": None,
+        "credits": 6.0, "personId": str(pid), "displayFirstName": f"Prénom{pid}", "displayLastName": f"Nom{pid}",
+        "facultyId": "10", "facultyLabel": "Faculté des sciences", "day": "Monday", "startHour": 10,
+        "endHour": 12, "periodicity": "Automne", "academicalYear": "2024",
+        "listStudyPlan": [
+            {"studyPlanGroupId": ext, "studyPlanLabel": f"Plan {ext}", "planCredits": credits}
+            for ext, credits in plans
+        ],
+        **extra,
+    }
+
+
+FEED = [
+    _course("11X001", "Algèbre", 1, [("P1", "6"), ("P2", "3")]),
+    _course("11X002", "Analyse", 1, [("P1", "6")]),
+    _course("12M010", "Mécanique", 2, [("P2", None), ("P3", "4.5")], facultyId="20", facultyLabel="Faculté de médecine"),
+    _course("13B100", "Sans professeur", "", [], day=None, startHour=None, endHour=None),
+    # Code répété: la dernière occurrence l'emporte
+    _course("11X002", "Analyse I", 1, [("P1", "5")]),
+]
+
+
+def _next_feed():
+    """FEED modifié: titre changé, lien retiré, crédits d'un lien changés, nouveau cours"""
+    feed = copy.deepcopy(FEED[:4])
+    feed[0]["title"] = "Algèbre linéaire"
+    feed[0]["listStudyPlan"] = feed[0]["listStudyPlan"][:1]
+    feed[2]["listStudyPlan"][1]["planCredits"] = "5"
+    feed.append(_course("14G001", "Géologie", 3, [("P3", "3")]))
+    return feed
+
+
+def _import(feeds, delta):
+    for feed in feeds:
+        importer = CourseImporter("password", chunk_size=2, reuse_hash=True, delta=delta)
+        importer.add_batch(feed)
+        importer.finish()
+        db.session.commit()
+    return _snapshot()
+
+
+def _legacy_import(feeds):
+    for feed in feeds:
+        legacy_seed(copy.deepcopy(feed), "password")
+    return _snapshot()
+
+
+def _reset():
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+
+def _snapshot():
+    """Contenu importé par clés naturelles (sans created_at ni identifiants)"""
+    professor = {p.id: (p.user.username, p.first_name, p.last_name, p.department) for p in Professor.query}
+    faculty = {f.id: (f.external_id, f.name) for f in Faculty.query}
+    plan = {sp.id: (sp.external_id, sp.label) for sp in StudyPlan.query}
+    code = {c.id: c.code for c in Course.query}
+    return {
+        "users": sorted(u.username for u in User.query),
+        "professors": sorted(professor.values()),
+        "faculties": sorted(faculty.values()),
+        "study_plans": sorted(plan.values(), key=str),
+        "courses": {
+            c.code: (c.name, c.description, c.credits, professor[c.professor_id][0], c.day_of_week,
+                     c.start_time, c.end_time, c.day_index, c.start_minute, c.end_minute, c.semester,
+                     c.academical_year, faculty.get(c.faculty_id))
+            for c in Course.query
+        },
+        "links": {
+            (code[l.course_id], plan[l.study_plan_id]): l.plan_credits for l in CourseStudyPlan.query
+        },
+    }
+
+
+def test_importer_matches_the_legacy_row_by_row_import(app):
+    legacy = _legacy_import([FEED])
+    _reset()
+    assert _import([FEED], delta=False) == legacy
+
+
+def test_importer_matches_the_legacy_import_on_reimport(app):
+    """Réimport d'un flux modifié par-dessus le premier (sans suppression de liens, comme avant)"""
+    legacy = _legacy_import([FEED, _next_feed()])
+    _reset()
+    assert _import([FEED, _next_feed()], delta=False) == legacy
+    assert ("11X001", ("P2", "Plan P2")) in legacy["links"]
+
+
+def test_full_and_delta_imports_produce_the_same_data(app):
+    full = _import([FEED], delta=False)
+    _reset()
+    delta = _import([FEED], delta=True)
+    assert full == delta
+    assert full["courses"]["11X002"][0] == "Analyse I"
+    assert full["courses"]["13B100"][3] == "prof_0"
+    assert len(full["links"]) == 5
+
+
+def test_full_and_delta_reimports_agree(app):
+    """Réimport: les deux chemins donnent les mêmes cours, professeurs et liens"""
+    full = _import([FEED, FEED], delta=False)
+    _reset()
+    delta = _import([FEED, FEED], delta=True)
+    assert full == delta
+
+
+def test_delta_reimport_matches_a_fresh_import_and_drops_stale_links(app):
+    fresh = _import([_next_feed()], delta=False)
+    _reset()
+    delta = _import([FEED, _next_feed()], delta=True)
+
+    for key in ("users", "professors", "faculties", "courses", "links"):
+        assert delta[key] == fresh[key], key
+    assert delta["courses"]["11X001"][0] == "Algèbre linéaire"
+    assert ("11X001", ("P2", "Plan P2")) not in delta["links"]
+    assert delta["links"][("12M010", ("P3", "Plan P3"))] == Decimal("5")
@@ -0,0 +1,31 @@
+from sqlalchemy import delete, func, select
+
+from app.extensions import db
+from app.migrations import upgrade
+from app.models import Course, CourseSearchTerm, CourseStats, Enrollment, Professor, SchemaMigration, Student, User
+
+
+def test_upgrade_builds_search_index_and_course_stats(app, client):
+    prof_user = User(username="prof", email="prof@example.com", password_hash="x")
+    student_user = User(username="student", email="student@example.com", password_hash="x")
+    db.session.add_all([prof_user, student_user])
+    db.session.flush()
+    professor = Professor(user_id=prof_user.id, first_name="Ada", last_name="Lovelace", department="Info")
+    student = Student(user_id=student_user.id, first_name="Alan", last_name="Turing", matricule="S1")
+    db.session.add_all([professor, student])
+    db.session.flush()
+    course = Course(code="INF101", name="Histoire de l'informatique", credits=6, professor_id=professor.id)
+    db.session.add(course)
+    db.session.flush()
+    db.session.add(Enrollment(student_id=student.id, course_id=course.id, status="enrolled"))
+    # Base d'avant les migrations: tables dérivées vides, aucun historique
+    db.session.execute(delete(CourseSearchTerm))
+    db.session.execute(delete(CourseStats))
+    db.session.execute(delete(SchemaMigration))
+    db.session.commit()
+
+    upgrade(echo=lambda message: None)
+
+    assert db.session.scalar(select(func.count()).select_from(CourseSearchTerm)) > 0
+    assert db.session.scalar(select(CourseStats.enrolled_count).where(CourseStats.course_id == course.id)) == 1
+    assert "INF101" in client.get("/courses/?q=informatique").get_data(as_text=True)
@@ -0,0 +1,64 @@
+from app.cache import bump_version, current_version
+from app.extensions import db
+from app.models import Event, EventParticipant, User
+from app.planning import PLANNING, planning_for, planning_version
+
+
+def _user(name):
+    user = User(username=name, email=f"{name}@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def test_deleting_an_event_invalidates_only_its_participants(client):
+    creator, participant, other = _user("creator"), _user("participant"), _user("other")
+    event = Event(creator_id=creator.id, title="Révisions", category="study", day_of_week="Lundi",
+                  start_time="10:00", end_time="11:00", is_public=True)
+    db.session.add(event)
+    db.session.flush()
+    db.session.add(EventParticipant(event_id=event.id, user_id=participant.id))
+    db.session.commit()
+    participant_id, other_id, event_id = participant.id, other.id, event.id
+
+    assert [slot["title"] for slot in planning_for(participant_id)["Lundi"]] == ["Révisions"]
+    other_planning = planning_for(other_id)
+    generation = current_version(PLANNING)
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(creator.id)
+    assert client.post(f"/events/{event_id}/delete").status_code == 302
+
+    assert db.session.get(Event, event_id) is None
+    assert planning_for(participant_id)["Lundi"] == []
+    assert planning_for(other_id) is other_planning
+    assert current_version(PLANNING) == generation
+
+
+def test_change_made_by_another_worker_is_seen_at_once(app):
+    user = _user("student")
+    event = Event(creator_id=user.id, title="Sport", category="sport", day_of_week="Mardi",
+                  start_time="18:00", end_time="19:00", is_public=True)
+    db.session.add(event)
+    db.session.flush()
+    db.session.add(EventParticipant(event_id=event.id, user_id=user.id))
+    db.session.commit()
+    user_id = user.id
+
+    assert [slot["title"] for slot in planning_for(user_id)["Mardi"]] == ["Sport"]
+    # Autre processus: suppression commitée et version incrémentée, cache local intact
+    db.session.delete(event)
+    bump_version(planning_version(user_id))
+    db.session.commit()
+    assert planning_for(user_id)["Mardi"] == []
+
+
+
+def test_api_planning_reads_the_cache_once(app, client, count_queries):
+    user = _user("api")
+    db.session.commit()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+    assert client.get("/api/v1/planning").status_code == 200
+    # Planning en cache: versions des validateurs HTTP, puis une relecture de planning:<id>
+    assert count_queries(lambda: client.get("/api/v1/planning")) == 2
@@ -0,0 +1,37 @@
+import logging
+import re
+
+from app.profiling import reset_stats, statement_id
+
+
+def test_metrics_requires_a_token(app, client):
+    app.config["METRICS_TOKEN"] = None
+    assert client.get("/metrics").status_code == 403
+
+    app.config["METRICS_TOKEN"] = "secret"
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "unify_" in response.get_data(as_text=True)
+
+
+def test_metrics_open_in_debug_without_token(app, client):
+    app.config["METRICS_TOKEN"] = None
+    app.debug = True
+    assert client.get("/metrics").status_code == 200
+
+
+def test_metrics_label_statements_by_hash(app, client, caplog):
+    app.config["METRICS_TOKEN"] = "secret"
+    reset_stats()
+    with caplog.at_level(logging.INFO, logger=app.logger.name):
+        assert client.get("/events/").status_code == 200
+    text = client.get("/metrics", headers={"Authorization": "Bearer secret"}).get_data(as_text=True)
+
+    labels = re.findall(r'unify_slowest_query_seconds\{endpoint="events.list_events",rank="\d+",statement="(\w+)"\}', text)
+    assert labels and all(re.fullmatch(r"[0-9a-f]{12}", label) for label in labels)
+    assert "SELECT" not in text
+    logged = {r.args[0]: r.args[1] for r in caplog.records if r.msg == "SQL statement %s: %s"}
+    assert set(labels) <= set(logged)
+    assert all(statement_id(logged[label]) == label for label in labels)
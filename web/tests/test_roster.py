@@ -0,0 +1,26 @@
+from app.extensions import db
+from app.models import Course, Enrollment, Professor, Student, User
+from app.roster import export_rows
+
+
+def test_export_neutralises_formulas(app):
+    prof_user = User(username="prof", email="prof@example.com", password_hash="x")
+    db.session.add(prof_user)
+    db.session.flush()
+    professor = Professor(user_id=prof_user.id, first_name="Ada", last_name="Lovelace", department="Info")
+    db.session.add(professor)
+    db.session.flush()
+    course = Course(code="INF101", name="Informatique", credits=6, professor_id=professor.id)
+    db.session.add(course)
+    user = User(username="eve", email="@eve@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    student = Student(user_id=user.id, first_name="-2+3", last_name='=HYPERLINK("http://x")', matricule="M1")
+    db.session.add(student)
+    db.session.flush()
+    db.session.add(Enrollment(student_id=student.id, course_id=course.id, grade=12))
+    db.session.commit()
+
+    lines = "".join(export_rows(course.id)).splitlines()
+    assert lines[1].split(",")[:4] == ["M1", "\"'=HYPERLINK(\"\"http://x\"\")\"", "'-2+3", "'@eve@example.com"]
+    assert lines[1].endswith(",12.0")
@@ -0,0 +1,70 @@
+import shutil
+
+import pytest
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import Event, EventParticipant, User
+from app.routing import STICKY_KEY
+
+
+@pytest.fixture
+def replicated(tmp_path, monkeypatch):
+    """Application avec une base principale et un réplica replica0 (deux fichiers SQLite)"""
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{primary}")
+    monkeypatch.setattr(Config, "SQLALCHEMY_BINDS", {"replica0": f"sqlite:///{replica}"})
+    monkeypatch.setattr(Config, "DB_REPLICAS", ["replica0"])
+    # init_app ajoute une MetaData par bind à l'instance db partagée par les autres tests
+    monkeypatch.setattr(db, "metadatas", dict(db.metadatas))
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all(bind_key=None)
+        user = User(username="student", email="student@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Event(creator_id=user.id, title="Réplica", category="study", day_of_week="Lundi",
+                             start_time="10:00", end_time="11:00", is_public=True))
+        db.session.commit()
+        db.engine.dispose()
+        shutil.copy(primary, replica)
+        # Le réplica est en retard: le titre changé n'y est pas encore
+        db.session.execute(db.update(Event).values(title="Primaire"))
+        db.session.commit()
+        yield app, user.id
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _title(response):
+    """Titre de l'événement affiché (balise h1 de la page)"""
+    html = response.get_data(as_text=True)
+    return html.split("<h1", 1)[1].split(">", 1)[1].split("</h1>", 1)[0]
+
+
+def _participants(engine):
+    with engine.connect() as conn:
+        return conn.scalar(db.select(db.func.count()).select_from(EventParticipant))
+
+
+def test_reads_go_to_the_replica_until_the_author_writes(replicated):
+    app, user_id = replicated
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+
+    # GET d'une vue @read_only: lu sur le réplica
+    assert _title(client.get("/events/1")) == "Réplica"
+
+    # POST: écrit sur la base principale
+    assert client.post("/events/1/join").status_code == 302
+    assert _participants(db.engines[None]) == 1
+    assert _participants(db.engines["replica0"]) == 0
+    with client.session_transaction() as session:
+        assert STICKY_KEY in session
+
+    # GET suivant de la même session: reste sur la base principale
+    assert _title(client.get("/events/1")) == "Primaire"
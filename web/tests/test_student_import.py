@@ -0,0 +1,44 @@
+from app.extensions import db
+from app.models import Student, User
+from app.student_import import StudentImporter
+
+
+def _row(i, **fields):
+    return {"username": f"u{i}", "email": f"u{i}@example.com", "matricule": f"M{i}",
+            "first_name": "Prénom", "last_name": f"Nom{i}", **fields}
+
+
+def _importer():
+    return StudentImporter("secret", chunk_size=3, hash_workers=1, reuse_hash=True)
+
+
+def test_duplicates_ignore_case(app):
+    db.session.add(User(username="Alice", email="Alice@Example.com", password_hash="x"))
+    db.session.commit()
+    importer = _importer()
+    importer.add_batch([
+        (2, _row(1, username="ALICE")),
+        (3, _row(2, email="alice@example.COM")),
+        (4, _row(3)),
+        (5, _row(4, matricule="m3")),
+    ])
+    assert [line for line, _, _ in importer.errors] == [2, 3, 5]
+    assert importer.created == 1
+
+
+def test_too_long_fields_are_rejected(app):
+    importer = _importer()
+    importer.add_batch([(2, _row(1, username="u" * 81)), (3, _row(2, last_name="n" * 100))])
+    assert [(line, reason) for line, _, reason in importer.errors] == [(2, "champs trop longs: username > 80")]
+    assert importer.created == 1
+
+
+def test_rows_refused_by_database_are_isolated(app):
+    importer = _importer()
+    # Compte créé après le préchargement (inscription pendant l'import)
+    db.session.add(User(username="u5", email="other@example.com", password_hash="x"))
+    db.session.commit()
+    importer.add_batch([(i + 1, _row(i)) for i in range(8)])
+    assert [line for line, _, _ in importer.errors] == [6]
+    assert importer.created == 7
+    assert db.session.query(Student).count() == 7
@@ -0,0 +1,19 @@
+from app.extensions import db
+from app.models import User
+from app.passwords import hash_password
+
+
+def _attempt(client, login):
+    return client.post("/auth/login", data={"username": login, "password": "wrong"}).status_code
+
+
+def test_account_bucket_is_shared_by_username_and_email(app, client):
+    app.config.update(LOGIN_THROTTLE_ACCOUNT="2/300", LOGIN_THROTTLE_IP="0")
+    db.session.add(User(username="alice", email="alice@example.com", password_hash=hash_password("secret")))
+    db.session.commit()
+
+    assert _attempt(client, "alice") == 200
+    assert _attempt(client, "alice@example.com") == 200
+    assert _attempt(client, "alice") == 429
+    # Compte inconnu: seau de la saisie
+    assert _attempt(client, "bob") == 200
@@ -0,0 +1,4 @@
+# Point d'entrée WSGI de production: gunicorn wsgi:app (voir gunicorn.conf.py)
+from app import create_app
+
+app = create_app()